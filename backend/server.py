@@ -3,13 +3,16 @@ from fastapi.responses import StreamingResponse, FileResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from starlette.background import BackgroundTask
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import asyncio
 import cv2
 import av
@@ -17,15 +20,33 @@ import numpy as np
 import aiofiles
 import psutil
 import json
-from threading import Thread, Event
+from threading import Thread, Event, Lock
 import time
+import sys
+import threading
 import shutil
 import requests
 from PIL import Image
 from io import BytesIO
-from collections import deque
+from collections import deque, OrderedDict, Counter
+from contextlib import contextmanager
 import concurrent.futures
 import subprocess
+import socket
+import math
+import bisect
+import hashlib
+import httpx
+import multiprocessing
+from multiprocessing import shared_memory
+import queue
+import random
+import select
+import mimetypes
+from fractions import Fraction
+import anyio
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -59,8 +80,27 @@ db = client[os.environ['DB_NAME']]
 # Storage configuration
 STORAGE_PATH = Path("/app/backend/recordings")
 STORAGE_PATH.mkdir(exist_ok=True)
-MAX_STORAGE_GB = 50  # Maximum storage in GB
-RETENTION_DAYS = 30  # Keep recordings for 30 days
+MAX_STORAGE_GB = float(os.environ.get('MAX_STORAGE_GB', 50))  # Maximum storage in GB
+RETENTION_DAYS = int(os.environ.get('RETENTION_DAYS', 30))  # Keep recordings for 30 days (default, per-camera override)
+STORAGE_HIGH_WATERMARK = float(os.environ.get('STORAGE_HIGH_WATERMARK', 90))  # Disk usage % that triggers cleanup
+STORAGE_LOW_WATERMARK = float(os.environ.get('STORAGE_LOW_WATERMARK', 80))  # Disk usage % cleanup frees down to
+RETENTION_INTERVAL_SECONDS = int(os.environ.get('RETENTION_INTERVAL_SECONDS', 300))  # How often retention runs
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 200))  # Recordings deleted per DB round-trip
+BULK_DELETE_BACKGROUND_THRESHOLD = int(os.environ.get('BULK_DELETE_BACKGROUND_THRESHOLD', 500))  # Larger deletes run as background jobs
+BULK_DELETE_BATCH_SIZE = 1000  # Documents per find/delete_many round-trip
+
+# Stream probing
+PROBE_TIMEOUT_SECONDS = int(os.environ.get('PROBE_TIMEOUT_SECONDS', 15))  # Network timeout of one probe
+PROBE_CACHE_TTL_SECONDS = int(os.environ.get('PROBE_CACHE_TTL_SECONDS', 600))  # How long probe results are reused
+PROBE_CONCURRENCY = int(os.environ.get('PROBE_CONCURRENCY', 16))  # Parallel probes for batch probes
+PROBE_SAMPLE_SECONDS = 4  # Most stream time read to measure GOP length (a probe stops at the second keyframe)
+
+# Recorder worker processes (0 = recorders run as threads inside the API process)
+RECORDER_WORKERS = int(os.environ.get('RECORDER_WORKERS', 0))
+WORKER_RESPAWN_DELAY = 5  # Minimum seconds between restarts of a crashed worker
+
+# Thread pool for blocking file operations (unlinks) so they never run on the event loop
+file_io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="file-io")
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -158,7 +198,7 @@ class Camera(BaseModel):
     post_recording_seconds: float = 5.0  # Continue recording after motion
     motion_cooldown_seconds: float = 2.0  # Gap between motion events
     # Advanced motion detection settings
-    motion_algorithm: str = "mog2"  # "basic", "mog2", "knn"
+    motion_algorithm: str = "mog2"  # "basic", "mog2", "knn", "mv" (H.264/H.265 motion vectors)
     min_object_area: int = 500  # Minimum area in pixels to consider as motion
     min_motion_duration: float = 1.0  # Minimum motion duration in seconds to trigger recording
     blur_size: int = 21  # GaussianBlur kernel size (must be odd)
@@ -170,6 +210,7 @@ class Camera(BaseModel):
     telegram_send_notification: bool = False  # Send text notification
     telegram_send_video: bool = False  # Send video file
     storage_path: Optional[str] = None  # Custom storage path for this camera
+    retention_days: Optional[int] = None  # Per-camera retention in days (None = global RETENTION_DAYS)
     status: str = "inactive"  # active, inactive, error
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -193,6 +234,7 @@ class CameraCreate(BaseModel):
     telegram_send_notification: bool = False
     telegram_send_video: bool = False
     storage_path: Optional[str] = None
+    retention_days: Optional[int] = None
     motion_algorithm: str = "mog2"
     min_object_area: int = 500
     min_motion_duration: float = 1.0
@@ -222,6 +264,7 @@ class CameraUpdate(BaseModel):
     telegram_send_notification: Optional[bool] = None
     telegram_send_video: Optional[bool] = None
     storage_path: Optional[str] = None
+    retention_days: Optional[int] = None
     motion_algorithm: Optional[str] = None
     min_object_area: Optional[int] = None
     min_motion_duration: Optional[float] = None
@@ -244,6 +287,9 @@ class Recording(BaseModel):
     file_size: int = 0
     duration: float = 0.0
     thumbnail_path: Optional[str] = None
+    sprite_path: Optional[str] = None
+    sprite: Optional[Dict[str, Any]] = None  # Sprite sheet layout: interval, count, columns, rows, tile_width, tile_height
+    frame_count: Optional[int] = None  # Frames written (re-encoded recordings only)
 
 class MotionEvent(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -254,6 +300,8 @@ class MotionEvent(BaseModel):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     snapshot_path: Optional[str] = None
     recording_id: Optional[str] = None
+    track: Optional[Dict[str, Any]] = None  # Summary of detections during the event (MotionTrack.summary)
+    heatmap: Optional[List[List[int]]] = None  # MOTION_HEATMAP_ROWS x MOTION_HEATMAP_COLS, 0-255
 
 class StorageStats(BaseModel):
     total_gb: float
@@ -262,6 +310,58 @@ class StorageStats(BaseModel):
     recordings_count: int
     recordings_size_gb: float
 
+class StreamProbeRequest(BaseModel):
+    stream_url: str
+    username: Optional[str] = None
+    password: Optional[str] = None
+
+class StreamProbeResult(BaseModel):
+    stream_url: str
+    success: bool = False
+    codec: Optional[str] = None  # h264, h265, mjpeg
+    codec_name: Optional[str] = None  # Raw FFmpeg codec name
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    gop: Optional[int] = None  # Frames between keyframes
+    has_audio: bool = False
+    audio_codec: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+    probed_at: Optional[str] = None
+
+class BatchProbeRequest(BaseModel):
+    streams: List[StreamProbeRequest]
+    use_cache: bool = True
+
+class BulkCameraCreate(BaseModel):
+    cameras: List[CameraCreate]
+    start_recorders: bool = True
+
+class BulkCameraIds(BaseModel):
+    camera_ids: List[str]
+
+class BulkCameraItemResult(BaseModel):
+    index: int
+    name: str
+    stream_url: str
+    success: bool = False
+    camera_id: Optional[str] = None
+    codec: Optional[str] = None
+    resolution: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkCameraResult(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[BulkCameraItemResult]
+
+class DetectionReplayRequest(BaseModel):
+    recording_ids: List[str]
+    parameter_sets: List[Dict[str, Any]] = [{}]  # Overrides of the camera's detection settings ({} = as configured)
+    sample_fps: float = 5.0  # Frames per second fed to the detector (recorders decode at 5)
+
 class FFmpegSettings(BaseModel):
     preset: str = "ultrafast"  # ultrafast, superfast, veryfast, faster, fast, medium
     crf: int = 30  # 18-35, lower = better quality
@@ -287,8 +387,8 @@ class SystemSettings(BaseModel):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 # Telegram helper functions
-def send_telegram_notification_sync(camera_name: str, timestamp: datetime, video_path: str = None):
-    """Send notification and/or video to Telegram (sync version for threads)"""
+def send_telegram_notification_sync(camera_name: str, timestamp: datetime, video_path: str = None) -> bool:
+    """Send notification and/or video to Telegram (sync version for threads); True when delivered"""
     try:
         # Use pymongo sync client to get settings
         from pymongo import MongoClient
@@ -303,7 +403,7 @@ def send_telegram_notification_sync(camera_name: str, timestamp: datetime, video
         
         if not settings or not settings.get('telegram', {}).get('enabled'):
             logger.debug("Telegram not enabled, skipping notification")
-            return
+            return False
         
         telegram = settings['telegram']
         bot_token = telegram.get('bot_token')
@@ -311,7 +411,7 @@ def send_telegram_notification_sync(camera_name: str, timestamp: datetime, video
         
         if not bot_token or not chat_id:
             logger.debug("Telegram credentials not configured, skipping notification")
-            return
+            return False
         
         # Format message
         time_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
@@ -333,6 +433,7 @@ def send_telegram_notification_sync(camera_name: str, timestamp: datetime, video
                     
                     if response.status_code == 200:
                         logger.info(f"✅ Video sent to Telegram: {camera_name}")
+                        return True
                     else:
                         logger.error(f"Failed to send video to Telegram: {response.text}")
                         
@@ -351,6 +452,7 @@ def send_telegram_notification_sync(camera_name: str, timestamp: datetime, video
                 
                 if response.status_code == 200:
                     logger.info(f"✅ Notification sent to Telegram: {camera_name}")
+                    return True
                 else:
                     logger.error(f"Failed to send notification to Telegram: {response.text}")
                     
@@ -359,57 +461,279 @@ def send_telegram_notification_sync(camera_name: str, timestamp: datetime, video
                 
     except Exception as e:
         logger.error(f"Error in send_telegram_notification_sync: {str(e)}")
+    return False
 
-# Camera Recorder Class
-class CameraRecorder:
-    def __init__(self, camera: Camera):
-        self.camera = camera
-        self.stop_event = Event()
-        self.recording_thread = None
-        self.current_recording = None
-        self.last_frame = None
+# Recording previews (poster thumbnail + scrub sprite sheet)
+THUMBNAIL_WIDTH = 320  # Poster frame width in pixels
+SPRITE_TILE_WIDTH = 160  # Sprite sheet tile width in pixels
+SPRITE_COLUMNS = 10  # Tiles per sprite sheet row
+SPRITE_MAX_TILES = 100  # Tile budget per recording; interval doubles when exceeded
+PREVIEW_JPEG_QUALITY = 70
+
+class RecordingPreview:
+    """
+    Collects small downscaled frames while a recording is being written, from frames
+    the recorder has already decoded, and writes a poster thumbnail and a sprite sheet
+    next to the recording when it is closed. No extra decoding of the video file.
+    """
+    
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self.started_at = time.time()
+        self.next_tile_at = self.started_at
+        self.poster = None
+        self.tiles = []
+    
+    def add_frame(self, frame):
+        """Feed a decoded BGR frame; only does work when the next tile is due"""
+        if frame is None:
+            return
         
-        # Motion detection with pre/post recording
-        self.pre_record_buffer = deque()  # Circular buffer for pre-recording (decoded frames for snapshot)
-        self.raw_buffer = deque()  # Buffer for raw H.264 packets (for efficient recording)
-        self.motion_writer = None
-        self.motion_file_path = None
-        self.motion_state = "idle"  # idle, recording, cooldown
-        self.last_motion_time = None
-        self.motion_start_time = None
-        self.motion_start_time_dt = None  # For Telegram notification
-        self.motion_end_time = None
-        self.motion_first_detected_time = None  # Track when motion was first detected (before min_duration check)
-        self.decode_interval = 10  # Decode every N-th frame for motion detection (lower = more accurate, higher = less CPU)
+        now = time.time()
+        if self.poster is None:
+            height, width = frame.shape[:2]
+            poster_height = max(2, int(round(THUMBNAIL_WIDTH * height / width / 2)) * 2)
+            self.poster = cv2.resize(frame, (THUMBNAIL_WIDTH, poster_height), interpolation=cv2.INTER_AREA)
         
-        # Error handling and reconnection
-        self.error_count = 0
-        self.max_errors = 10  # Stop after 10 consecutive errors
-        self.reconnect_delay = 5  # Start with 5 seconds
-        self.max_reconnect_delay = 300  # Max 5 minutes
-        self.consecutive_failures = 0
-        self.last_successful_frame = time.time()
+        if now < self.next_tile_at:
+            return
         
-        # Connection resilience
-        self.connection_timeout = 10  # Seconds to wait for connection
-        self.frame_timeout = 5  # Seconds to wait for frame
-        self.max_retry_attempts = 3  # Retry attempts before giving up
-        self.adaptive_quality = True  # Enable adaptive quality
-        self.current_quality = "high"  # high, medium, low
+        tile_height = max(2, int(round(SPRITE_TILE_WIDTH * frame.shape[0] / frame.shape[1] / 2)) * 2)
+        self.tiles.append(cv2.resize(frame, (SPRITE_TILE_WIDTH, tile_height), interpolation=cv2.INTER_AREA))
         
-        # Performance optimization
-        self.frame_skip = 3  # Process every 3rd frame for motion detection (was 2)
-        self.frame_counter = 0
+        # Keep the tile budget by dropping every other tile and halving the sampling rate
+        if len(self.tiles) > SPRITE_MAX_TILES:
+            self.tiles = self.tiles[::2]
+            self.interval *= 2
         
-        # H.264 conversion settings
-        self.enable_h264_conversion = True  # Set to False to disable conversion
-        self.conversion_queue = []  # Queue for async conversion
+        self.next_tile_at = self.started_at + len(self.tiles) * self.interval
+    
+    def save(self, video_path: str) -> Dict[str, Any]:
+        """Write <name>.thumb.jpg and <name>.sprite.jpg next to the video; returns recording fields"""
+        fields = {}
+        base_path = os.path.splitext(video_path)[0]
+        
+        if self.poster is not None:
+            thumbnail_path = f"{base_path}.thumb.jpg"
+            if cv2.imwrite(thumbnail_path, self.poster, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY]):
+                fields['thumbnail_path'] = thumbnail_path
+        
+        if self.tiles:
+            tile_height, tile_width = self.tiles[0].shape[:2]
+            tiles = [tile for tile in self.tiles if tile.shape[:2] == (tile_height, tile_width)]
+            columns = min(SPRITE_COLUMNS, len(tiles))
+            rows = (len(tiles) + columns - 1) // columns
+            sheet = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+            for index, tile in enumerate(tiles):
+                row, column = divmod(index, columns)
+                sheet[row * tile_height:(row + 1) * tile_height, column * tile_width:(column + 1) * tile_width] = tile
+            
+            sprite_path = f"{base_path}.sprite.jpg"
+            if cv2.imwrite(sprite_path, sheet, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY]):
+                fields['sprite_path'] = sprite_path
+                fields['sprite'] = {
+                    "interval": self.interval,
+                    "count": len(tiles),
+                    "columns": columns,
+                    "rows": rows,
+                    "tile_width": tile_width,
+                    "tile_height": tile_height
+                }
+        
+        return fields
+
+class RecordingTracker:
+    """
+    Wall-clock span and written frame/byte counts of a recording, tracked while it is
+    written so metadata can be saved without reopening the file.
+    """
+    
+    def __init__(self, fps: Optional[float] = None, counters: Optional["RecorderCounters"] = None):
+        self.fps = fps
+        self.counters = counters  # Recorder-wide totals to add writes to
+        self.first_write = None
+        self.last_write = None
+        self.frames = 0
+        self.bytes = 0
+    
+    def _mark(self, timestamp: Optional[float]):
+        timestamp = timestamp if timestamp is not None else time.time()
+        if self.first_write is None or timestamp < self.first_write:
+            self.first_write = timestamp
+        if self.last_write is None or timestamp > self.last_write:
+            self.last_write = timestamp
+    
+    def add_frame(self, timestamp: Optional[float] = None):
+        self._mark(timestamp)
+        self.frames += 1
+        if self.counters:
+            self.counters.frames_written += 1
+    
+    def add_bytes(self, nbytes: int, timestamp: Optional[float] = None):
+        self._mark(timestamp)
+        self.bytes += nbytes
+        if self.counters:
+            self.counters.bytes_written += nbytes
+    
+    def metadata(self) -> Dict[str, Any]:
+        """start_time/end_time/duration (and frame_count when frames were written) for the recording document"""
+        if self.first_write is None:
+            return {}
+        
+        fields = {
+            "start_time": datetime.fromtimestamp(self.first_write, timezone.utc).isoformat(),
+            "end_time": datetime.fromtimestamp(self.last_write, timezone.utc).isoformat()
+        }
+        
+        if self.frames and self.fps:
+            # Playback length of a VideoWriter file is set by its nominal fps
+            fields['duration'] = self.frames / self.fps
+            fields['frame_count'] = self.frames
+        else:
+            fields['duration'] = self.last_write - self.first_write
+        return fields
+
+class TrackedVideoWriter:
+    """cv2.VideoWriter that reports written frames to a RecordingTracker"""
+    
+    def __init__(self, file_path: str, fps: float, size: tuple, tracker: RecordingTracker):
+        self.writer = cv2.VideoWriter(file_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+        self.tracker = tracker
+    
+    def write(self, frame, timestamp: Optional[float] = None):
+        self.writer.write(frame)
+        self.tracker.add_frame(timestamp)
+    
+    def release(self):
+        self.writer.release()
+
+# Adaptive motion detection cadence
+DETECTION_QUIET_INTERVAL = float(os.environ.get('DETECTION_QUIET_INTERVAL', 1.0))  # Seconds between detections in a quiet scene
+DETECTION_ACTIVE_INTERVAL = float(os.environ.get('DETECTION_ACTIVE_INTERVAL', 0.2))  # Seconds between detections around motion
+DETECTION_BURST_SECONDS = float(os.environ.get('DETECTION_BURST_SECONDS', 10))  # Stay at the active rate this long after motion
+DETECTION_CPU_BUDGET = float(os.environ.get('DETECTION_CPU_BUDGET', 80))  # Host CPU % above which detection is throttled
+DETECTION_MAX_THROTTLE = float(os.environ.get('DETECTION_MAX_THROTTLE', 8))  # Max stretch factor for detection intervals
+
+class DetectionBudget:
+    """
+    Host-wide CPU budget for motion detection. When CPU usage exceeds the budget, every
+    camera's detection interval is stretched by the same factor, so load is shed fairly;
+    the factor relaxes again once usage drops below the budget.
+    """
+    
+    def __init__(self, cpu_budget: float = DETECTION_CPU_BUDGET, max_throttle: float = DETECTION_MAX_THROTTLE,
+                 sample_interval: float = 2.0):
+        self.cpu_budget = cpu_budget
+        self.max_throttle = max_throttle
+        self.sample_interval = sample_interval
+        self.throttle = 1.0
+        self.cpu_percent = 0.0
+        self.last_sample = 0.0
+        self.lock = Lock()
+    
+    def factor(self) -> float:
+        """Current interval multiplier (1.0 = unthrottled); samples CPU at most every sample_interval"""
+        now = time.monotonic()
+        if now - self.last_sample < self.sample_interval:
+            return self.throttle
         
-        # Advanced motion detection
+        with self.lock:
+            if now - self.last_sample < self.sample_interval:
+                return self.throttle
+            self.last_sample = now
+            self.cpu_percent = psutil.cpu_percent(interval=None)
+            
+            if self.cpu_percent > self.cpu_budget:
+                self.throttle = min(self.max_throttle, self.throttle * self.cpu_percent / self.cpu_budget * 1.25)
+            else:
+                self.throttle = max(1.0, self.throttle * 0.8)
+            return self.throttle
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "cpu_percent": self.cpu_percent,
+            "cpu_budget": self.cpu_budget,
+            "throttle": round(self.throttle, 2)
+        }
+
+detection_budget = DetectionBudget()
+
+class DetectionCadence:
+    """
+    Decides when a camera runs motion detection. Quiet scenes are checked every
+    quiet_interval seconds; the first motion switches to active_interval for burst_seconds
+    so events are confirmed and tracked quickly. Both are scaled by the global budget.
+    """
+    
+    def __init__(self, quiet_interval: float = DETECTION_QUIET_INTERVAL, active_interval: float = DETECTION_ACTIVE_INTERVAL,
+                 burst_seconds: float = DETECTION_BURST_SECONDS, budget: DetectionBudget = detection_budget):
+        self.quiet_interval = quiet_interval
+        self.active_interval = active_interval
+        self.burst_seconds = burst_seconds
+        self.budget = budget
+        self.next_due = 0.0
+        self.last_motion = None
+        self.detections = 0
+    
+    @property
+    def active(self) -> bool:
+        return self.last_motion is not None and time.monotonic() - self.last_motion < self.burst_seconds
+    
+    @property
+    def interval(self) -> float:
+        base = self.active_interval if self.active else self.quiet_interval
+        return base * self.budget.factor()
+    
+    def should_detect(self) -> bool:
+        return time.monotonic() >= self.next_due
+    
+    def record(self, motion: bool):
+        """Register a detection result and schedule the next one"""
+        now = time.monotonic()
+        self.detections += 1
+        if motion:
+            self.last_motion = now
+        self.next_due = now + self.interval
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "mode": "active" if self.active else "quiet",
+            "interval": round(self.interval, 3),
+            "detections": self.detections
+        }
+
+# Motion detection models
+DETECTION_WORKERS = int(os.environ.get('DETECTION_WORKERS', 0)) or max(1, (os.cpu_count() or 2) // max(1, RECORDER_WORKERS))
+DETECTION_QUEUE_SIZE = int(os.environ.get('DETECTION_QUEUE_SIZE', 256))  # Frames waiting for a detection worker
+DETECTION_RESULT_TIMEOUT = 2.0  # Seconds a queued frame may take before its result is given up as dropped
+DETECTION_SCALE = 0.5  # Frames are downscaled before queueing (4x less pixels)
+BASIC_DETECTION_WIDTH = 320  # Max frame width for basic frame differencing
+MV_BLOCK_SIZE = 16  # Macroblock grid for motion-vector detection (full-resolution pixels)
+MV_MIN_MAGNITUDE = float(os.environ.get('MV_MIN_MAGNITUDE', 1.0))  # Pixels/frame for a macroblock to count as moving
+MAX_DETECTION_BOXES = 10  # Largest objects reported per detection
+
+class MotionDetector:
+    """
+    Per-camera motion detection model (background subtractor, reference frame and temporal
+    filter). Frames arrive already downscaled by DETECTION_SCALE and, when the camera has
+    detection zones, cropped to their bounding box (the region of interest). With
+    motion_algorithm="mv" the input is a macroblock motion-energy grid instead of pixels.
+    """
+    
+    def __init__(self, camera: Camera):
+        self.camera = camera
         self.bg_subtractor = None
         self.motion_buffer = deque(maxlen=5)  # Temporal filtering
+        self.reference_frame = None  # Background reference (float32) for basic frame differencing
+        self._zone_mask_cache = None
+        self._exclusion_mask_cache = None
+        self._roi_cache = None  # ((width, height), roi) for the last full frame size
+        self.last_detection = None  # Objects of the latest raw motion hit (see _describe)
+        self.origin = (0, 0)  # Full-resolution offset of the current crop
+        self.frame_size = None  # Full-resolution (width, height) of the current frame
+        self.lock = Lock()  # One frame at a time per camera model
         self._init_motion_detector()
-        
+    
     def _init_motion_detector(self):
         """Initialize motion detection algorithm based on camera settings"""
         if self.camera.motion_algorithm == "mog2":
@@ -426,127 +750,1261 @@ class CameraRecorder:
                 detectShadows=self.camera.detect_shadows
             )
             logger.info(f"Initialized KNN background subtractor for {self.camera.name}")
+        elif self.camera.motion_algorithm == "mv":
+            # Motion vectors come from the decoder; pixel frames (HTTP cameras) fall back to frame differencing
+            self.bg_subtractor = None
+            logger.info(f"Using codec motion vectors for {self.camera.name}")
         else:
             # Basic frame differencing
             self.bg_subtractor = None
             logger.info(f"Using basic frame differencing for {self.camera.name}")
     
-    def build_stream_url(self):
-        """Build stream URL with authentication"""
-        stream_url = self.camera.stream_url
+    @property
+    def last_raw_motion(self) -> bool:
+        """Unfiltered result of the latest frame"""
+        return bool(self.motion_buffer and self.motion_buffer[-1])
+    
+    def roi(self, width: int, height: int) -> Optional[tuple]:
+        """
+        Bounding box (x0, y0, x1, y1) of the detection zones in full-resolution pixels,
+        or None when there are no zones or they cover the whole frame
+        """
+        if self._roi_cache and self._roi_cache[0] == (width, height):
+            return self._roi_cache[1]
         
-        # For RTSP, inject credentials if provided
-        if self.camera.stream_type == "rtsp":
-            if self.camera.username and self.camera.password:
-                if '://' in stream_url:
-                    protocol, rest = stream_url.split('://', 1)
-                    stream_url = f"{protocol}://{self.camera.username}:{self.camera.password}@{rest}"
-            
-            # Add protocol option
-            if '?' in stream_url:
-                stream_url += f"&rtsp_transport={self.camera.protocol}"
+        roi = None
+        points = [p for zone in (self.camera.detection_zones or []) for p in zone.get('points', [])]
+        if points:
+            x0 = max(0, int(min(p['x'] for p in points)))
+            y0 = max(0, int(min(p['y'] for p in points)))
+            x1 = min(width, int(math.ceil(max(p['x'] for p in points))) + 1)
+            y1 = min(height, int(math.ceil(max(p['y'] for p in points))) + 1)
+            if x1 > x0 and y1 > y0 and (x1 - x0) * (y1 - y0) < width * height:
+                roi = (x0, y0, x1, y1)
+                logger.info(f"🎯 Detection ROI for {self.camera.name}: {x1 - x0}x{y1 - y0} at ({x0}, {y0}), "
+                            f"{(x1 - x0) * (y1 - y0) / (width * height):.0%} of the frame")
+        self._roi_cache = ((width, height), roi)
+        return roi
+    
+    def prepare(self, frame) -> tuple:
+        """Crop a full-resolution frame to the ROI and downscale it; returns (small_frame, view)"""
+        if frame.ndim == 2:
+            # Motion-energy grid: already tiny, zones are applied on the grid itself
+            rows, cols = frame.shape
+            return frame, (0, 0, cols * MV_BLOCK_SIZE, rows * MV_BLOCK_SIZE)
+        height, width = frame.shape[:2]
+        roi = self.roi(width, height)
+        x0, y0 = 0, 0
+        if roi:
+            x0, y0, x1, y1 = roi
+            frame = frame[y0:y1, x0:x1]
+        small_frame = cv2.resize(frame, (0, 0), fx=DETECTION_SCALE, fy=DETECTION_SCALE, interpolation=cv2.INTER_NEAREST)
+        return small_frame, (x0, y0, width, height)
+    
+    def detect(self, frame, view: Optional[tuple] = None) -> bool:
+        """Detect motion in frame using configured algorithm; view is (x0, y0, width, height) from prepare()"""
+        with self.lock:
+            if view:
+                self.origin, self.frame_size = view[:2], view[2:]
             else:
-                stream_url += f"?rtsp_transport={self.camera.protocol}"
+                self.origin = (0, 0)
+                self.frame_size = (int(frame.shape[1] / DETECTION_SCALE), int(frame.shape[0] / DETECTION_SCALE))
+            if frame.ndim == 2:
+                return self._detect_motion_vectors(frame)
+            if self.camera.motion_algorithm in ["mog2", "knn"]:
+                return self._detect_bg_subtraction(frame)
+            return self._detect_basic(frame)
+    
+    def _detect_bg_subtraction(self, frame) -> bool:
+        """Detect motion using MOG2 with optimizations for CPU"""
+        if frame is None:
+            return False
         
-        return stream_url
-    
-    def _create_video_capture_with_retry(self, stream_url, max_retries=3):
-        """Create VideoCapture with retry logic and timeouts"""
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Connecting to camera {self.camera.name} (attempt {attempt + 1}/{max_retries})...")
+        try:
+            # Frame was already cropped to the ROI and downscaled by the detection service (4x less pixels to process)
+            small_frame = frame
+            
+            # Apply background subtraction with learning rate
+            # learningRate = -1 (automatic), 0 (no learning), 0.001-0.01 (slow learning for static scenes)
+            # For video streams, use small learning rate to adapt slowly and reduce false positives
+            learning_rate = 0.001 if hasattr(self, 'motion_buffer') and len(self.motion_buffer) > 10 else -1
+            fg_mask = self.bg_subtractor.apply(small_frame, learningRate=learning_rate)
+            
+            # OPTIMIZATION 2: Simple threshold instead of morphological operations for speed
+            # Increase threshold to reduce noise sensitivity (200 -> 220)
+            _, fg_mask = cv2.threshold(fg_mask, 220, 255, cv2.THRESH_BINARY)
+            
+            # Apply morphological operations to reduce noise (remove small artifacts)
+            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)  # Remove small white noise
+            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)  # Fill small holes
+            
+            # Only count motion inside the detection zones (the crop is their bounding box)
+            if self.camera.detection_zones:
+                fg_mask = cv2.bitwise_and(fg_mask, self._zone_mask(fg_mask.shape, DETECTION_SCALE))
+            
+            # Apply exclusion zones mask if specified
+            if self.camera.excluded_zones:
+                exclusion_mask = self._exclusion_mask(fg_mask.shape, DETECTION_SCALE)
                 
-                cap = cv2.VideoCapture(stream_url)
+                # Log exclusion zones application (only log once per camera start)
+                if not hasattr(self, '_exclusion_logged'):
+                    logger.info(f"🚫 Applying {len(self.camera.excluded_zones)} exclusion zones for {self.camera.name}")
+                    self._exclusion_logged = True
                 
-                # Set aggressive timeouts for faster failure detection
-                cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.connection_timeout * 1000)
-                cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.frame_timeout * 1000)
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer
+                # Count motion pixels before and after exclusion for comparison
+                motion_pixels_before = cv2.countNonZero(fg_mask)
                 
-                # Test if connection works by reading a frame
-                start_time = time.time()
-                ret, frame = cap.read()
-                connection_time = time.time() - start_time
+                # Apply exclusion mask to foreground mask
+                fg_mask = cv2.bitwise_and(fg_mask, exclusion_mask)
                 
-                if ret and frame is not None:
-                    logger.info(f"✅ Connected to {self.camera.name} in {connection_time:.2f}s")
-                    self.error_count = 0
-                    self.consecutive_failures = 0
-                    self.last_successful_frame = time.time()
-                    return cap, frame
-                else:
-                    logger.warning(f"Failed to read initial frame from {self.camera.name}")
-                    cap.release()
-                    
-            except Exception as e:
-                logger.error(f"Connection attempt {attempt + 1} failed: {str(e)}")
+                motion_pixels_after = cv2.countNonZero(fg_mask)
+                
+                # Log if exclusion zones reduced motion pixels significantly
+                if motion_pixels_before > 0 and motion_pixels_after < motion_pixels_before * 0.8:
+                    pixels_removed = motion_pixels_before - motion_pixels_after
+                    if not hasattr(self, '_last_exclusion_log_time') or time.time() - self._last_exclusion_log_time > 10:
+                        logger.info(f"🚫 Exclusion zones filtered out {pixels_removed} motion pixels for {self.camera.name}")
+                        self._last_exclusion_log_time = time.time()
             
-            # Wait before retry (exponential backoff)
-            if attempt < max_retries - 1:
-                wait_time = min(2 ** attempt, 10)  # 1s, 2s, 4s, max 10s
-                logger.info(f"Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-        
-        # All attempts failed
-        self.consecutive_failures += 1
-        logger.error(f"❌ Failed to connect to {self.camera.name} after {max_retries} attempts")
-        return None, None
+            # OPTIMIZATION 3: Count non-zero pixels directly (faster than contours)
+            motion_pixels = cv2.countNonZero(fg_mask)
+            
+            # Convert area threshold to match resized frame (4x smaller at the default scale)
+            # Also apply motion_sensitivity: lower sensitivity = higher threshold
+            base_threshold = self.camera.min_object_area * DETECTION_SCALE ** 2
+            sensitivity_multiplier = 2.0 - self.camera.motion_sensitivity  # 0.5 sens -> 1.5x threshold, 1.0 sens -> 1.0x threshold
+            adjusted_threshold = base_threshold * sensitivity_multiplier
+            
+            # Temporal filtering with stricter requirements
+            motion_detected = motion_pixels > adjusted_threshold
+            self.motion_buffer.append(1 if motion_detected else 0)
+            
+            # Objects are only labelled on raw hits, quiet frames stay at countNonZero cost
+            self.last_detection = None
+            if motion_detected:
+                _, _, stats, centroids = cv2.connectedComponentsWithStats(fg_mask, connectivity=8)
+                self.last_detection = self._describe(stats, centroids, base_threshold, DETECTION_SCALE)
+            
+            # Require motion in at least 4 of last 5 frames (stricter than 3/5)
+            # This reduces false positives from video compression artifacts
+            temporal_motion = sum(self.motion_buffer) >= 4
+            
+            return temporal_motion
+            
+        except Exception as e:
+            logger.error(f"Error in motion detection: {str(e)}")
+            return False
     
-    def _adapt_quality_based_on_connection(self):
-        """Adapt streaming quality based on connection stability"""
-        if not self.adaptive_quality:
-            return
+    def _detect_motion_vectors(self, energy) -> bool:
+        """
+        Detect motion from a macroblock grid of mean motion-vector magnitude (pixels/frame).
+        Zones, min_object_area and the 4/5 temporal filter follow the background subtraction path.
+        """
+        scale = 1 / MV_BLOCK_SIZE
+        moving = np.where(energy >= MV_MIN_MAGNITUDE, 255, 0).astype(np.uint8)
         
-        time_since_last_frame = time.time() - self.last_successful_frame
+        if self.camera.detection_zones:
+            moving = cv2.bitwise_and(moving, self._zone_mask(moving.shape, scale))
+        if self.camera.excluded_zones:
+            moving = cv2.bitwise_and(moving, self._exclusion_mask(moving.shape, scale))
         
-        # Downgrade quality if connection is unstable
-        if time_since_last_frame > 10 and self.current_quality == "high":
-            self.current_quality = "medium"
-            logger.warning(f"Downgrading quality to MEDIUM for {self.camera.name}")
-        elif time_since_last_frame > 20 and self.current_quality == "medium":
-            self.current_quality = "low"
-            logger.warning(f"Downgrading quality to LOW for {self.camera.name}")
+        # Blobs of moving macroblocks, each at least min_object_area large (isolated codec noise drops out)
+        _, _, stats, centroids = cv2.connectedComponentsWithStats(moving, connectivity=8)
+        areas = stats[1:, cv2.CC_STAT_AREA] * MV_BLOCK_SIZE ** 2
+        motion_area = int(areas[areas >= self.camera.min_object_area].sum())
         
-        # Upgrade quality if connection is stable
-        elif time_since_last_frame < 2 and self.current_quality == "low":
-            self.current_quality = "medium"
-            logger.info(f"Upgrading quality to MEDIUM for {self.camera.name}")
-        elif time_since_last_frame < 1 and self.current_quality == "medium":
-            self.current_quality = "high"
-            logger.info(f"Upgrading quality to HIGH for {self.camera.name}")
-    
-    def _should_process_frame_for_motion(self):
-        """Determine if current frame should be processed for motion detection"""
-        # More aggressive frame skipping based on quality
-        if self.current_quality == "low":
-            return self.frame_counter % 6 == 0  # Process every 6th frame (was 4)
-        elif self.current_quality == "medium":
-            return self.frame_counter % 3 == 0  # Process every 3rd frame (was 2)
-        else:  # high quality
-            return self.frame_counter % 2 == 0  # Process every 2nd frame (was every frame)
-    
-    def start(self):
-        """Start recording thread"""
-        if self.recording_thread and self.recording_thread.is_alive():
-            return
+        sensitivity_multiplier = 2.0 - self.camera.motion_sensitivity
+        motion_detected = motion_area > self.camera.min_object_area * sensitivity_multiplier
+        self.motion_buffer.append(1 if motion_detected else 0)
+        self.last_detection = self._describe(stats, centroids, self.camera.min_object_area * scale ** 2, scale) if motion_detected else None
+        return sum(self.motion_buffer) >= 4
+    
+    def _detect_basic(self, frame) -> bool:
+        """
+        Basic motion detection by frame differencing on a small grayscale frame.
+        Box blur, one threshold and connectedComponentsWithStats replace Gaussian blur,
+        morphology and the per-contour Python loop; the background reference is kept
+        in its own float buffer.
+        """
+        # Work at BASIC_DETECTION_WIDTH of the full frame at most; scale maps full-resolution units to this frame.
+        # Nearest-neighbour resize before the color conversion is the cheapest order; the box blur smooths aliasing.
+        height, width = frame.shape[:2]
+        scale = DETECTION_SCALE
+        full_width = self.frame_size[0] * DETECTION_SCALE
+        if full_width > BASIC_DETECTION_WIDTH:
+            factor = BASIC_DETECTION_WIDTH / full_width
+            frame = cv2.resize(frame, (max(1, int(width * factor)), max(1, int(height * factor))), interpolation=cv2.INTER_NEAREST)
+            scale *= factor
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         
-        self.stop_event.clear()
-        self.recording_thread = Thread(target=self._record_loop, daemon=True)
-        self.recording_thread.start()
-    
-    def stop(self):
-        """Stop recording thread"""
-        self.stop_event.set()
-        if self.recording_thread:
-            self.recording_thread.join(timeout=5)
-    
-    def _get_http_mjpeg_frame(self, stream):
+        # Camera-specific blur size scaled to the detection frame (box filter, odd size)
+        blur_size = max(3, int(self.camera.blur_size * scale)) | 1
+        gray = cv2.blur(gray, (blur_size, blur_size))
+        
+        if self.reference_frame is None or self.reference_frame.shape != gray.shape:
+            self.reference_frame = gray.astype(np.float32)
+            return False
+        
+        # Frame differencing against the reference, then threshold with camera-specific value
+        frame_delta = cv2.absdiff(gray, cv2.convertScaleAbs(self.reference_frame))
+        _, thresh = cv2.threshold(frame_delta, self.camera.motion_threshold, 255, cv2.THRESH_BINARY)
+        
+        # Apply detection zones if specified
+        if self.camera.detection_zones:
+            thresh = cv2.bitwise_and(thresh, self._zone_mask(thresh.shape, scale))
+        
+        # Sum the areas of all blobs at least min_object_area large in one vectorised step
+        _, _, stats, centroids = cv2.connectedComponentsWithStats(thresh, connectivity=8)
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        min_area = self.camera.min_object_area * scale ** 2
+        significant_motion = int(areas[areas >= min_area].sum())
+        
+        # Calculate motion percentage of the full frame, so cropping to the ROI keeps the sensitivity
+        total_pixels = self.frame_size[0] * self.frame_size[1] * scale ** 2
+        motion_percentage = significant_motion / total_pixels
+        
+        # Update background gradually if no motion
+        threshold = 0.005 + (1 - self.camera.motion_sensitivity) * 0.015  # 0.005 to 0.02
+        
+        if motion_percentage < threshold:
+            # Gradually update background
+            cv2.accumulateWeighted(gray, self.reference_frame, 0.1)
+        else:
+            self.reference_frame[:] = gray
+        
+        # Temporal filtering
+        current_motion = motion_percentage > threshold
+        self.motion_buffer.append(current_motion)
+        self.last_detection = self._describe(stats, centroids, min_area, scale) if current_motion else None
+        
+        # Motion detected if present in at least 3 of last 5 frames
+        motion_count = sum(self.motion_buffer)
+        return motion_count >= 3
+    
+    def _describe(self, stats: np.ndarray, centroids: np.ndarray, min_area: float, scale: float) -> Dict[str, Any]:
+        """
+        Connected components of a motion mask in full-resolution pixels: boxes [x0, y0, x1, y1]
+        of objects at least min_area large (largest first), total moving area and the
+        area-weighted centroid of those objects (of all blobs when none is large enough)
+        """
+        stats, centroids = stats[1:], centroids[1:]
+        areas = stats[:, cv2.CC_STAT_AREA]
+        objects = areas >= min_area
+        weighted = objects if objects.any() else areas > 0
+        ox, oy = self.origin
+        
+        centroid = None
+        if weighted.any():
+            cx, cy = np.average(centroids[weighted], axis=0, weights=areas[weighted])
+            centroid = [int(cx / scale + ox), int(cy / scale + oy)]
+        
+        boxes = []
+        for index in np.argsort(-areas)[:MAX_DETECTION_BOXES]:
+            if not objects[index]:
+                break
+            x, y, w, h = stats[index, :4] / scale
+            boxes.append([int(x + ox), int(y + oy), int(x + w + ox), int(y + h + oy)])
+        
+        return {
+            "area": int(areas.sum() / scale ** 2),
+            "centroid": centroid,
+            "boxes": boxes,
+            "frame_size": list(self.frame_size)
+        }
+    
+    def _to_detection(self, x: float, y: float, scale: float) -> tuple:
+        """Map a full-resolution point into the (cropped, scaled) detection frame"""
+        return int((x - self.origin[0]) * scale), int((y - self.origin[1]) * scale)
+    
+    def _zone_mask(self, shape: tuple, scale: float) -> np.ndarray:
+        """Detection zones rasterised for the detection frame (cached per frame size and crop)"""
+        key = (shape, self.origin)
+        if self._zone_mask_cache is None or self._zone_mask_cache[0] != key:
+            mask = np.zeros(shape, dtype=np.uint8)
+            for zone in self.camera.detection_zones:
+                points = np.array([self._to_detection(p['x'], p['y'], scale) for p in zone['points']], dtype=np.int32)
+                cv2.fillPoly(mask, [points], 255)
+            self._zone_mask_cache = (key, mask)
+        return self._zone_mask_cache[1]
+    
+    def _exclusion_mask(self, shape: tuple, scale: float) -> np.ndarray:
+        """Exclusion zones rasterised (black) for the detection frame (cached per frame size and crop)"""
+        key = (shape, self.origin)
+        if self._exclusion_mask_cache is None or self._exclusion_mask_cache[0] != key:
+            mask = np.full(shape, 255, dtype=np.uint8)
+            for zone in self.camera.excluded_zones:
+                zone_type = zone.get('type', 'rect')
+                coords = zone.get('coordinates', {})
+                
+                if zone_type == 'rect':
+                    # Rectangle exclusion zone; coordinates are in original frame size
+                    x, y = self._to_detection(coords.get('x', 0), coords.get('y', 0), scale)
+                    w = int(coords.get('width', 0) * scale)
+                    h = int(coords.get('height', 0) * scale)
+                    cv2.rectangle(mask, (x, y), (x + w, y + h), 0, -1)
+                
+                elif zone_type == 'polygon':
+                    # Polygon exclusion zone
+                    points = coords.get('points', [])
+                    if points:
+                        scaled_points = np.array([self._to_detection(p[0], p[1], scale) for p in points], dtype=np.int32)
+                        cv2.fillPoly(mask, [scaled_points], 0)
+            self._exclusion_mask_cache = (key, mask)
+        return self._exclusion_mask_cache[1]
+    
+# Shared motion detection service
+class DetectionService:
+    """
+    Runs motion detection for all cameras on a fixed pool of worker threads sized to the
+    CPU cores (OpenCV releases the GIL), instead of inline in every capture thread.
+    Capture threads queue a downscaled frame and pick its result up later; per-camera models
+    live in a registry so each camera keeps its own background state. Queue wait and
+    processing time are tracked per camera.
+    """
+    
+    def __init__(self, num_workers: int = DETECTION_WORKERS, queue_size: int = DETECTION_QUEUE_SIZE):
+        self.num_workers = num_workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.models: Dict[str, MotionDetector] = {}
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.workers = []
+        self.lock = Lock()
+    
+    def _ensure_started(self):
+        if self.workers:
+            return
+        with self.lock:
+            if self.workers:
+                return
+            for index in range(self.num_workers):
+                worker = Thread(target=self._worker_loop, name=f"motion-detect-{index}", daemon=True)
+                worker.start()
+                self.workers.append(worker)
+            logger.info(f"Started {self.num_workers} motion detection workers")
+    
+    def register(self, camera: Camera) -> MotionDetector:
+        """Create (or replace) the model for a camera"""
+        model = MotionDetector(camera)
+        with self.lock:
+            self.models[camera.id] = model
+            self.metrics[camera.id] = {
+                "submitted": 0,
+                "processed": 0,
+                "dropped": 0,
+                "detection_pixels": 0,
+                "latency_ms": 0.0,
+                "processing_ms": 0.0,
+                "window_start": time.monotonic(),
+                "window_processed": 0,
+                "throughput_fps": 0.0
+            }
+        return model
+    
+    def unregister(self, camera_id: str, camera: Optional[Camera] = None):
+        """Drop a camera's model (only if it still belongs to `camera`, when given)"""
+        with self.lock:
+            model = self.models.get(camera_id)
+            if model and (camera is None or model.camera is camera):
+                self.models.pop(camera_id, None)
+                self.metrics.pop(camera_id, None)
+    
+    def submit(self, camera_id: str, frame) -> Optional[concurrent.futures.Future]:
+        """
+        Queue a frame without waiting; the future resolves to (motion, raw_motion, detection).
+        None when there is nothing to detect or the queue is full (counted as dropped).
+        """
+        metrics = self.metrics.get(camera_id)
+        if frame is None or metrics is None:
+            return None
+        self._ensure_started()
+        
+        model = self.models.get(camera_id)
+        if model is None:
+            return None
+        # Crop to the detection zones before downscaling so neither step touches pixels outside them
+        small_frame, view = model.prepare(frame)
+        result = concurrent.futures.Future()
+        metrics['submitted'] += 1
+        metrics['detection_pixels'] = small_frame.shape[0] * small_frame.shape[1]
+        
+        try:
+            self.queue.put_nowait((camera_id, small_frame, view, time.monotonic(), result))
+            return result
+        except queue.Full:
+            metrics['dropped'] += 1
+            return None
+    
+    def abandon(self, camera_id: str, result: concurrent.futures.Future):
+        """Give up on a frame that took longer than DETECTION_RESULT_TIMEOUT (skipped if still queued)"""
+        if result.cancel():
+            metrics = self.metrics.get(camera_id)
+            if metrics is not None:
+                metrics['dropped'] += 1
+    
+    def _worker_loop(self):
+        while True:
+            camera_id, frame, view, queued_at, result = self.queue.get()
+            if result.cancelled():
+                continue
+            model = self.models.get(camera_id)
+            if model is None:
+                result.set_result((False, False, None))
+                continue
+            
+            started = time.monotonic()
+            try:
+                motion = model.detect(frame, view)
+                outcome = (motion, model.last_raw_motion, model.last_detection)
+            except Exception as e:
+                logger.error(f"Motion detection failed for {model.camera.name}: {e}")
+                outcome = (False, False, None)
+            finished = time.monotonic()
+            
+            self._record(camera_id, queued_at, started, finished)
+            try:
+                result.set_result(outcome)
+            except concurrent.futures.InvalidStateError:
+                pass  # Abandoned by the capture thread meanwhile
+    
+    def _record(self, camera_id: str, queued_at: float, started: float, finished: float):
+        metrics = self.metrics.get(camera_id)
+        if metrics is None:
+            return
+        metrics['processed'] += 1
+        # Exponential moving averages keep the numbers stable without storing samples
+        metrics['latency_ms'] += 0.1 * ((finished - queued_at) * 1000 - metrics['latency_ms'])
+        metrics['processing_ms'] += 0.1 * ((finished - started) * 1000 - metrics['processing_ms'])
+        
+        metrics['window_processed'] += 1
+        elapsed = finished - metrics['window_start']
+        if elapsed >= 10:
+            metrics['throughput_fps'] = metrics['window_processed'] / elapsed
+            metrics['window_start'] = finished
+            metrics['window_processed'] = 0
+    
+    def camera_status(self, camera_id: str) -> Optional[Dict[str, Any]]:
+        metrics = self.metrics.get(camera_id)
+        if metrics is None:
+            return None
+        return {
+            "submitted": metrics['submitted'],
+            "processed": metrics['processed'],
+            "dropped": metrics['dropped'],
+            "detection_pixels": metrics['detection_pixels'],
+            "latency_ms": round(metrics['latency_ms'], 2),
+            "processing_ms": round(metrics['processing_ms'], 2),
+            "throughput_fps": round(metrics['throughput_fps'], 2)
+        }
+    
+    def get_status(self) -> Dict[str, Any]:
+        cameras = {}
+        for camera_id in list(self.metrics):
+            status = self.camera_status(camera_id)
+            if status is not None:
+                cameras[camera_id] = status
+        return {
+            "workers": self.num_workers,
+            "queue_depth": self.queue.qsize(),
+            "cameras": cameras
+        }
+
+detection_service = DetectionService()
+
+# Compressed-domain motion vectors
+def motion_vector_energy(frame) -> Optional[np.ndarray]:
+    """Motion-vector magnitude per macroblock of a PyAV frame decoded with +export_mvs (None for intra frames)"""
+    vectors = frame.side_data.get('MOTION_VECTORS')
+    if vectors is None:
+        return None
+    mvs = vectors.to_ndarray()
+    rows = -(-frame.height // MV_BLOCK_SIZE)
+    cols = -(-frame.width // MV_BLOCK_SIZE)
+    grid = np.zeros((rows, cols), dtype=np.float32)
+    if len(mvs):
+        magnitude = np.hypot(mvs['motion_x'], mvs['motion_y']) / np.maximum(mvs['motion_scale'], 1)
+        # Partitions smaller than a macroblock contribute by their share of its area
+        weight = mvs['w'].astype(np.float32) * mvs['h'] / MV_BLOCK_SIZE ** 2
+        r = np.clip(mvs['dst_y'] // MV_BLOCK_SIZE, 0, rows - 1)
+        c = np.clip(mvs['dst_x'] // MV_BLOCK_SIZE, 0, cols - 1)
+        np.add.at(grid, (r, c), magnitude * weight)
+    return grid
+
+class MotionVectorDecoder:
+    """
+    Decode leg for motion_algorithm="mv". PyAV decodes the stream with exported motion vectors
+    and without deblocking, accumulates mean vector magnitude per macroblock and writes BGR frames
+    at `fps` into a pipe, so it stands in for the ffmpeg decode process (stdout/kill).
+    The write end is non-blocking and only touched under `pipe_lock`, so kill() can always close it.
+    """
+    
+    def __init__(self, name: str, stream_url: str, width: int, height: int, fps: float = 5):
+        self.name = name
+        self.stream_url = stream_url
+        self.width = width
+        self.height = height
+        self.fps = fps
+        read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._write_fd, False)
+        self.stdout = os.fdopen(read_fd, 'rb')
+        self.stop_event = Event()
+        self.lock = Lock()
+        self.pipe_lock = Lock()
+        self._energy = None  # Sum of per-frame magnitude grids since the last take_energy()
+        self._frames = 0
+        self.thread = Thread(target=self._run, name="mv-decoder", daemon=True)
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def kill(self):
+        """Stop decoding and close the write end: the reader gets EOF now, not when PyAV next returns"""
+        self.stop_event.set()
+        self._close_pipe()
+    
+    def _close_pipe(self):
+        with self.pipe_lock:
+            if self._write_fd is not None:
+                os.close(self._write_fd)
+                self._write_fd = None
+    
+    def _write(self, data: bytes):
+        """Write one frame, waiting for the reader in short polls so kill() never waits on a full pipe"""
+        view = memoryview(data)
+        while view:
+            if self.stop_event.is_set():
+                raise BrokenPipeError  # Killed
+            with self.pipe_lock:
+                if self._write_fd is None:
+                    raise BrokenPipeError
+                poller = select.poll()
+                poller.register(self._write_fd, select.POLLOUT)
+                if poller.poll(200):
+                    try:
+                        view = view[os.write(self._write_fd, view):]
+                    except BlockingIOError:
+                        pass
+    
+    def take_energy(self) -> Optional[np.ndarray]:
+        """Mean macroblock magnitude over the frames decoded since the previous call"""
+        with self.lock:
+            energy, frames = self._energy, self._frames
+            self._energy, self._frames = None, 0
+        if energy is None:
+            return None
+        return energy / frames
+    
+    def _accumulate(self, frame):
+        grid = motion_vector_energy(frame)
+        if grid is None:
+            return
+        with self.lock:
+            if self._energy is None or self._energy.shape != grid.shape:
+                self._energy, self._frames = grid, 1
+            else:
+                self._energy += grid
+                self._frames += 1
+    
+    def _run(self):
+        container = None
+        try:
+            options = {'rtsp_transport': 'tcp'} if self.stream_url.startswith('rtsp://') else {}
+            container = av.open(self.stream_url, options=options, timeout=PROBE_TIMEOUT_SECONDS)
+            stream = container.streams.video[0]
+            stream.codec_context.options = {'flags2': '+export_mvs', 'skip_loop_filter': 'all'}
+            
+            next_output = 0.0
+            for frame in container.decode(stream):
+                if self.stop_event.is_set():
+                    break
+                self._accumulate(frame)
+                
+                now = time.monotonic()
+                if now >= next_output:
+                    next_output = now + 1 / self.fps
+                    image = frame.reformat(width=self.width, height=self.height, format='bgr24').to_ndarray()
+                    self._write(image.tobytes())
+        except BrokenPipeError:
+            pass  # Reader closed or killed
+        except Exception as e:
+            if not self.stop_event.is_set():
+                logger.warning(f"⚠️ Motion vector decoder failed for {self.name}: {e}")
+        finally:
+            if container:
+                container.close()
+            self._close_pipe()  # EOF for the reader
+
+# Motion event tracks
+MOTION_HEATMAP_COLS = 32
+MOTION_HEATMAP_ROWS = 18
+MOTION_TRACK_POINTS = 50  # Centroid path samples kept per event
+MOTION_TRACK_LOOKBACK = 50  # Raw detections kept before an event starts (covers min_motion_duration)
+
+class MotionTrack:
+    """Aggregates the detections of one motion event into a track summary and a coarse heatmap"""
+    
+    def __init__(self):
+        self.heat = np.zeros((MOTION_HEATMAP_ROWS, MOTION_HEATMAP_COLS), dtype=np.float32)
+        self.points = []  # (timestamp, cx, cy)
+        self.start = None
+        self.end = None
+        self.detections = 0
+        self.total_area = 0
+        self.max_area = 0
+        self.bbox = None  # Union of all boxes [x0, y0, x1, y1]
+        self.frame_size = None
+    
+    def add(self, timestamp: float, detection: Dict[str, Any]):
+        width, height = detection['frame_size']
+        self.frame_size = (width, height)
+        self.start = self.start or timestamp
+        self.end = timestamp
+        self.detections += 1
+        self.total_area += detection['area']
+        self.max_area = max(self.max_area, detection['area'])
+        
+        if detection['centroid']:
+            self.points.append((timestamp, *detection['centroid']))
+        
+        sx, sy = MOTION_HEATMAP_COLS / width, MOTION_HEATMAP_ROWS / height
+        for x0, y0, x1, y1 in detection['boxes']:
+            self.heat[int(y0 * sy):max(int(y0 * sy) + 1, math.ceil(y1 * sy)),
+                      int(x0 * sx):max(int(x0 * sx) + 1, math.ceil(x1 * sx))] += 1
+            if self.bbox is None:
+                self.bbox = [x0, y0, x1, y1]
+            else:
+                self.bbox = [min(self.bbox[0], x0), min(self.bbox[1], y0), max(self.bbox[2], x1), max(self.bbox[3], y1)]
+    
+    def summary(self) -> Dict[str, Any]:
+        """Track summary stored on the MotionEvent; path is [[seconds from start, x, y], ...]"""
+        step = max(1, math.ceil(len(self.points) / MOTION_TRACK_POINTS))
+        return {
+            "start": datetime.fromtimestamp(self.start, timezone.utc).isoformat(),
+            "end": datetime.fromtimestamp(self.end, timezone.utc).isoformat(),
+            "duration": round(self.end - self.start, 1),
+            "detections": self.detections,
+            "max_area": self.max_area,
+            "mean_area": int(self.total_area / self.detections),
+            "bbox": self.bbox,
+            "frame_width": self.frame_size[0],
+            "frame_height": self.frame_size[1],
+            "path": [[round(t - self.start, 1), x, y] for t, x, y in self.points[::step]]
+        }
+    
+    def heatmap(self) -> List[List[int]]:
+        """Box coverage per cell, normalised to 0-255"""
+        peak = self.heat.max()
+        if peak <= 0:
+            return self.heat.astype(np.uint8).tolist()
+        return (self.heat * (255 / peak)).astype(np.uint8).tolist()
+
+# Motion activity index
+ACTIVITY_RESOLUTION_SECONDS = int(os.environ.get('ACTIVITY_RESOLUTION_SECONDS', 10))  # Slot size, divides an hour
+ACTIVITY_FLUSH_SECONDS = int(os.environ.get('ACTIVITY_FLUSH_SECONDS', 60))  # How often pending slots are written
+ACTIVITY_MAX_BUCKETS = 5000  # Upper bound for the points returned by the activity endpoint
+
+def activity_level(detection: Optional[Dict[str, Any]]) -> int:
+    """Motion energy of one detection, 0-255 (square root of the moving fraction of the frame)"""
+    if not detection or not detection['area']:
+        return 0
+    width, height = detection['frame_size']
+    fraction = min(1.0, detection['area'] / max(1, width * height))
+    return max(1, int(math.sqrt(fraction) * 255))
+
+class ActivityIndex:
+    """
+    Per-camera motion-energy series in `motion_activity`: one document per camera per hour
+    with a packed byte array of 3600 / ACTIVITY_RESOLUTION_SECONDS slots (max level per slot).
+    Recorders write into memory; a thread flushes dirty hours with one bulk write. Runs in
+    whichever process hosts the recorders.
+    """
+    
+    def __init__(self, resolution: int = ACTIVITY_RESOLUTION_SECONDS, flush_seconds: int = ACTIVITY_FLUSH_SECONDS):
+        self.resolution = resolution
+        self.slots = 3600 // resolution
+        self.flush_seconds = flush_seconds
+        self.buckets = {}  # (camera_id, hour start epoch) -> np.uint8 array
+        self.dirty = set()
+        self.merged = set()  # Buckets already combined with what the database had (recorder restarts)
+        self.lock = Lock()
+        self.thread = None
+        self.client = None
+    
+    def record(self, camera_id: str, level: int, timestamp: Optional[float] = None):
+        if level <= 0:
+            return
+        timestamp = timestamp or time.time()
+        hour = int(timestamp // 3600 * 3600)
+        slot = int(timestamp - hour) // self.resolution
+        with self.lock:
+            values = self.buckets.get((camera_id, hour))
+            if values is None:
+                values = self.buckets[(camera_id, hour)] = np.zeros(self.slots, dtype=np.uint8)
+            if level > values[slot]:
+                values[slot] = level
+                self.dirty.add((camera_id, hour))
+            if self.thread is None:
+                self.thread = Thread(target=self._flush_loop, name="activity-flush", daemon=True)
+                self.thread.start()
+    
+    def pending(self, camera_id: str) -> Dict[int, np.ndarray]:
+        """Unflushed hours of a camera in this process"""
+        with self.lock:
+            return {hour: values.copy() for (cam, hour), values in self.buckets.items() if cam == camera_id}
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing motion activity: {str(e)}")
+    
+    def flush(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            batch = {key: self.buckets[key].copy() for key in dirty}
+        if not batch:
+            return
+        
+        try:
+            merged = self._write(batch)
+        except Exception:
+            # Retry the whole batch on the next flush (and merge with the database again)
+            with self.lock:
+                self.dirty |= batch.keys()
+            raise
+        with self.lock:
+            self.merged |= merged
+        
+        # Keep the current and previous hour in memory, older ones are final
+        cutoff = int(time.time() // 3600 * 3600) - 3600
+        with self.lock:
+            for key in [key for key in self.buckets if key[1] < cutoff and key not in self.dirty]:
+                del self.buckets[key]
+                self.merged.discard(key)
+
+    def _write(self, batch: Dict[tuple, np.ndarray]) -> set:
+        """Upsert a batch of hours; returns the keys combined with what the database had"""
+        if self.client is None:
+            from pymongo import MongoClient
+            self.client = MongoClient(os.getenv('MONGO_URL', 'mongodb://localhost:27017'))
+        collection = self.client[os.getenv('DB_NAME', 'video_surveillance')].motion_activity
+        
+        merged = set()
+        operations = []
+        for (camera_id, hour), values in batch.items():
+            hour_iso = datetime.fromtimestamp(hour, timezone.utc).isoformat()
+            if (camera_id, hour) not in self.merged:
+                existing = collection.find_one({"camera_id": camera_id, "hour": hour_iso}, {"_id": 0, "values": 1, "resolution": 1})
+                if existing and existing.get('resolution') == self.resolution:
+                    stored = np.frombuffer(existing['values'], dtype=np.uint8)
+                    values = np.maximum(values, stored[:self.slots])
+                    with self.lock:
+                        bucket = self.buckets.get((camera_id, hour))
+                        if bucket is not None:
+                            np.maximum(bucket, values, out=bucket)
+                merged.add((camera_id, hour))
+            operations.append(UpdateOne(
+                {"camera_id": camera_id, "hour": hour_iso},
+                {"$set": {"resolution": self.resolution, "values": values.tobytes()}},
+                upsert=True
+            ))
+        collection.bulk_write(operations, ordered=False)
+        return merged
+
+activity_index = ActivityIndex()
+
+# End-to-end latency histograms
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)  # Upper bounds, seconds
+LATENCY_STAGES = (
+    "detection",          # Frame read -> detection result
+    "state_transition",   # Trigger frame read -> motion event started
+    "event_persisted",    # Trigger frame read -> motion event written to MongoDB
+    "clip_finalised",     # Last motion -> recording document written (includes post-recording)
+    "transcode_wait",     # Clip closed -> H.264 conversion started
+    "transcode",          # H.264 conversion
+    "notification_send",  # Telegram API call
+    "alert",              # Trigger frame read -> Telegram notification delivered
+)
+
+class LatencyHistograms:
+    """
+    Latency histograms with fixed buckets (Prometheus layout), keyed by camera id (or route)
+    and stage. Recorder threads observe stage durations; worker processes ship their
+    snapshots with recorder status.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[str, Dict[str, Dict[str, Any]]] = {}  # key -> stage -> histogram
+        self.lock = Lock()
+
+    def observe(self, key: str, stage: str, seconds: float):
+        seconds = max(0.0, seconds)
+        index = bisect.bisect_left(self.buckets, seconds)  # Last slot is +Inf
+        with self.lock:
+            stages = self.histograms.setdefault(key, {})
+            histogram = stages.get(stage)
+            if histogram is None:
+                histogram = stages[stage] = {"counts": [0] * (len(self.buckets) + 1), "count": 0, "sum": 0.0}
+            histogram['counts'][index] += 1
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+
+    def snapshot(self, key: Optional[str] = None) -> Dict[str, Any]:
+        """Copy of the histograms (of one key, when given)"""
+        with self.lock:
+            if key is not None:
+                return {stage: {**h, "counts": list(h['counts'])} for stage, h in self.histograms.get(key, {}).items()}
+            return {
+                k: {stage: {**h, "counts": list(h['counts'])} for stage, h in stages.items()}
+                for k, stages in self.histograms.items()
+            }
+
+    def remove(self, key: str):
+        with self.lock:
+            self.histograms.pop(key, None)
+
+    def quantile(self, histogram: Dict[str, Any], q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not histogram['count']:
+            return None
+        rank = q * histogram['count']
+        seen = 0
+        for index, count in enumerate(histogram['counts']):
+            if count and seen + count >= rank:
+                if index >= len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summarize(self, stages: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        summary = {}
+        for stage in sorted(stages, key=lambda s: LATENCY_STAGES.index(s) if s in LATENCY_STAGES else len(LATENCY_STAGES)):
+            histogram = stages[stage]
+            count = histogram['count']
+            summary[stage] = {
+                "count": count,
+                "mean_s": round(histogram['sum'] / count, 3) if count else None,
+                "p50_s": round(self.quantile(histogram, 0.5), 3) if count else None,
+                "p95_s": round(self.quantile(histogram, 0.95), 3) if count else None,
+                "counts": histogram['counts']
+            }
+        return summary
+
+latency_histograms = LatencyHistograms()
+
+# Hot-path timers and sampling profiler
+PROFILE_MAX_SECONDS = 120
+PROFILE_INTERVAL = 0.01  # Seconds between stack samples
+
+class HotPathTimers:
+    """
+    Always-on per-camera timers around hot paths (motion detection, JPEG encoding, frame
+    reads): call count, total and max seconds. Two perf_counter calls and a locked dict
+    update per call, cheap enough to never switch off.
+    """
+
+    def __init__(self):
+        self.timers: Dict[str, Dict[str, list]] = {}  # camera_id -> name -> [count, total, max]
+        self.lock = Lock()
+
+    def record(self, camera_id: str, name: str, seconds: float):
+        with self.lock:
+            timer = self.timers.setdefault(camera_id, {}).get(name)
+            if timer is None:
+                timer = self.timers[camera_id][name] = [0, 0.0, 0.0]
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+    @contextmanager
+    def time(self, camera_id: str, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(camera_id, name, time.perf_counter() - started)
+
+    def snapshot(self, camera_id: Optional[str] = None) -> Dict[str, Any]:
+        """{name: {count, total_s, max_s}} of one camera, or of all cameras keyed by id"""
+        def export(timers):
+            return {name: {"count": t[0], "total_s": t[1], "max_s": t[2]} for name, t in timers.items()}
+        with self.lock:
+            if camera_id is not None:
+                return export(self.timers.get(camera_id, {}))
+            return {cam: export(timers) for cam, timers in self.timers.items()}
+
+    def remove(self, camera_id: str):
+        with self.lock:
+            self.timers.pop(camera_id, None)
+
+hot_path_timers = HotPathTimers()
+
+def encode_jpeg(camera_id: str, frame, quality: int):
+    """cv2.imencode to JPEG, timed per camera"""
+    with hot_path_timers.time(camera_id, "imencode"):
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer
+
+def sample_stacks(seconds: float, interval: float = PROFILE_INTERVAL, thread_filter: Optional[str] = None) -> Dict[str, int]:
+    """
+    Statistical profile of the threads of this process: samples sys._current_frames() every
+    `interval` seconds and counts collapsed stacks ("thread;outer;...;inner"), the input
+    format of flamegraph.pl and speedscope. Threads blocked in I/O are sampled as well.
+    """
+    stacks = Counter()
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident, f"thread-{ident}")
+            if ident == me or (thread_filter and thread_filter not in name):
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            parts.append(name.replace(";", ":"))
+            stacks[";".join(reversed(parts))] += 1
+        time.sleep(interval)
+    return dict(stacks)
+
+# Recorder counters
+class RecorderCounters:
+    """
+    Cumulative counters of one recorder for /metrics, plus frame rates over the interval
+    between snapshots (at least RATE_WINDOW seconds). Incremented without locking from the
+    capture and writer threads.
+    """
+    RATE_WINDOW = 5.0
+    RATES = {"frames_received": "fps_in", "frames_decoded": "decode_fps", "frames_written": "fps_out"}
+    COUNTERS = ("frames_received", "bytes_received", "frames_decoded", "frames_written", "bytes_written", "reconnects",
+                "record_restarts", "decode_restarts")
+
+    def __init__(self):
+        self.frames_received = 0  # Frames read from the camera (RTSP copy streams are counted in bytes)
+        self.bytes_received = 0
+        self.frames_decoded = 0  # Frames decoded to pixels for detection and live view
+        self.frames_written = 0  # Frames encoded into recordings
+        self.bytes_written = 0
+        self.reconnects = 0
+        self.record_restarts = 0  # Record leg restarted by the ingest watchdog or after it exited
+        self.decode_restarts = 0
+        self.transcodes_running = 0  # H.264 conversions in progress (each runs in its own thread)
+        self.window_start = time.monotonic()
+        self.window_counts = {name: 0 for name in self.RATES}
+        self.rates = {rate: 0.0 for rate in self.RATES.values()}
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        elapsed = now - self.window_start
+        if elapsed >= self.RATE_WINDOW:
+            for name, rate in self.RATES.items():
+                value = getattr(self, name)
+                self.rates[rate] = round((value - self.window_counts[name]) / elapsed, 2)
+                self.window_counts[name] = value
+            self.window_start = now
+        return {
+            **{name: getattr(self, name) for name in self.COUNTERS},
+            "transcodes_running": self.transcodes_running,
+            **self.rates
+        }
+
+# Ingest watchdog
+INGEST_STALL_SECONDS = float(os.environ.get('INGEST_STALL_SECONDS', 10))  # A pipeline leg silent for this long is restarted
+INGEST_MAX_RECORD_RESTARTS = 5  # Record leg restarts without data before the whole pipeline reconnects (with backoff)
+INGEST_MIN_GAP_SECONDS = 1.0  # Shorter interruptions are not stored as gaps
+
+class IngestLeg:
+    """
+    One process of the dual RTSP pipeline (record copy or decode) and when it last delivered
+    data. The watchdog kills a silent leg; its reader then restarts only that leg.
+    """
+    
+    def __init__(self, name: str, start_process, max_restarts: Optional[int] = None):
+        self.name = name
+        self.start_process = start_process
+        self.max_restarts = max_restarts  # None = keep restarting
+        self.process = None
+        self.last_data = time.monotonic()
+        self.restarts = 0  # Consecutive restarts since data last arrived
+        self.stall_reason = None  # Set when the watchdog killed the current process
+        self.closed = False
+    
+    def start(self):
+        self.process = self.start_process()
+        self.last_data = time.monotonic()
+        self.stall_reason = None
+        return self.process
+    
+    def mark(self):
+        """Data arrived"""
+        self.last_data = time.monotonic()
+        self.restarts = 0
+    
+    def kill(self):
+        process = self.process
+        if process is None:
+            return
+        try:
+            process.kill()
+            if isinstance(process, subprocess.Popen):
+                process.wait(timeout=5)
+        except Exception:
+            pass
+    
+    def restart(self) -> bool:
+        """Replace the process; False when the leg is closed or out of restarts"""
+        self.kill()
+        if self.closed or (self.max_restarts is not None and self.restarts >= self.max_restarts):
+            return False
+        self.restarts += 1
+        self.start()
+        return True
+    
+    def close(self):
+        self.closed = True
+        self.kill()
+
+class IngestWatchdog:
+    """
+    Kills legs of a dual ffmpeg pipeline that delivered nothing for `deadline` seconds, so a
+    stalled RTSP session cannot hang a blocking read, and unblocks all legs when the recorder stops.
+    """
+    
+    def __init__(self, name: str, legs: List[IngestLeg], stop_event: Event, deadline: float = INGEST_STALL_SECONDS):
+        self.name = name
+        self.legs = legs
+        self.stop_event = stop_event
+        self.deadline = deadline
+        self.done = Event()
+        self.thread = Thread(target=self._run, name=f"ingest-watchdog-{name}", daemon=True)
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.done.set()
+    
+    def _run(self):
+        while not self.done.wait(1.0):
+            if self.stop_event.is_set():
+                for leg in self.legs:
+                    leg.close()
+                return
+            now = time.monotonic()
+            for leg in self.legs:
+                silent = now - leg.last_data
+                if leg.stall_reason is None and not leg.closed and silent > self.deadline:
+                    logger.warning(f"⏱️ {leg.name} leg of {self.name} stalled ({silent:.0f}s without data), restarting it")
+                    leg.stall_reason = "stalled"
+                    leg.kill()
+
+# Camera Recorder Class
+class CameraRecorder:
+    def __init__(self, camera: Camera):
+        self.camera = camera
+        self.stop_event = Event()
+        self.connected_event = Event()  # Set once the first data arrives from the camera
+        self.recording_thread = None
+        self.current_recording = None
+        self.last_frame = None
+        
+        # Motion detection with pre/post recording
+        self.pre_record_buffer = deque()  # Circular buffer for pre-recording: (capture time, decoded frame)
+        self.raw_buffer = deque()  # Buffer for raw H.264 packets (for efficient recording): (receive time, chunk)
+        self.motion_writer = None
+        self.motion_file_path = None
+        self.motion_state = "idle"  # idle, recording, cooldown
+        self.last_motion_time = None
+        self.motion_start_time = None
+        self.motion_start_time_dt = None  # For Telegram notification
+        self.motion_end_time = None
+        self.motion_first_detected_time = None  # Track when motion was first detected (before min_duration check)
+        self.detection_cadence = DetectionCadence()  # When to run detection (adaptive to activity and CPU budget)
+        self.mv_decoder = None  # MotionVectorDecoder when motion_algorithm="mv" on an RTSP stream
+        self.recent_detections = deque(maxlen=MOTION_TRACK_LOOKBACK)  # (time, detection) before an event starts
+        self.motion_track = None  # MotionTrack of the current motion event
+        self.motion_event_id = None
+        self.pending_detection = None  # (future, frame read time, queued at) of the frame being detected
+        self.motion_result = False  # Last applied detection result, held until the next one arrives
+        self.last_frame_read_at = None  # Read time of the frame whose detection result was applied last
+        self.motion_trigger_at = None  # Read time of the frame that started the current motion event
+        
+        # Error handling and reconnection
+        self.error_count = 0
+        self.max_errors = 10  # Stop after 10 consecutive errors
+        self.reconnect_delay = 5  # Start with 5 seconds
+        self.max_reconnect_delay = 300  # Max 5 minutes
+        self.consecutive_failures = 0
+        self.last_successful_frame = time.time()
+        self.ingest_gaps = {}  # Pipeline leg -> (start time, reason) of an ongoing outage
+        
+        # Connection resilience
+        self.connection_timeout = 10  # Seconds to wait for connection
+        self.frame_timeout = 5  # Seconds to wait for frame
+        self.max_retry_attempts = 3  # Retry attempts before giving up
+        self.adaptive_quality = True  # Enable adaptive quality
+        self.current_quality = "high"  # high, medium, low
+        
+        # Performance optimization
+        self.frame_counter = 0
+        self.counters = RecorderCounters()  # Frame/byte/reconnect totals for /metrics
+        
+        # H.264 conversion settings
+        self.enable_h264_conversion = True  # Set to False to disable conversion
+        self.conversion_queue = []  # Queue for async conversion
+        
+        # Preview collectors and write trackers for recordings being written (keyed by file path)
+        self.previews = {}
+        self.recording_trackers = {}
+        
+    def build_stream_url(self):
+        """Build stream URL with authentication"""
+        stream_url = self.camera.stream_url
+        
+        # For RTSP, inject credentials if provided
+        if self.camera.stream_type == "rtsp":
+            if self.camera.username and self.camera.password:
+                if '://' in stream_url:
+                    protocol, rest = stream_url.split('://', 1)
+                    stream_url = f"{protocol}://{self.camera.username}:{self.camera.password}@{rest}"
+            
+            # Add protocol option
+            if '?' in stream_url:
+                stream_url += f"&rtsp_transport={self.camera.protocol}"
+            else:
+                stream_url += f"?rtsp_transport={self.camera.protocol}"
+        
+        return stream_url
+    
+    def _create_video_capture_with_retry(self, stream_url, max_retries=3):
+        """Create VideoCapture with retry logic and timeouts"""
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"Connecting to camera {self.camera.name} (attempt {attempt + 1}/{max_retries})...")
+                
+                cap = cv2.VideoCapture(stream_url)
+                
+                # Set aggressive timeouts for faster failure detection
+                cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, self.connection_timeout * 1000)
+                cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, self.frame_timeout * 1000)
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer
+                
+                # Test if connection works by reading a frame
+                start_time = time.time()
+                ret, frame = cap.read()
+                connection_time = time.time() - start_time
+                
+                if ret and frame is not None:
+                    logger.info(f"✅ Connected to {self.camera.name} in {connection_time:.2f}s")
+                    self.error_count = 0
+                    self.consecutive_failures = 0
+                    self.last_successful_frame = time.time()
+                    return cap, frame
+                else:
+                    logger.warning(f"Failed to read initial frame from {self.camera.name}")
+                    cap.release()
+                    
+            except Exception as e:
+                logger.error(f"Connection attempt {attempt + 1} failed: {str(e)}")
+            
+            # Wait before retry (exponential backoff)
+            if attempt < max_retries - 1:
+                wait_time = min(2 ** attempt, 10)  # 1s, 2s, 4s, max 10s
+                logger.info(f"Retrying in {wait_time}s...")
+                time.sleep(wait_time)
+        
+        # All attempts failed
+        self.consecutive_failures += 1
+        logger.error(f"❌ Failed to connect to {self.camera.name} after {max_retries} attempts")
+        return None, None
+    
+    def _adapt_quality_based_on_connection(self):
+        """Adapt streaming quality based on connection stability"""
+        if not self.adaptive_quality:
+            return
+        
+        time_since_last_frame = time.time() - self.last_successful_frame
+        
+        # Downgrade quality if connection is unstable
+        if time_since_last_frame > 10 and self.current_quality == "high":
+            self.current_quality = "medium"
+            logger.warning(f"Downgrading quality to MEDIUM for {self.camera.name}")
+        elif time_since_last_frame > 20 and self.current_quality == "medium":
+            self.current_quality = "low"
+            logger.warning(f"Downgrading quality to LOW for {self.camera.name}")
+        
+        # Upgrade quality if connection is stable
+        elif time_since_last_frame < 2 and self.current_quality == "low":
+            self.current_quality = "medium"
+            logger.info(f"Upgrading quality to MEDIUM for {self.camera.name}")
+        elif time_since_last_frame < 1 and self.current_quality == "medium":
+            self.current_quality = "high"
+            logger.info(f"Upgrading quality to HIGH for {self.camera.name}")
+    
+    @property
+    def is_recording(self) -> bool:
+        return self.current_recording is not None or self.motion_writer is not None
+    
+    def buffer_bytes(self) -> int:
+        """Memory held by the pre-recording buffers (raw packets and decoded frames)"""
+        raw = sum(len(chunk) for _, chunk in list(self.raw_buffer))
+        decoded = sum(frame.nbytes for _, frame in list(self.pre_record_buffer))
+        return raw + decoded
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Counters and gauges exported by /metrics"""
+        detection = detection_service.metrics.get(self.camera.id) or {}
+        return {
+            **self.counters.snapshot(),
+            "connected": self.connected_event.is_set(),
+            "motion_state": self.motion_state,
+            "error_count": self.error_count,
+            "buffer_bytes": self.buffer_bytes(),
+            "detection_ms": round(detection.get('processing_ms', 0.0), 2),
+            "detection_latency_ms": round(detection.get('latency_ms', 0.0), 2),
+            "detection_dropped": detection.get('dropped', 0)
+        }
+    
+    def start(self):
+        """Start recording thread"""
+        if self.recording_thread and self.recording_thread.is_alive():
+            return
+        
+        self.stop_event.clear()
+        if self.camera.motion_detection:
+            detection_service.register(self.camera)
+        self.recording_thread = Thread(target=self._record_loop, name=f"recorder-{self.camera.name}", daemon=True)
+        self.recording_thread.start()
+    
+    def stop(self):
+        """Stop recording thread"""
+        self.stop_event.set()
+        if self.recording_thread:
+            self.recording_thread.join(timeout=5)
+        detection_service.unregister(self.camera.id, self.camera)
+        # An outage still open when the recorder stops ends here
+        for leg_name, (started, reason) in list(self.ingest_gaps.items()):
+            self._save_ingest_gap_sync(leg_name, started, time.time(), reason)
+        self.ingest_gaps.clear()
+    
+    def _get_http_mjpeg_frame(self, stream):
         """Extract frame from MJPEG stream"""
         bytes_data = bytes()
         for chunk in stream.iter_content(chunk_size=1024):
             bytes_data += chunk
             a = bytes_data.find(b'\xff\xd8')  # JPEG start
-            b = bytes_data.find(b'\xff\xd9')  # JPEG end
+            b = bytes_data.find(b'\xff\xd9', a + 2) if a != -1 else -1  # JPEG end (of this frame, not a partial one before it)
             if a != -1 and b != -1:
                 jpg = bytes_data[a:b+2]
                 bytes_data = bytes_data[b+2:]
@@ -571,7 +2029,11 @@ class CameraRecorder:
     
     def _record_loop(self):
         """Main recording loop with smart reconnection"""
+        attempts = 0
         while not self.stop_event.is_set():
+            if attempts:
+                self.counters.reconnects += 1
+            attempts += 1
             try:
                 success = False
                 
@@ -586,6 +2048,8 @@ class CameraRecorder:
                     time.sleep(5)
                     continue
                 
+                self._drop_closed_recordings()
+                
                 if success:
                     # Reset error count on success
                     self.error_count = 0
@@ -610,6 +2074,7 @@ class CameraRecorder:
                     
             except Exception as e:
                 logger.error(f"Error in recording loop for camera {self.camera.name}: {str(e)}")
+                self._drop_closed_recordings()
                 self.error_count += 1
                 
                 if self.error_count >= self.max_errors:
@@ -675,38 +2140,56 @@ class CameraRecorder:
             decode_cmd.insert(1, '-rtsp_transport')
             decode_cmd.insert(2, 'tcp')
         
-        try:
-            # Start both processes
-            record_process = subprocess.Popen(
+        # stderr is never read: a full stderr pipe would block ffmpeg
+        def start_record_process():
+            return subprocess.Popen(
                 record_cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 bufsize=10**8
             )
-            
-            decode_process = subprocess.Popen(
+        
+        def start_decode_process():
+            if self.camera.motion_detection and self.camera.motion_algorithm == "mv":
+                # Motion vectors from PyAV instead of a pixel decode for detection
+                self.mv_decoder = MotionVectorDecoder(
+                    self.camera.name, stream_url, self.camera.resolution_width or 640, self.camera.resolution_height or 480
+                ).start()
+                return self.mv_decoder
+            return subprocess.Popen(
                 decode_cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 bufsize=10**8
             )
+        
+        record_leg = IngestLeg("record", start_record_process, max_restarts=INGEST_MAX_RECORD_RESTARTS)
+        decode_leg = IngestLeg("decode", start_decode_process)
+        try:
+            # Start both processes
+            record_leg.start()
+            decode_leg.start()
             
             logger.info(f"✅ Started dual ffmpeg streams for {self.camera.name} (type: {self.camera.stream_type})")
             
-            self._process_dual_ffmpeg_streams(record_process, decode_process)
-            return True
+            # False when the record leg ran out of restarts: counts as a failed connection (backoff, max_errors)
+            return self._process_dual_ffmpeg_streams(record_leg, decode_leg)
             
         except Exception as e:
             logger.error(f"Error in ffmpeg recording: {str(e)}")
             return False
         finally:
-            if 'record_process' in locals():
-                record_process.kill()
-            if 'decode_process' in locals():
-                decode_process.kill()
-    
-    def _process_dual_ffmpeg_streams(self, record_process, decode_process):
-        """Process dual ffmpeg streams: one for recording, one for decoding"""
+            record_leg.close()
+            decode_leg.close()
+            self.mv_decoder = None
+    
+    def _process_dual_ffmpeg_streams(self, record_leg: IngestLeg, decode_leg: IngestLeg) -> bool:
+        """
+        Process dual ffmpeg streams: one for recording, one for decoding. The decode leg is read on
+        its own thread (newest frame wins) so it can never block the record leg; a watchdog kills a
+        leg that stops delivering and only that leg is restarted. Outages are stored as ingest gaps.
+        Returns False when the record leg exhausted its restarts without delivering data.
+        """
         chunk_size = 4096
         frame_count = 0
         frames_since_motion = 0
@@ -724,17 +2207,41 @@ class CameraRecorder:
         
         logger.info(f"Using frame size: {frame_width}x{frame_height} ({frame_size} bytes) for {self.camera.name}")
         
+        decoded = deque(maxlen=1)  # (read time, frame) from the decode leg reader
+        Thread(
+            target=self._read_decode_leg,
+            args=(decode_leg, frame_size, (frame_height, frame_width, 3), decoded),
+            name=f"decode-{self.camera.name}",
+            daemon=True
+        ).start()
+        watchdog = IngestWatchdog(self.camera.name, [record_leg, decode_leg], self.stop_event).start()
+        
         try:
             while not self.stop_event.is_set():
                 # Read raw H.264 chunk from recording stream
-                chunk = record_process.stdout.read(chunk_size)
+                chunk = record_leg.process.stdout.read(chunk_size)
                 
                 if not chunk:
-                    logger.warning(f"ffmpeg record stream ended for {self.camera.name}")
-                    break
+                    if self.stop_event.is_set():
+                        break
+                    reason = record_leg.stall_reason or "exited"
+                    self._open_ingest_gap(record_leg, reason)
+                    self.stop_event.wait(record_leg.restarts)  # 0s, 1s, 2s... between attempts
+                    if not record_leg.restart():
+                        logger.warning(f"ffmpeg record stream ended for {self.camera.name} after {record_leg.restarts} restarts")
+                        return False
+                    self.counters.record_restarts += 1
+                    logger.warning(f"⚠️ ffmpeg record stream {reason} for {self.camera.name}, restarted record leg")
+                    continue
+                
+                record_leg.mark()
+                if self.ingest_gaps:
+                    self._close_ingest_gap("record")
+                self.connected_event.set()
+                self.counters.bytes_received += len(chunk)
                 
                 # Buffer raw chunks for pre-recording
-                self.raw_buffer.append(chunk)
+                self.raw_buffer.append((time.time(), chunk))
                 if len(self.raw_buffer) > pre_buffer_chunks:
                     self.raw_buffer.popleft()
                 
@@ -743,18 +2250,24 @@ class CameraRecorder:
                 should_decode = (frame_count % (chunks_per_frame * 2) == 0)  # Every 2 "frames" worth of chunks
                 
                 if should_decode:
-                    # Try to read a decoded frame from decode stream
-                    raw_frame = decode_process.stdout.read(frame_size)
+                    if "decode" in self.ingest_gaps and not decoded:
+                        frames_since_motion += 1  # No frames while the decode leg restarts: let motion recordings end
                     
-                    if len(raw_frame) == frame_size:
-                        # Convert raw bytes to numpy array
-                        frame = np.frombuffer(raw_frame, dtype=np.uint8).reshape((frame_height, frame_width, 3))
+                    if decoded:
+                        # Newest frame from the decode leg
+                        read_at, frame = decoded.pop()
+                        self.counters.frames_decoded += 1
                         self.last_frame = frame  # Update for live stream
+                        self._update_previews(frame)
                         
                         # Motion detection
                         motion_detected = False
-                        if self.camera.motion_detection and (frame_count % (chunks_per_frame * 10) == 0):
-                            motion_detected = self._detect_motion(frame)
+                        if self.camera.motion_detection:
+                            # Frames between detections keep the last result instead of reading as "no motion"
+                            if self.detection_cadence.should_detect():
+                                motion_detected = self._detect_motion(frame, read_at)
+                            else:
+                                motion_detected = self.motion_result
                         
                         if motion_detected:
                             current_time = time.time()
@@ -787,8 +2300,10 @@ class CameraRecorder:
                                     )
                                     
                                     # Write buffered chunks
-                                    for buffered_chunk in self.raw_buffer:
+                                    tracker = self.recording_trackers[motion_file_path]
+                                    for chunk_time, buffered_chunk in self.raw_buffer:
                                         motion_recording_process.stdin.write(buffered_chunk)
+                                        tracker.add_bytes(len(buffered_chunk), chunk_time)
                                     
                                     self.motion_state = "recording"
                                     self.motion_start_time = time.time()
@@ -812,6 +2327,7 @@ class CameraRecorder:
                 if motion_recording_process and self.motion_state == "recording":
                     try:
                         motion_recording_process.stdin.write(chunk)
+                        self.recording_trackers[motion_file_path].add_bytes(len(chunk))
                     except:
                         pass
                 
@@ -824,7 +2340,7 @@ class CameraRecorder:
                     
                     self.motion_state = "cooldown"
                     logger.info(f"Motion ended - saved to {motion_file_path}")
-                    self._save_recording_to_db_sync(motion_file_path, "motion")
+                    self._save_recording_metadata_sync(motion_file_path, "motion")
                 
                 elif self.motion_state == "cooldown" and frames_since_motion > (chunks_per_frame * 10 * self.camera.motion_cooldown_seconds):
                     self.motion_state = "idle"
@@ -832,9 +2348,76 @@ class CameraRecorder:
         except Exception as e:
             logger.error(f"Error in dual stream processing: {str(e)}")
         finally:
+            watchdog.stop()
             if motion_recording_process:
                 motion_recording_process.stdin.close()
                 motion_recording_process.wait()
+                # Recording interrupted by stop/stream end - keep what was written
+                self._save_recording_metadata_sync(motion_file_path, "motion")
+        return True
+    
+    def _read_decode_leg(self, leg: IngestLeg, frame_size: int, shape: tuple, decoded: deque):
+        """Decode leg reader: keeps the newest frame in `decoded`, restarts the leg when it stalls or exits"""
+        while not self.stop_event.is_set() and not leg.closed:
+            try:
+                with hot_path_timers.time(self.camera.id, "frame_read"):
+                    raw_frame = leg.process.stdout.read(frame_size)
+            except (ValueError, OSError):
+                raw_frame = b''  # Pipe closed by kill()
+            
+            if len(raw_frame) == frame_size:
+                leg.mark()
+                if self.ingest_gaps:
+                    self._close_ingest_gap("decode")
+                decoded.append((time.time(), np.frombuffer(raw_frame, dtype=np.uint8).reshape(shape)))
+                continue
+            
+            if self.stop_event.is_set() or leg.closed:
+                break
+            reason = leg.stall_reason or "exited"
+            self._open_ingest_gap(leg, reason)
+            self.stop_event.wait(min(leg.restarts, INGEST_STALL_SECONDS))
+            if not leg.restart():
+                break
+            self.counters.decode_restarts += 1
+            logger.warning(f"⚠️ ffmpeg decode stream {reason} for {self.camera.name}, restarted decode leg")
+    
+    def _open_ingest_gap(self, leg: IngestLeg, reason: str):
+        """Start of an outage of a pipeline leg: when it last delivered data (kept across restarts)"""
+        if leg.name not in self.ingest_gaps:
+            started = time.time() - (time.monotonic() - leg.last_data)
+            self.ingest_gaps[leg.name] = (started, reason)
+    
+    def _close_ingest_gap(self, leg_name: str):
+        """Data flows again: store the outage in the background"""
+        gap = self.ingest_gaps.pop(leg_name, None)
+        if gap:
+            Thread(target=self._save_ingest_gap_sync, args=(leg_name, gap[0], time.time(), gap[1]), daemon=True).start()
+    
+    def _save_ingest_gap_sync(self, leg_name: str, started: float, ended: float, reason: str):
+        """Save an ingest gap to database (sync version for thread)"""
+        duration = ended - started
+        if duration < INGEST_MIN_GAP_SECONDS:
+            return
+        try:
+            from pymongo import MongoClient
+            mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+            db_name = os.getenv('DB_NAME', 'video_surveillance')
+            sync_client = MongoClient(mongo_url)
+            sync_client[db_name].ingest_gaps.insert_one({
+                "id": str(uuid.uuid4()),
+                "camera_id": self.camera.id,
+                "camera_name": self.camera.name,
+                "leg": leg_name,
+                "reason": reason,
+                "start_time": datetime.fromtimestamp(started, timezone.utc).isoformat(),
+                "end_time": datetime.fromtimestamp(ended, timezone.utc).isoformat(),
+                "duration": round(duration, 3)
+            })
+            sync_client.close()
+            logger.info(f"📉 Ingest gap saved for {self.camera.name}: {leg_name} leg {reason} for {duration:.1f}s")
+        except Exception as e:
+            logger.error(f"Error saving ingest gap: {str(e)}")
     
     def _process_raw_stream(self, ffmpeg_process, cap_for_detection=None):
         """Process raw H.264 stream with periodic frame decoding for motion detection"""
@@ -858,32 +2441,36 @@ class CameraRecorder:
                     logger.warning(f"ffmpeg stream ended for {self.camera.name}")
                     break
                 
+                self.counters.bytes_received += len(chunk)
+                
                 # Buffer raw chunks for pre-recording
-                self.raw_buffer.append(chunk)
+                self.raw_buffer.append((time.time(), chunk))
                 if len(self.raw_buffer) > pre_buffer_chunks:
                     self.raw_buffer.popleft()
                 
                 # Write to continuous recording if enabled
                 # TODO: Implement continuous recording with raw stream
                 
-                # Periodic motion detection (every N chunks = ~every decode_interval frames)
+                # Periodic motion detection (cadence adapts to scene activity and CPU budget)
                 frame_count += 1
-                should_decode_for_motion = (frame_count % (chunks_per_frame * self.decode_interval) == 0)
+                should_decode_for_motion = self.detection_cadence.should_detect()
                 should_decode_for_stream = (frame_count % (chunks_per_frame * 2) == 0)  # Update last_frame more often for live stream
                 motion_detected = False  # Initialize
                 
                 # Decode frame for live stream and/or motion detection
                 if cap_for_detection and (should_decode_for_stream or (should_decode_for_motion and self.camera.motion_detection)):
                     # Decode one frame
-                    ret, frame = cap_for_detection.read()
+                    with hot_path_timers.time(self.camera.id, "frame_read"):
+                        ret, frame = cap_for_detection.read()
                     
                     if ret and frame is not None:
+                        self.counters.frames_decoded += 1
                         self.last_frame = frame  # Update for live stream endpoint
                         
                         # Only run motion detection if it's time
-                        if should_decode_for_motion and self.camera.motion_detection:
-                            # Detect motion on this frame
-                            motion_detected = self._detect_motion(frame)
+                        if self.camera.motion_detection:
+                            # Detect motion on this frame, or keep the last result between detections
+                            motion_detected = self._detect_motion(frame) if should_decode_for_motion else self.motion_result
                         
                         if motion_detected:
                             current_time = time.time()
@@ -923,8 +2510,10 @@ class CameraRecorder:
                                     )
                                     
                                     # Write buffered pre-recording chunks
-                                    for buffered_chunk in self.raw_buffer:
+                                    tracker = self.recording_trackers[motion_file_path]
+                                    for chunk_time, buffered_chunk in self.raw_buffer:
                                         motion_recording_process.stdin.write(buffered_chunk)
+                                        tracker.add_bytes(len(buffered_chunk), chunk_time)
                                     
                                     self.motion_state = "recording"
                                     self.motion_start_time = time.time()
@@ -952,6 +2541,7 @@ class CameraRecorder:
                 if motion_recording_process and self.motion_state == "recording":
                     try:
                         motion_recording_process.stdin.write(chunk)
+                        self.recording_trackers[motion_file_path].add_bytes(len(chunk))
                     except:
                         pass
                 
@@ -967,7 +2557,7 @@ class CameraRecorder:
                     logger.info(f"Motion ended - saved to {motion_file_path}")
                     
                     # Save to database
-                    self._save_recording_to_db_sync(motion_file_path, "motion")
+                    self._save_recording_metadata_sync(motion_file_path, "motion")
                 
                 elif self.motion_state == "cooldown" and frames_since_motion > (chunks_per_frame * 10 * self.camera.motion_cooldown_seconds):
                     self.motion_state = "idle"
@@ -978,6 +2568,8 @@ class CameraRecorder:
             if motion_recording_process:
                 motion_recording_process.stdin.close()
                 motion_recording_process.wait()
+                # Recording interrupted by stop/stream end - keep what was written
+                self._save_recording_metadata_sync(motion_file_path, "motion")
     
     
     def _record_http_mjpeg(self):
@@ -1005,27 +2597,33 @@ class CameraRecorder:
             continuous_writer = None
             frame_count = 0
             frames_since_motion = 0
-            motion_detection_skip = 0  # OPTIMIZATION: Skip frames for motion detection
             
             while not self.stop_event.is_set():
-                frame = self._get_http_mjpeg_frame(stream)
+                with hot_path_timers.time(self.camera.id, "frame_read"):
+                    frame = self._get_http_mjpeg_frame(stream)
                 
                 if frame is None:
                     break
                 
+                self.connected_event.set()
+                self.counters.frames_received += 1
+                self.counters.frames_decoded += 1
+                self.last_frame = frame  # Update for live stream endpoint
+                
                 # OPTIMIZATION: Skip every other frame to reduce CPU by ~50%
                 frame_count += 1
                 if frame_count % 2 != 0:  # Process only even frames
                     continue
                 
+                self._update_previews(frame)
+                
                 # Initialize dimensions on first frame
                 if width is None:
                     height, width = frame.shape[:2]
                     
                     if self.camera.continuous_recording:
                         continuous_file = self._create_recording_file("continuous")
-                        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                        continuous_writer = cv2.VideoWriter(continuous_file, fourcc, recording_fps, (width, height))
+                        continuous_writer = self._open_video_writer(continuous_file, recording_fps, width, height)
                         self.current_recording = continuous_file
                 
                 # Continuous recording
@@ -1034,21 +2632,17 @@ class CameraRecorder:
                 
                 # Motion detection with pre/post recording
                 if self.camera.motion_detection:
-                    # OPTIMIZATION: Skip motion detection on some frames during recording to reduce CPU
-                    # When already recording, we don't need to detect on every frame
-                    should_detect = True
-                    if self.motion_state == "recording":
-                        motion_detection_skip = (motion_detection_skip + 1) % 3  # Check every 3rd frame when recording
-                        should_detect = (motion_detection_skip == 0)
+                    # Detection runs on the adaptive cadence, not on every frame
+                    should_detect = self.detection_cadence.should_detect()
                     
-                    self.pre_record_buffer.append(frame.copy())
+                    self.pre_record_buffer.append((time.time(), frame.copy()))
                     if len(self.pre_record_buffer) > pre_buffer_frames:
                         self.pre_record_buffer.popleft()
                     
                     if should_detect:
                         motion_detected = self._detect_motion(frame)
                     else:
-                        motion_detected = False  # Assume no new motion when skipping detection
+                        motion_detected = self.motion_result  # Keep the last result when skipping detection
                     
                     if motion_detected:
                         current_time = time.time()
@@ -1066,9 +2660,9 @@ class CameraRecorder:
                         if motion_duration >= self.camera.min_motion_duration:
                             if self.motion_state == "idle":
                                 self._start_motion_recording(fps, width, height)
-                                for buffered_frame in self.pre_record_buffer:
+                                for frame_time, buffered_frame in self.pre_record_buffer:
                                     if self.motion_writer:
-                                        self.motion_writer.write(buffered_frame)
+                                        self.motion_writer.write(buffered_frame, frame_time)
                                 self._save_motion_event_sync(frame)
                                 self.motion_state = "recording"
                                 logger.info(f"Motion detected (duration: {motion_duration:.1f}s) - wrote {len(self.pre_record_buffer)} pre-recorded frames")
@@ -1121,7 +2715,7 @@ class CameraRecorder:
                     self._save_recording_metadata_sync(self.current_recording, "continuous")
                     
                     continuous_file = self._create_recording_file("continuous")
-                    continuous_writer = cv2.VideoWriter(continuous_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                    continuous_writer = self._open_video_writer(continuous_file, fps, width, height)
                     self.current_recording = continuous_file
                     frame_count = 0
             
@@ -1167,21 +2761,27 @@ class CameraRecorder:
         frames_since_motion = 0
         
         while not self.stop_event.is_set():
-            frame = self._get_http_snapshot(stream_url, auth)
+            with hot_path_timers.time(self.camera.id, "frame_read"):
+                frame = self._get_http_snapshot(stream_url, auth)
             
             if frame is None:
                 # Use longer sleep for failed reads to reduce CPU
                 time.sleep(max(self.camera.snapshot_interval, 0.5))  # At least 0.5s
                 continue
             
+            self.connected_event.set()
+            self.counters.frames_received += 1
+            self.counters.frames_decoded += 1
+            self.last_frame = frame  # Update for live stream endpoint
+            self._update_previews(frame)
+            
             # Initialize dimensions on first frame
             if width is None:
                 height, width = frame.shape[:2]
                 
                 if self.camera.continuous_recording:
                     continuous_file = self._create_recording_file("continuous")
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    continuous_writer = cv2.VideoWriter(continuous_file, fourcc, fps, (width, height))
+                    continuous_writer = self._open_video_writer(continuous_file, fps, width, height)
                     self.current_recording = continuous_file
             
             # Continuous recording
@@ -1190,11 +2790,11 @@ class CameraRecorder:
             
             # Motion detection with pre/post recording
             if self.camera.motion_detection:
-                self.pre_record_buffer.append(frame.copy())
+                self.pre_record_buffer.append((time.time(), frame.copy()))
                 if len(self.pre_record_buffer) > pre_buffer_frames:
                     self.pre_record_buffer.popleft()
                 
-                motion_detected = self._detect_motion(frame)
+                motion_detected = self._detect_motion(frame) if self.detection_cadence.should_detect() else self.motion_result
                 
                 if motion_detected:
                     current_time = time.time()
@@ -1212,9 +2812,9 @@ class CameraRecorder:
                     if motion_duration >= self.camera.min_motion_duration:
                         if self.motion_state == "idle":
                             self._start_motion_recording(fps, width, height)
-                            for buffered_frame in self.pre_record_buffer:
+                            for frame_time, buffered_frame in self.pre_record_buffer:
                                 if self.motion_writer:
-                                    self.motion_writer.write(buffered_frame)
+                                    self.motion_writer.write(buffered_frame, frame_time)
                             self._save_motion_event_sync(frame)
                             self.motion_state = "recording"
                             logger.info(f"Motion detected (duration: {motion_duration:.1f}s) - wrote {len(self.pre_record_buffer)} pre-recorded frames")
@@ -1266,7 +2866,7 @@ class CameraRecorder:
                 self._save_recording_metadata_sync(self.current_recording, "continuous")
                 
                 continuous_file = self._create_recording_file("continuous")
-                continuous_writer = cv2.VideoWriter(continuous_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                continuous_writer = self._open_video_writer(continuous_file, fps, width, height)
                 self.current_recording = continuous_file
                 frame_count = 0
             
@@ -1308,12 +2908,10 @@ class CameraRecorder:
         frames_since_motion = 0
         consecutive_read_failures = 0
         max_read_failures = 30  # Reconnect after 30 failed reads
-        motion_detection_skip = 0  # OPTIMIZATION: Skip frames for motion detection
         
         if self.camera.continuous_recording:
             continuous_file = self._create_recording_file("continuous")
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            continuous_writer = cv2.VideoWriter(continuous_file, fourcc, recording_fps, (width, height))
+            continuous_writer = self._open_video_writer(continuous_file, recording_fps, width, height)
             self.current_recording = continuous_file
         
         while not self.stop_event.is_set():
@@ -1321,7 +2919,8 @@ class CameraRecorder:
             self._adapt_quality_based_on_connection()
             
             # Read frame with timeout handling
-            ret, frame = cap.read()
+            with hot_path_timers.time(self.camera.id, "frame_read"):
+                ret, frame = cap.read()
             
             if not ret or frame is None:
                 consecutive_read_failures += 1
@@ -1351,8 +2950,12 @@ class CameraRecorder:
             # Reset failure counter on successful read
             consecutive_read_failures = 0
             self.last_successful_frame = time.time()
+            self.connected_event.set()
+            self.counters.frames_received += 1
+            self.counters.frames_decoded += 1
             self.last_frame = frame
             self.frame_counter += 1
+            self._update_previews(frame)
             
             # OPTIMIZATION: Skip every other frame to reduce CPU by ~50%
             frame_count += 1
@@ -1362,25 +2965,20 @@ class CameraRecorder:
             # Add to pre-record buffer
             if len(self.pre_record_buffer) >= pre_buffer_frames:
                 self.pre_record_buffer.popleft()
-            self.pre_record_buffer.append(frame.copy())
+            self.pre_record_buffer.append((time.time(), frame.copy()))
             
             # Write to continuous recording
             if continuous_writer:
                 continuous_writer.write(frame)
             
-            # Motion detection (adaptive processing with frame skipping)
-            if self.camera.motion_detection and self._should_process_frame_for_motion():
-                # OPTIMIZATION: Skip motion detection on some frames during recording to reduce CPU
-                # When already recording, we don't need to detect on every frame
-                should_detect = True
-                if self.motion_state == "recording":
-                    motion_detection_skip = (motion_detection_skip + 1) % 3  # Check every 3rd frame when recording
-                    should_detect = (motion_detection_skip == 0)
+            # Motion detection (adaptive cadence: quiet/burst rates under the global CPU budget)
+            if self.camera.motion_detection:
+                should_detect = self.detection_cadence.should_detect()
                 
                 if should_detect:
                     motion_detected = self._detect_motion(frame)
                 else:
-                    motion_detected = False  # Assume no new motion when skipping detection
+                    motion_detected = self.motion_result  # Keep the last result when skipping detection
                 
                 if motion_detected:
                     current_time = time.time()
@@ -1400,9 +2998,9 @@ class CameraRecorder:
                         if self.motion_state == "idle":
                             self._start_motion_recording(recording_fps, width, height)
                             # Write pre-recorded frames
-                            for buffered_frame in self.pre_record_buffer:
+                            for frame_time, buffered_frame in self.pre_record_buffer:
                                 if self.motion_writer:
-                                    self.motion_writer.write(buffered_frame)
+                                    self.motion_writer.write(buffered_frame, frame_time)
                             logger.info(f"Motion detected (duration: {motion_duration:.1f}s) - wrote {len(self.pre_record_buffer)} pre-recorded frames")
                             
                             # Save motion event
@@ -1462,7 +3060,7 @@ class CameraRecorder:
                 self._save_recording_metadata_sync(self.current_recording, "continuous")
                 
                 continuous_file = self._create_recording_file("continuous")
-                continuous_writer = cv2.VideoWriter(continuous_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                continuous_writer = self._open_video_writer(continuous_file, fps, width, height)
                 self.current_recording = continuous_file
                 frame_count = 0
         
@@ -1487,10 +3085,13 @@ class CameraRecorder:
         return True
         
         while not self.stop_event.is_set():
-            ret, frame = cap.read()
+            with hot_path_timers.time(self.camera.id, "frame_read"):
+                ret, frame = cap.read()
             if not ret:
                 logger.warning(f"Failed to read frame from camera {self.camera.name}")
                 break
+            self.counters.frames_received += 1
+            self.counters.frames_decoded += 1
             
             # Continuous recording
             if continuous_writer:
@@ -1499,18 +3100,16 @@ class CameraRecorder:
             # Motion detection with pre/post recording
             if self.camera.motion_detection:
                 # Add frame to pre-record buffer
-                self.pre_record_buffer.append(frame.copy())
+                self.pre_record_buffer.append((time.time(), frame.copy()))
                 if len(self.pre_record_buffer) > pre_buffer_frames:
                     self.pre_record_buffer.popleft()
                 
-                # Detect motion (skip frames for performance)
-                motion_detected = False
+                # Detect motion on the adaptive cadence
                 self.frame_counter += 1
-                if self.frame_counter % self.frame_skip == 0:
-                    motion_detected = self._detect_motion(frame)
-                elif self.motion_state == "recording":
-                    # Always check if we're already recording
+                if self.detection_cadence.should_detect():
                     motion_detected = self._detect_motion(frame)
+                else:
+                    motion_detected = self.motion_result
                 
                 if motion_detected:
                     self.last_motion_time = time.time()
@@ -1520,9 +3119,9 @@ class CameraRecorder:
                     if self.motion_state == "idle":
                         self._start_motion_recording(fps, width, height)
                         # Write pre-recorded frames
-                        for buffered_frame in self.pre_record_buffer:
+                        for frame_time, buffered_frame in self.pre_record_buffer:
                             if self.motion_writer:
-                                self.motion_writer.write(buffered_frame)
+                                self.motion_writer.write(buffered_frame, frame_time)
                         logger.info(f"Motion detected - wrote {len(self.pre_record_buffer)} pre-recorded frames")
                         
                         # Save motion event
@@ -1580,7 +3179,7 @@ class CameraRecorder:
                 self._save_recording_metadata_sync(self.current_recording, "continuous")
                 
                 continuous_file = self._create_recording_file("continuous")
-                continuous_writer = cv2.VideoWriter(continuous_file, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                continuous_writer = self._open_video_writer(continuous_file, fps, width, height)
                 self.current_recording = continuous_file
                 frame_count = 0
         
@@ -1622,7 +3221,35 @@ class CameraRecorder:
             extension = '.mp4'  # MP4 for H.264 and H.265
         
         filename = f"{recording_type}_{timestamp}{extension}"
-        return str(camera_dir / filename)
+        file_path = str(camera_dir / filename)
+        
+        # Sample sprite tiles less often for long continuous files than for short motion clips
+        self.previews[file_path] = RecordingPreview(10.0 if recording_type == "continuous" else 2.0)
+        self.recording_trackers[file_path] = RecordingTracker(counters=self.counters)
+        return file_path
+    
+    def _open_video_writer(self, file_path: str, fps: float, width: int, height: int) -> TrackedVideoWriter:
+        """Open an mp4v writer whose frames are counted for the recording metadata"""
+        tracker = self.recording_trackers.setdefault(file_path, RecordingTracker(counters=self.counters))
+        tracker.fps = fps
+        return TrackedVideoWriter(file_path, fps, (width, height), tracker)
+    
+    def _update_previews(self, frame):
+        """Feed an already-decoded frame to previews of all recordings being written"""
+        for preview in list(self.previews.values()):
+            preview.add_frame(frame)
+    
+    def _forget_recording(self, file_path: Optional[str]):
+        """Drop the preview and tracker of a recording that was closed, saved or not"""
+        self.previews.pop(file_path, None)
+        self.recording_trackers.pop(file_path, None)
+    
+    def _drop_closed_recordings(self):
+        """After a stream session: forget recordings it left behind, except a motion clip still being written"""
+        open_path = self.motion_file_path if self.motion_writer else None
+        for file_path in list(self.previews.keys() | self.recording_trackers.keys()):
+            if file_path != open_path:
+                self._forget_recording(file_path)
     
     def _start_motion_recording(self, fps, width, height):
         """Start motion recording with pre-buffer"""
@@ -1630,8 +3257,7 @@ class CameraRecorder:
             return
         
         self.motion_file_path = self._create_recording_file("motion")
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        self.motion_writer = cv2.VideoWriter(self.motion_file_path, fourcc, fps, (width, height))
+        self.motion_writer = self._open_video_writer(self.motion_file_path, fps, width, height)
         self.motion_start_time = time.time()
         self.motion_start_time_dt = datetime.now(timezone.utc)  # Save datetime for Telegram
         logger.info(f"Started motion recording: {self.motion_file_path}")
@@ -1641,31 +3267,42 @@ class CameraRecorder:
         if not self.motion_writer:
             return
         
-        self.motion_writer.release()
-        self.motion_writer = None
-        
-        # Save recording metadata and convert to H.264
-        if self.motion_file_path and os.path.exists(self.motion_file_path):
-            if self.enable_h264_conversion:
-                # Convert to H.264 in background (non-blocking)
-                import threading
-                conversion_thread = threading.Thread(
-                    target=self._convert_to_h264_async,
-                    args=(self.motion_file_path,),
-                    daemon=True
-                )
-                conversion_thread.start()
+        try:
+            self.motion_writer.release()
+            self.motion_writer = None
             
-            self._save_recording_metadata_sync(self.motion_file_path, "motion")
-            logger.info(f"Stopped motion recording: {self.motion_file_path}")
-        
-        self.motion_file_path = None
+            # Save recording metadata and convert to H.264
+            if self.motion_file_path and os.path.exists(self.motion_file_path):
+                if self.enable_h264_conversion:
+                    # Convert to H.264 in background (non-blocking)
+                    import threading
+                    conversion_thread = threading.Thread(
+                        target=self._convert_to_h264_async,
+                        args=(self.motion_file_path, time.time(), self.motion_trigger_at),
+                        daemon=True
+                    )
+                    conversion_thread.start()
+                
+                self._save_recording_metadata_sync(self.motion_file_path, "motion")
+                logger.info(f"Stopped motion recording: {self.motion_file_path}")
+        finally:
+            self.motion_writer = None
+            self._forget_recording(self.motion_file_path)
+            self.motion_file_path = None
     
-    def _convert_to_h264_async(self, file_path: str):
+    def _convert_to_h264_async(self, file_path: str, queued_at: Optional[float] = None, trigger_at: Optional[float] = None):
         """Convert video to H.264 in background (non-blocking)"""
         try:
             logger.info(f"Starting H.264 conversion in background: {file_path}")
-            self._convert_to_h264(file_path)
+            started = time.time()
+            if queued_at:
+                latency_histograms.observe(self.camera.id, "transcode_wait", started - queued_at)
+            self.counters.transcodes_running += 1
+            try:
+                self._convert_to_h264(file_path)
+            finally:
+                self.counters.transcodes_running -= 1
+            latency_histograms.observe(self.camera.id, "transcode", time.time() - started)
             
             # Create Telegram video and send if enabled
             if self.camera.telegram_send_video or self.camera.telegram_send_notification:
@@ -1673,11 +3310,7 @@ class CameraRecorder:
                 
                 # Send to Telegram
                 if self.camera.telegram_send_video and telegram_video_path:
-                    send_telegram_notification_sync(
-                        self.camera.name,
-                        self.motion_start_time_dt,
-                        telegram_video_path
-                    )
+                    self._send_telegram_timed(telegram_video_path, trigger_at)
                     # Clean up telegram video after sending
                     try:
                         if os.path.exists(telegram_video_path):
@@ -1686,15 +3319,20 @@ class CameraRecorder:
                         pass
                 elif self.camera.telegram_send_notification:
                     # Send notification only
-                    send_telegram_notification_sync(
-                        self.camera.name,
-                        self.motion_start_time_dt,
-                        None
-                    )
+                    self._send_telegram_timed(None, trigger_at)
                     
         except Exception as e:
             logger.error(f"Error in async H.264 conversion: {e}")
     
+    def _send_telegram_timed(self, video_path: Optional[str], trigger_at: Optional[float]):
+        """Send the motion notification, recording API call time and (if delivered) lag since the trigger frame"""
+        started = time.time()
+        delivered = send_telegram_notification_sync(self.camera.name, self.motion_start_time_dt, video_path)
+        finished = time.time()
+        latency_histograms.observe(self.camera.id, "notification_send", finished - started)
+        if delivered and trigger_at:
+            latency_histograms.observe(self.camera.id, "alert", finished - trigger_at)
+    
     def _convert_to_h264(self, file_path: str):
         """Convert video to H.264 codec for browser compatibility (uses settings from DB)"""
         try:
@@ -1806,173 +3444,55 @@ class CameraRecorder:
             logger.error(f"Error creating Telegram video: {e}")
             return None
     
-    def _detect_motion(self, frame) -> bool:
-        """Detect motion in frame using configured algorithm"""
-        
-        if self.camera.motion_algorithm in ["mog2", "knn"]:
-            return self._detect_motion_bg_subtraction(frame)
-        else:
-            return self._detect_motion_basic(frame)
-    
-    def _detect_motion_bg_subtraction(self, frame) -> bool:
-        """Detect motion using MOG2 with optimizations for CPU"""
-        if frame is None:
-            return False
-        
-        try:
-            # OPTIMIZATION 1: Resize frame for motion detection (4x less pixels to process)
-            small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5, interpolation=cv2.INTER_NEAREST)
-            
-            # Apply background subtraction with learning rate
-            # learningRate = -1 (automatic), 0 (no learning), 0.001-0.01 (slow learning for static scenes)
-            # For video streams, use small learning rate to adapt slowly and reduce false positives
-            learning_rate = 0.001 if hasattr(self, 'motion_buffer') and len(self.motion_buffer) > 10 else -1
-            fg_mask = self.bg_subtractor.apply(small_frame, learningRate=learning_rate)
-            
-            # OPTIMIZATION 2: Simple threshold instead of morphological operations for speed
-            # Increase threshold to reduce noise sensitivity (200 -> 220)
-            _, fg_mask = cv2.threshold(fg_mask, 220, 255, cv2.THRESH_BINARY)
-            
-            # Apply morphological operations to reduce noise (remove small artifacts)
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)  # Remove small white noise
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)  # Fill small holes
-            
-            # Apply exclusion zones mask if specified
-            if self.camera.excluded_zones:
-                exclusion_mask = np.ones(fg_mask.shape, dtype=np.uint8) * 255
-                height, width = fg_mask.shape
-                
-                # Log exclusion zones application (only log once per camera start)
-                if not hasattr(self, '_exclusion_logged'):
-                    logger.info(f"🚫 Applying {len(self.camera.excluded_zones)} exclusion zones for {self.camera.name}")
-                    self._exclusion_logged = True
-                
-                for zone in self.camera.excluded_zones:
-                    zone_type = zone.get('type', 'rect')
-                    
-                    if zone_type == 'rect':
-                        # Rectangle exclusion zone
-                        coords = zone.get('coordinates', {})
-                        # Coordinates are in original frame size, need to scale down by 0.5
-                        x = int(coords.get('x', 0) * 0.5)
-                        y = int(coords.get('y', 0) * 0.5)
-                        w = int(coords.get('width', 0) * 0.5)
-                        h = int(coords.get('height', 0) * 0.5)
-                        
-                        # Make zone black in the exclusion mask
-                        cv2.rectangle(exclusion_mask, (x, y), (x + w, y + h), 0, -1)
-                    
-                    elif zone_type == 'polygon':
-                        # Polygon exclusion zone
-                        coords = zone.get('coordinates', {})
-                        points = coords.get('points', [])
-                        if points:
-                            # Scale points to match resized frame
-                            scaled_points = np.array([[int(p[0] * 0.5), int(p[1] * 0.5)] for p in points], dtype=np.int32)
-                            cv2.fillPoly(exclusion_mask, [scaled_points], 0)
-                
-                # Count motion pixels before and after exclusion for comparison
-                motion_pixels_before = cv2.countNonZero(fg_mask)
-                
-                # Apply exclusion mask to foreground mask
-                fg_mask = cv2.bitwise_and(fg_mask, exclusion_mask)
-                
-                motion_pixels_after = cv2.countNonZero(fg_mask)
-                
-                # Log if exclusion zones reduced motion pixels significantly
-                if motion_pixels_before > 0 and motion_pixels_after < motion_pixels_before * 0.8:
-                    pixels_removed = motion_pixels_before - motion_pixels_after
-                    if not hasattr(self, '_last_exclusion_log_time') or time.time() - self._last_exclusion_log_time > 10:
-                        logger.info(f"🚫 Exclusion zones filtered out {pixels_removed} motion pixels for {self.camera.name}")
-                        self._last_exclusion_log_time = time.time()
-            
-            # OPTIMIZATION 3: Count non-zero pixels directly (faster than contours)
-            motion_pixels = cv2.countNonZero(fg_mask)
-            
-            # Convert area threshold to match resized frame (4x smaller)
-            # Also apply motion_sensitivity: lower sensitivity = higher threshold
-            base_threshold = self.camera.min_object_area / 4
-            sensitivity_multiplier = 2.0 - self.camera.motion_sensitivity  # 0.5 sens -> 1.5x threshold, 1.0 sens -> 1.0x threshold
-            adjusted_threshold = base_threshold * sensitivity_multiplier
-            
-            # Temporal filtering with stricter requirements
-            motion_detected = motion_pixels > adjusted_threshold
-            self.motion_buffer.append(1 if motion_detected else 0)
-            
-            # Require motion in at least 4 of last 5 frames (stricter than 3/5)
-            # This reduces false positives from video compression artifacts
-            temporal_motion = sum(self.motion_buffer) >= 4
-            
-            return temporal_motion
-            
-        except Exception as e:
-            logger.error(f"Error in motion detection: {str(e)}")
-            return False
-    
-    def _detect_motion_basic(self, frame) -> bool:
-        """Basic motion detection using improved frame differencing"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Use camera-specific blur size (must be odd)
-        blur_size = self.camera.blur_size if self.camera.blur_size % 2 == 1 else self.camera.blur_size + 1
-        gray = cv2.GaussianBlur(gray, (blur_size, blur_size), 0)
-        
-        if self.last_frame is None:
-            self.last_frame = gray
-            return False
-        
-        # Frame differencing
-        frame_delta = cv2.absdiff(self.last_frame, gray)
-        
-        # Threshold with camera-specific value
-        thresh = cv2.threshold(frame_delta, self.camera.motion_threshold, 255, cv2.THRESH_BINARY)[1]
-        
-        # Morphological operations
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        
-        # Apply detection zones if specified
-        if self.camera.detection_zones:
-            mask = np.zeros(thresh.shape, dtype=np.uint8)
-            for zone in self.camera.detection_zones:
-                points = np.array([[p['x'], p['y']] for p in zone['points']], dtype=np.int32)
-                cv2.fillPoly(mask, [points], 255)
-            thresh = cv2.bitwise_and(thresh, mask)
-        
-        # Find contours and filter by minimum area
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    def _detect_motion(self, frame, read_at: Optional[float] = None) -> bool:
+        """
+        Detect motion on the shared detection pool (per-camera model from the registry) without
+        blocking the read loop: applies the result of the previously queued frame and queues this
+        one. Returns that previous result, or the last applied one while it is still being processed.
+        """
+        started = time.perf_counter()
+        if self.pending_detection is not None:
+            result, pending_read_at, queued_at = self.pending_detection
+            if result.done():
+                self.pending_detection = None
+                if not result.cancelled():
+                    self.motion_result = self._apply_detection(result.result(), pending_read_at)
+            elif time.monotonic() - queued_at > DETECTION_RESULT_TIMEOUT:
+                self.pending_detection = None
+                detection_service.abandon(self.camera.id, result)
         
-        significant_motion = 0
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area >= self.camera.min_object_area:
-                significant_motion += area
+        # One frame in flight per camera: a busy pool slows this camera's detection, not its reading
+        if self.pending_detection is None:
+            if self.mv_decoder is not None:
+                # Compressed-domain detection: the motion-energy grid replaces the pixels
+                frame = self.mv_decoder.take_energy()
+            result = detection_service.submit(self.camera.id, frame)
+            if result is not None:
+                self.pending_detection = (result, read_at or time.time(), time.monotonic())
+        hot_path_timers.record(self.camera.id, "detect_motion", time.perf_counter() - started)
+        return self.motion_result
+    
+    def _apply_detection(self, outcome: tuple, read_at: float) -> bool:
+        """Bookkeeping for a finished detection of the frame read at `read_at`"""
+        motion, raw_motion, detection = outcome
+        self.last_frame_read_at = read_at
+        latency_histograms.observe(self.camera.id, "detection", time.time() - read_at)
         
-        # Calculate motion percentage
-        total_pixels = thresh.shape[0] * thresh.shape[1]
-        motion_percentage = significant_motion / total_pixels
-        
-        # Update background gradually if no motion
-        threshold = 0.005 + (1 - self.camera.motion_sensitivity) * 0.015  # 0.005 to 0.02
-        
-        if motion_percentage < threshold:
-            # Gradually update background
-            self.last_frame = cv2.addWeighted(self.last_frame, 0.9, gray, 0.1, 0)
-        else:
-            self.last_frame = gray
+        # Burst to the active rate on the first raw hit, before temporal filtering confirms it
+        self.detection_cadence.record(raw_motion)
+        activity_index.record(self.camera.id, activity_level(detection))
         
-        # Temporal filtering
-        current_motion = motion_percentage > threshold
-        self.motion_buffer.append(current_motion)
-        
-        # Motion detected if present in at least 3 of last 5 frames
-        motion_count = sum(self.motion_buffer)
-        return motion_count >= 3
+        if detection and detection['area']:
+            if self.motion_track is not None:
+                self.motion_track.add(time.time(), detection)
+            else:
+                self.recent_detections.append((time.time(), detection))
+        return motion
     
     def _save_motion_event_sync(self, frame):
         """Save motion event to database (sync version for thread)"""
+        self.motion_trigger_at = self.last_frame_read_at or time.time()
+        latency_histograms.observe(self.camera.id, "state_transition", time.time() - self.motion_trigger_at)
         try:
             # Save snapshot - use custom storage path if specified
             if self.camera.storage_path:
@@ -2005,26 +3525,65 @@ class CameraRecorder:
             
             sync_db.motion_events.insert_one(event_doc)
             sync_client.close()
+            latency_histograms.observe(self.camera.id, "event_persisted", time.time() - self.motion_trigger_at)
+            
+            # Track the event from the first raw hit that led to it
+            self.motion_event_id = event_doc['id']
+            self.motion_track = MotionTrack()
+            since = (self.motion_first_detected_time or time.time()) - 1
+            for detected_at, detection in self.recent_detections:
+                if detected_at >= since:
+                    self.motion_track.add(detected_at, detection)
+            self.recent_detections.clear()
             
             logger.info(f"Motion event saved: {snapshot_path}")
             
         except Exception as e:
             logger.error(f"Error saving motion event: {str(e)}")
     
+    def _finish_motion_event_sync(self):
+        """Store the track summary and heatmap of the motion event that just ended"""
+        track, event_id = self.motion_track, self.motion_event_id
+        self.motion_track = None
+        self.motion_event_id = None
+        if track is None or not track.detections:
+            return
+        
+        try:
+            from pymongo import MongoClient
+            mongo_url = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+            db_name = os.getenv('DB_NAME', 'video_surveillance')
+            sync_client = MongoClient(mongo_url)
+            sync_client[db_name].motion_events.update_one(
+                {"id": event_id},
+                {"$set": {"track": track.summary(), "heatmap": track.heatmap()}}
+            )
+            sync_client.close()
+        except Exception as e:
+            logger.error(f"Error saving motion track: {str(e)}")
+    
     def _save_recording_metadata_sync(self, file_path: str, recording_type: str):
         """Save recording metadata (sync version for thread)"""
+        preview = self.previews.pop(file_path, None)
+        tracker = self.recording_trackers.pop(file_path, None)
+        if recording_type == "motion":
+            self._finish_motion_event_sync()
         try:
             if not os.path.exists(file_path):
                 return
             
-            file_size = os.path.getsize(file_path)
+            stat_result = os.stat(file_path)
+            preview_fields = preview.save(file_path) if preview else {}
             
-            # Get video duration
-            cap = cv2.VideoCapture(file_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-            duration = frame_count / fps if fps > 0 else 0
-            cap.release()
+            # Timestamps and duration were tracked while writing - no need to reopen and decode the file
+            timing_fields = tracker.metadata() if tracker else {}
+            if not timing_fields:
+                end_time = datetime.fromtimestamp(stat_result.st_mtime, timezone.utc).isoformat()
+                timing_fields = {"start_time": end_time, "end_time": end_time, "duration": 0.0}
+            file_size = stat_result.st_size
+            duration = timing_fields['duration']
+            if tracker and not tracker.bytes:
+                self.counters.bytes_written += file_size  # Encoded by a VideoWriter: size is known once closed
             
             # Save to MongoDB using sync client
             from pymongo import MongoClient
@@ -2037,21 +3596,749 @@ class CameraRecorder:
                 "id": str(uuid.uuid4()),
                 "camera_id": self.camera.id,
                 "camera_name": self.camera.name,
-                "start_time": datetime.now(timezone.utc).isoformat(),
                 "recording_type": recording_type,
                 "file_path": file_path,
                 "file_size": file_size,
-                "duration": duration
+                **timing_fields,
+                **preview_fields
             }
             
             sync_db.recordings.insert_one(recording_doc)
             sync_client.close()
+            if recording_type == "motion" and self.last_motion_time:
+                latency_histograms.observe(self.camera.id, "clip_finalised", time.time() - self.last_motion_time)
             
             logger.info(f"Recording saved to DB: {file_path}, duration: {duration:.1f}s, size: {file_size} bytes")
             
         except Exception as e:
             logger.error(f"Error saving recording metadata: {str(e)}")
 
+# Multi-process recorder workers
+class SharedFrameWriter:
+    """
+    Publishes a camera's latest frame into shared memory so the API process can read it
+    without pickling frames through a queue. Layout: int64 header [seq, height, width,
+    channels] followed by raw pixels; seq is odd while a write is in progress (seqlock).
+    """
+    HEADER_SIZE = 32
+    
+    def __init__(self, min_interval: float = 0.1):
+        self.min_interval = min_interval  # Live view/snapshots never need more than ~10 FPS
+        self.shm = None
+        self.header = None
+        self.last_publish = 0.0
+    
+    @property
+    def name(self) -> Optional[str]:
+        return self.shm.name if self.shm else None
+    
+    def publish(self, frame: np.ndarray):
+        now = time.monotonic()
+        if now - self.last_publish < self.min_interval:
+            return
+        self.last_publish = now
+        
+        if self.shm is None or self.shm.size < self.HEADER_SIZE + frame.nbytes:
+            self.close()
+            self.shm = shared_memory.SharedMemory(create=True, size=self.HEADER_SIZE + frame.nbytes)
+            self.header = np.ndarray((4,), dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = 0
+        
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        self.header[0] += 1
+        self.header[1:] = (height, width, channels)
+        self.shm.buf[self.HEADER_SIZE:self.HEADER_SIZE + frame.nbytes] = np.ascontiguousarray(frame, dtype=np.uint8).reshape(-1)
+        self.header[0] += 1
+    
+    def close(self):
+        if self.shm is None:
+            return
+        self.header = None
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+class SharedFrameReader:
+    """Reads frames published by a SharedFrameWriter in another process"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.header = np.ndarray((4,), dtype=np.int64, buffer=self.shm.buf)
+    
+    def read(self) -> Optional[np.ndarray]:
+        for _ in range(3):
+            seq, height, width, channels = (int(v) for v in self.header)
+            if seq == 0 or seq % 2:
+                time.sleep(0.001)
+                continue
+            size = height * width * channels
+            data = np.frombuffer(self.shm.buf, dtype=np.uint8, count=size, offset=SharedFrameWriter.HEADER_SIZE).copy()
+            if int(self.header[0]) == seq:
+                shape = (height, width, channels) if channels > 1 else (height, width)
+                return data.reshape(shape)
+        return None
+    
+    def close(self):
+        self.header = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+class WorkerCameraRecorder(CameraRecorder):
+    """CameraRecorder running inside a worker process; mirrors last_frame into shared memory"""
+    
+    def __init__(self, camera: Camera):
+        self.frame_writer = SharedFrameWriter()
+        super().__init__(camera)
+    
+    @property
+    def last_frame(self):
+        return self._last_frame
+    
+    @last_frame.setter
+    def last_frame(self, frame):
+        self._last_frame = frame
+        if frame is not None:
+            try:
+                self.frame_writer.publish(frame)
+            except Exception as e:
+                logger.error(f"Error publishing frame for {self.camera.name}: {e}")
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": bool(self.recording_thread and self.recording_thread.is_alive()),
+            "connected": self.connected_event.is_set(),
+            "motion_state": self.motion_state,
+            "is_recording": self.is_recording,
+            "last_successful_frame": self.last_successful_frame,
+            "frame_shm": self.frame_writer.name,
+            "latency": latency_histograms.snapshot(self.camera.id),
+            "timers": hot_path_timers.snapshot(self.camera.id),
+            "ingest_gaps": dict(self.ingest_gaps),
+            "detection": detection_service.camera_status(self.camera.id),
+            "cadence": self.detection_cadence.get_status(),
+            "metrics": self.metrics()
+        }
+    
+    def stop(self):
+        super().stop()
+        self.frame_writer.close()
+
+def recorder_worker_main(worker_index: int, command_queue, status_queue, status_interval: float):
+    """
+    Entry point of a recorder worker process. Owns the recorders for its shard of cameras,
+    executes control commands from the supervisor and reports recorder status periodically.
+    """
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor decides when workers stop
+    
+    recorders: Dict[str, WorkerCameraRecorder] = {}
+    stopping = Event()
+    
+    def report_status():
+        while not stopping.wait(status_interval):
+            try:
+                status_queue.put(("status", worker_index, {
+                    camera_id: recorder.status() for camera_id, recorder in list(recorders.items())
+                }))
+            except Exception as e:
+                logger.error(f"Worker {worker_index} failed to report status: {e}")
+    
+    Thread(target=report_status, daemon=True).start()
+    logger.info(f"🧵 Recorder worker {worker_index} started (pid {os.getpid()})")
+    
+    while True:
+        command, payload = command_queue.get()
+        try:
+            if command == "start":
+                camera = Camera(**payload)
+                if camera.id in recorders:
+                    continue
+                recorder = WorkerCameraRecorder(camera)
+                recorder.start()
+                recorders[camera.id] = recorder
+            elif command == "stop":
+                recorder = recorders.pop(payload, None)
+                if recorder:
+                    recorder.stop()
+            elif command == "profile":
+                # Sample off the command loop so start/stop keep working meanwhile
+                def profile(request=payload):
+                    stacks = sample_stacks(request['seconds'], request['interval'], request.get('thread_filter'))
+                    status_queue.put(("profile", worker_index, request['id'], stacks))
+                Thread(target=profile, name="profiler", daemon=True).start()
+            elif command == "shutdown":
+                break
+        except Exception as e:
+            logger.error(f"Worker {worker_index} failed to handle '{command}': {e}")
+    
+    stopping.set()
+    for recorder in recorders.values():
+        recorder.stop()
+    try:
+        activity_index.flush()
+    except Exception as e:
+        logger.error(f"Error flushing motion activity: {e}")
+    logger.info(f"Recorder worker {worker_index} stopped")
+
+class RemoteRecorder:
+    """
+    Stand-in for a CameraRecorder that lives in a worker process. Exposes the attributes
+    the API uses (last_frame, stop_event, motion_state, is_recording) from IPC status and
+    shared memory, and forwards start/stop to the supervisor.
+    """
+    
+    def __init__(self, camera: Camera, pool: "RecorderWorkerPool"):
+        self.camera = camera
+        self.pool = pool
+        self.stop_event = Event()
+        self.connected_event = Event()
+        self.worker_index = None
+        self.motion_state = "idle"
+        self.is_recording = False
+        self.last_successful_frame = None
+        self.frame_reader = None
+        self.latency = {}  # Latency histograms reported by the worker
+        self.worker_metrics = {}  # Recorder counters reported by the worker
+        self.timers = {}  # Hot-path timers reported by the worker
+        self.ingest_gaps = {}  # Ongoing pipeline outages reported by the worker
+        self.detection = None  # Detection pool metrics reported by the worker
+        self.cadence = None  # Detection cadence reported by the worker
+    
+    def start(self):
+        self.stop_event.clear()
+        self.pool.start_camera(self)
+    
+    def stop(self):
+        self.stop_event.set()
+        self.pool.stop_camera(self.camera.id)
+        self._close_reader()
+    
+    @property
+    def last_frame(self):
+        reader = self.frame_reader
+        if reader is None:
+            return None
+        try:
+            return reader.read()
+        except Exception:
+            return None
+    
+    def apply_status(self, status: Dict[str, Any]):
+        self.motion_state = status['motion_state']
+        self.is_recording = status['is_recording']
+        self.last_successful_frame = status['last_successful_frame']
+        self.latency = status.get('latency', {})
+        self.worker_metrics = status.get('metrics', {})
+        self.timers = status.get('timers', {})
+        self.ingest_gaps = status.get('ingest_gaps', {})
+        self.detection = status.get('detection')
+        self.cadence = status.get('cadence')
+        if status['connected']:
+            self.connected_event.set()
+        
+        frame_shm = status.get('frame_shm')
+        if frame_shm and (self.frame_reader is None or self.frame_reader.name != frame_shm):
+            self._close_reader()
+            try:
+                self.frame_reader = SharedFrameReader(frame_shm)
+            except FileNotFoundError:
+                pass  # Segment was replaced meanwhile; the next status carries the new name
+    
+    def metrics(self) -> Dict[str, Any]:
+        return self.worker_metrics
+    
+    def _close_reader(self):
+        if self.frame_reader:
+            self.frame_reader.close()
+            self.frame_reader = None
+
+class RecorderWorkerPool:
+    """
+    Supervisor that shards cameras across worker processes so frame processing never
+    contends with API request handling for the GIL. Cameras go to the least loaded worker;
+    a worker that dies is respawned and its cameras are started again.
+    """
+    
+    def __init__(self, num_workers: int, status_interval: float = 1.0):
+        self.num_workers = num_workers
+        self.status_interval = status_interval
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = []  # [{"process", "queue", "restarts"}]
+        self.assignments: Dict[str, int] = {}  # camera_id -> worker index
+        self.recorders: Dict[str, RemoteRecorder] = {}
+        self.status_queue = None
+        self.listener = None
+        self.stopping = Event()
+        self.lock = Lock()
+        self.profiles: Dict[str, Dict[str, Any]] = {}  # Profile request id -> pending workers and merged stacks
+    
+    def start(self):
+        self.status_queue = self.context.Queue()
+        for index in range(self.num_workers):
+            self.workers.append({"process": None, "queue": None, "restarts": 0, "spawned_at": 0.0})
+            self._spawn(index)
+        self.listener = Thread(target=self._listen, daemon=True)
+        self.listener.start()
+        logger.info(f"Started {self.num_workers} recorder worker processes")
+    
+    def _spawn(self, index: int):
+        command_queue = self.context.Queue()
+        process = self.context.Process(
+            target=recorder_worker_main,
+            args=(index, command_queue, self.status_queue, self.status_interval),
+            name=f"recorder-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.workers[index].update({"process": process, "queue": command_queue, "spawned_at": time.monotonic()})
+    
+    def start_camera(self, recorder: RemoteRecorder):
+        camera_id = recorder.camera.id
+        with self.lock:
+            if camera_id in self.assignments:
+                index = self.assignments[camera_id]
+            else:
+                loads = [0] * self.num_workers
+                for assigned in self.assignments.values():
+                    loads[assigned] += 1
+                index = loads.index(min(loads))
+                self.assignments[camera_id] = index
+            self.recorders[camera_id] = recorder
+        recorder.worker_index = index
+        self.workers[index]['queue'].put(("start", recorder.camera.model_dump(mode="json")))
+    
+    def stop_camera(self, camera_id: str):
+        with self.lock:
+            index = self.assignments.pop(camera_id, None)
+            self.recorders.pop(camera_id, None)
+        if index is not None:
+            self.workers[index]['queue'].put(("stop", camera_id))
+    
+    def _listen(self):
+        while not self.stopping.is_set():
+            try:
+                message = self.status_queue.get(timeout=self.status_interval)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            
+            if message and message[0] == "status":
+                _, _, statuses = message
+                for camera_id, status in statuses.items():
+                    recorder = self.recorders.get(camera_id)
+                    if recorder:
+                        recorder.apply_status(status)
+            elif message and message[0] == "profile":
+                _, index, request_id, stacks = message
+                with self.lock:
+                    profile = self.profiles.get(request_id)
+                    if profile:
+                        for stack, count in stacks.items():
+                            profile['stacks'][f"recorder-worker-{index};{stack}"] += count
+                        profile['pending'].discard(index)
+                        if not profile['pending']:
+                            profile['done'].set()
+            
+            self._check_workers()
+    
+    def _check_workers(self):
+        for index, worker in enumerate(self.workers):
+            if self.stopping.is_set() or worker['process'].is_alive():
+                continue
+            if time.monotonic() - worker['spawned_at'] < WORKER_RESPAWN_DELAY:
+                continue  # Avoid a tight crash/respawn loop
+            
+            logger.error(f"❌ Recorder worker {index} exited (code {worker['process'].exitcode}), respawning")
+            worker['restarts'] += 1
+            self._spawn(index)
+            with self.lock:
+                orphans = [self.recorders[cid] for cid, assigned in self.assignments.items()
+                           if assigned == index and cid in self.recorders]
+            for recorder in orphans:
+                recorder._close_reader()
+                recorder.connected_event.clear()
+                worker['queue'].put(("start", recorder.camera.model_dump(mode="json")))
+    
+    def profile(self, seconds: float, interval: float, thread_filter: Optional[str] = None) -> Dict[str, int]:
+        """Sample stacks in every live worker for `seconds` (blocking); stacks are rooted at the worker"""
+        request_id = str(uuid.uuid4())
+        alive = {index for index, worker in enumerate(self.workers) if worker['process'] and worker['process'].is_alive()}
+        profile = {"pending": set(alive), "stacks": Counter(), "done": Event()}
+        if not alive:
+            return {}
+        with self.lock:
+            self.profiles[request_id] = profile
+        request = {"id": request_id, "seconds": seconds, "interval": interval, "thread_filter": thread_filter}
+        for index in alive:
+            self.workers[index]['queue'].put(("profile", request))
+        profile['done'].wait(seconds + 10)
+        with self.lock:
+            self.profiles.pop(request_id, None)
+            return dict(profile['stacks'])
+    
+    def shutdown(self, timeout: float = 10.0):
+        self.stopping.set()
+        for worker in self.workers:
+            try:
+                worker['queue'].put(("shutdown", None))
+            except Exception:
+                pass
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker['process'].join(max(0.0, deadline - time.monotonic()))
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+        for recorder in list(self.recorders.values()):
+            recorder._close_reader()
+        logger.info("Recorder worker processes stopped")
+    
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            loads = [0] * self.num_workers
+            for assigned in self.assignments.values():
+                loads[assigned] += 1
+        return {
+            "mode": "processes",
+            "workers": [
+                {
+                    "index": index,
+                    "pid": worker['process'].pid if worker['process'] else None,
+                    "alive": bool(worker['process'] and worker['process'].is_alive()),
+                    "cameras": loads[index],
+                    "restarts": worker['restarts']
+                }
+                for index, worker in enumerate(self.workers)
+            ]
+        }
+
+recorder_pool = RecorderWorkerPool(RECORDER_WORKERS) if RECORDER_WORKERS > 0 else None
+
+def create_recorder(camera: Camera):
+    """Recorder for an active camera: in a worker process when RECORDER_WORKERS > 0, else a thread"""
+    if recorder_pool:
+        return RemoteRecorder(camera, recorder_pool)
+    return CameraRecorder(camera)
+
+# Recorder lifecycle management
+MAX_FINISHED_RECORDER_OPERATIONS = 500
+
+class RecorderManager:
+    """
+    Starts, stops and restarts recorders without blocking the event loop.
+    
+    CameraRecorder.stop() joins the recording thread (up to 5 s), so stops run on a
+    dedicated thread pool. Operations on the same camera are serialized by a per-camera
+    lock (FIFO), while different cameras proceed in parallel. Handlers submit an
+    operation and return immediately; its progress is available by id.
+    """
+    
+    def __init__(self, max_workers: int = 16):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recorder-lifecycle")
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        self.tasks = set()
+    
+    def _lock(self, camera_id: str) -> asyncio.Lock:
+        if camera_id not in self.locks:
+            self.locks[camera_id] = asyncio.Lock()
+        return self.locks[camera_id]
+    
+    def submit(self, action: str, camera_id: str, camera: Optional[Camera] = None) -> Dict[str, Any]:
+        """Queue a start/stop/restart; returns the operation record right away"""
+        operation = {
+            "id": str(uuid.uuid4()),
+            "camera_id": camera_id,
+            "action": action,
+            "status": "pending",
+            "error": None,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "finished_at": None
+        }
+        self.operations[operation['id']] = operation
+        self._prune_operations()
+        
+        task = asyncio.create_task(self._execute(operation, camera))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return operation
+    
+    async def _execute(self, operation: Dict[str, Any], camera: Optional[Camera]):
+        camera_id = operation['camera_id']
+        async with self._lock(camera_id):
+            operation['status'] = "running"
+            try:
+                if operation['action'] in ("stop", "restart"):
+                    await self._stop(camera_id)
+                if operation['action'] in ("start", "restart"):
+                    self._start(camera)
+                operation['status'] = "completed"
+            except Exception as e:
+                operation['status'] = "failed"
+                operation['error'] = str(e)
+                logger.error(f"Recorder {operation['action']} failed for camera {camera_id}: {e}")
+            finally:
+                operation['finished_at'] = datetime.now(timezone.utc).isoformat()
+    
+    def _start(self, camera: Camera):
+        if camera.id in active_recorders:
+            return active_recorders[camera.id]
+        recorder = create_recorder(camera)
+        recorder.start()
+        active_recorders[camera.id] = recorder
+        return recorder
+    
+    async def _stop(self, camera_id: str):
+        recorder = active_recorders.pop(camera_id, None)
+        if recorder:
+            await asyncio.get_running_loop().run_in_executor(self.executor, recorder.stop)
+    
+    async def start(self, camera: Camera):
+        """Start a recorder and wait for it (for internal callers such as the startup scheduler)"""
+        async with self._lock(camera.id):
+            return self._start(camera)
+    
+    async def stop(self, camera_id: str):
+        """Stop a recorder and wait until its thread has finished"""
+        async with self._lock(camera_id):
+            await self._stop(camera_id)
+    
+    async def stop_all(self):
+        """Stop every recorder in parallel"""
+        await asyncio.gather(*(self.stop(camera_id) for camera_id in list(active_recorders)))
+    
+    def get_operation(self, operation_id: str) -> Optional[Dict[str, Any]]:
+        return self.operations.get(operation_id)
+    
+    def _prune_operations(self):
+        finished = [op for op in self.operations.values() if op['status'] in ("completed", "failed")]
+        if len(finished) > MAX_FINISHED_RECORDER_OPERATIONS:
+            finished.sort(key=lambda op: op['created_at'])
+            for op in finished[:len(finished) - MAX_FINISHED_RECORDER_OPERATIONS]:
+                self.operations.pop(op['id'], None)
+
+recorder_manager = RecorderManager()
+
+# Detection replay
+REPLAY_WORKERS = int(os.environ.get('REPLAY_WORKERS', 0)) or max(1, (os.cpu_count() or 2) // 2)
+REPLAY_MAX_ACTIVE_JOBS = int(os.environ.get('REPLAY_MAX_ACTIVE_JOBS', 2))  # Further submissions get 409
+REPLAY_MAX_PARAMETER_SETS = 64
+MAX_FINISHED_REPLAY_JOBS = 50
+REPLAY_PARAMETERS = {
+    "motion_algorithm", "motion_sensitivity", "min_object_area", "min_motion_duration", "post_recording_seconds",
+    "blur_size", "motion_threshold", "mog2_history", "mog2_var_threshold", "detect_shadows",
+    "detection_zones", "excluded_zones"
+}
+
+def replay_frames(file_path: str, sample_fps: float, pixels: bool = True, motion_vectors: bool = False):
+    """
+    Decode a recording and yield (seconds, frame, energy) at sample_fps: the BGR frame when
+    `pixels`, and the mean motion-vector grid since the previous sample when `motion_vectors`
+    """
+    container = av.open(file_path)
+    try:
+        stream = container.streams.video[0]
+        if motion_vectors:
+            stream.codec_context.options = {'flags2': '+export_mvs', 'skip_loop_filter': 'all'}
+        rate = float(stream.average_rate or 25)
+        
+        energy, energy_frames = None, 0
+        next_sample = 0.0
+        for index, frame in enumerate(container.decode(stream)):
+            seconds = frame.time if frame.time is not None else index / rate
+            if motion_vectors:
+                grid = motion_vector_energy(frame)
+                if grid is not None:
+                    if energy is None or energy.shape != grid.shape:
+                        energy, energy_frames = grid, 1
+                    else:
+                        energy += grid
+                        energy_frames += 1
+            if seconds + 1e-6 < next_sample:
+                continue
+            next_sample = seconds + 1 / sample_fps
+            
+            image = frame.to_ndarray(format='bgr24') if pixels else None
+            mean_energy = energy / energy_frames if energy is not None else None
+            energy, energy_frames = None, 0
+            yield seconds, image, mean_energy
+    finally:
+        container.close()
+
+def replay_detection(source, camera_doc: Dict[str, Any], parameter_sets: List[Dict[str, Any]], sample_fps: float = 5.0) -> List[Dict[str, Any]]:
+    """
+    Run the recorder's detection models (MotionDetector.prepare + detect, same as the shared
+    detection service) over a recording for several parameter sets at once, decoding the file
+    a single time. `source` is a file path or an iterable of (seconds, frame, energy).
+    Returns one summary per parameter set: trigger timeline and counts, raw hits and cost.
+    """
+    models = [MotionDetector(Camera(**{**camera_doc, **params})) for params in parameter_sets]
+    states = [{"frames": 0, "raw_hits": 0, "seconds": 0.0, "segments": [], "open": None} for _ in models]
+    
+    if isinstance(source, str):
+        need_mv = any(model.camera.motion_algorithm == "mv" for model in models)
+        need_pixels = any(model.camera.motion_algorithm != "mv" for model in models)
+        source = replay_frames(source, sample_fps, pixels=need_pixels, motion_vectors=need_mv)
+    
+    duration = 0.0
+    for seconds, image, energy in source:
+        duration = seconds
+        for model, state in zip(models, states):
+            frame = energy if model.camera.motion_algorithm == "mv" else image
+            if frame is None:
+                continue
+            started = time.perf_counter()
+            small_frame, view = model.prepare(frame)
+            motion = model.detect(small_frame, view)
+            state['seconds'] += time.perf_counter() - started
+            state['frames'] += 1
+            state['raw_hits'] += int(model.last_raw_motion)
+            
+            # Filtered motion segments; gaps shorter than post-recording continue the same recording
+            if motion:
+                if state['open'] is None:
+                    last = state['segments'][-1] if state['segments'] else None
+                    if last and seconds - last[1] <= model.camera.post_recording_seconds:
+                        state['open'] = state['segments'].pop()[0]
+                    else:
+                        state['open'] = seconds
+                state['last_motion'] = seconds
+            elif state['open'] is not None:
+                state['segments'].append([state['open'], state['last_motion']])
+                state['open'] = None
+    
+    results = []
+    for params, model, state in zip(parameter_sets, models, states):
+        if state['open'] is not None:
+            state['segments'].append([state['open'], state['last_motion']])
+        # Like the recorder, only motion lasting min_motion_duration triggers a recording
+        triggers = [seg for seg in state['segments'] if seg[1] - seg[0] >= model.camera.min_motion_duration]
+        results.append({
+            "parameters": params,
+            "frames": state['frames'],
+            "duration": round(duration, 1),
+            "raw_hits": state['raw_hits'],
+            "triggers": len(triggers),
+            "motion_seconds": round(sum(end - start for start, end in triggers), 1),
+            "timeline": [[round(start, 1), round(end, 1)] for start, end in triggers],
+            "ms_per_frame": round(state['seconds'] * 1000 / max(1, state['frames']), 3)
+        })
+    return results
+
+class DetectionReplayService:
+    """
+    Replays stored recordings through the detection pipeline with many parameter sets.
+    Parameter sets are split into one chunk per worker and every (recording, chunk) pair
+    decodes its file once. All jobs share one spawn process pool of `max_workers` processes
+    (each imports the whole backend), created on demand and shut down when the last active
+    job finishes, so replays never take more than REPLAY_WORKERS cores from the recorders.
+    """
+    
+    def __init__(self, max_workers: int = REPLAY_WORKERS, max_active_jobs: int = REPLAY_MAX_ACTIVE_JOBS):
+        self.max_workers = max_workers
+        self.max_active_jobs = max_active_jobs
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.tasks = set()
+        self.executor = None
+    
+    def active_jobs(self) -> int:
+        return sum(1 for job in self.jobs.values() if job['status'] in ("pending", "running"))
+    
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+    
+    def submit(self, recordings: List[Dict[str, Any]], cameras: Dict[str, Dict[str, Any]], request: DetectionReplayRequest) -> Dict[str, Any]:
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "pending",
+            "recordings": len(recordings),
+            "parameter_sets": len(request.parameter_sets),
+            "completed_tasks": 0,
+            "total_tasks": 0,
+            "results": {},
+            "summary": [],
+            "errors": {},
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "finished_at": None
+        }
+        self.jobs[job['id']] = job
+        self._prune_jobs()
+        
+        task = asyncio.create_task(self._run(job, recordings, cameras, request))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return job
+    
+    async def _run(self, job: Dict[str, Any], recordings: List[Dict[str, Any]], cameras: Dict[str, Dict[str, Any]], request: DetectionReplayRequest):
+        sets = request.parameter_sets
+        chunk_count = max(1, min(self.max_workers, len(sets)))
+        bounds = [(len(sets) * i // chunk_count, len(sets) * (i + 1) // chunk_count) for i in range(chunk_count)]
+        
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        job['status'] = "running"
+        try:
+            async def replay_chunk(recording, start, end):
+                try:
+                    results = await loop.run_in_executor(
+                        executor, replay_detection, recording['file_path'],
+                        cameras[recording['camera_id']], sets[start:end], request.sample_fps
+                    )
+                    job['results'].setdefault(recording['id'], [None] * len(sets))[start:end] = results
+                except Exception as e:
+                    job['errors'][recording['id']] = str(e)
+                finally:
+                    job['completed_tasks'] += 1
+            
+            pending = [replay_chunk(rec, start, end) for rec in recordings for start, end in bounds if end > start]
+            job['total_tasks'] = len(pending)
+            await asyncio.gather(*pending)
+            
+            # Totals per parameter set across all recordings
+            for index, params in enumerate(sets):
+                per_recording = [results[index] for results in job['results'].values() if results[index]]
+                job['summary'].append({
+                    "parameters": params,
+                    "triggers": sum(r['triggers'] for r in per_recording),
+                    "raw_hits": sum(r['raw_hits'] for r in per_recording),
+                    "motion_seconds": round(sum(r['motion_seconds'] for r in per_recording), 1),
+                    "frames": sum(r['frames'] for r in per_recording)
+                })
+            job['status'] = "completed"
+        except Exception as e:
+            job['status'] = "failed"
+            job['errors']['job'] = str(e)
+            logger.error(f"Detection replay {job['id']} failed: {e}")
+        finally:
+            job['finished_at'] = datetime.now(timezone.utc).isoformat()
+            if not self.active_jobs() and self.executor is executor:
+                # Idle replay workers would keep a copy of the backend each in memory
+                self.executor = None
+                await asyncio.to_thread(executor.shutdown)
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+    
+    def _prune_jobs(self):
+        finished = [job for job in self.jobs.values() if job['status'] in ("completed", "failed")]
+        if len(finished) > MAX_FINISHED_REPLAY_JOBS:
+            finished.sort(key=lambda job: job['created_at'])
+            for job in finished[:len(finished) - MAX_FINISHED_REPLAY_JOBS]:
+                self.jobs.pop(job['id'], None)
+
+replay_service = DetectionReplayService()
+
 # API Endpoints
 @api_router.get("/")
 async def root():
@@ -2063,133 +4350,213 @@ async def test_player():
     with open("/app/backend/test_video_player.html", "r", encoding="utf-8") as f:
         return HTMLResponse(content=f.read())
 
-# Helper function to detect video codec
-def detect_codec(stream_url: str, username: Optional[str] = None, password: Optional[str] = None, timeout: int = 15) -> Optional[str]:
+# Stream probing (codec, resolution, fps, GOP, audio in a single stream read)
+probe_cache: Dict[tuple, tuple] = {}  # (stream_url, username, password hash) -> (expires_at, StreamProbeResult)
+probe_inflight: Dict[tuple, asyncio.Future] = {}
+probe_semaphore = asyncio.Semaphore(PROBE_CONCURRENCY)
+
+def build_stream_url_with_auth(stream_url: str, username: Optional[str] = None, password: Optional[str] = None) -> str:
+    """Embed credentials into RTSP URLs (HTTP streams use headers/basic auth instead)"""
+    if username and password and not stream_url.startswith('http') and '://' in stream_url:
+        protocol, rest = stream_url.split('://', 1)
+        return f"{protocol}://{username}:{password}@{rest}"
+    return stream_url
+
+def normalize_codec(codec_name: Optional[str]) -> Optional[str]:
+    """Map FFmpeg codec names to the codecs the recorder supports"""
+    codec = (codec_name or '').lower()
+    if codec in ['h264', 'avc']:
+        return 'h264'
+    if codec in ['h265', 'hevc']:
+        return 'h265'
+    if codec in ['mjpeg', 'jpeg']:
+        return 'mjpeg'
+    return None
+
+def _parse_frame_rate(rate: Optional[str]) -> Optional[float]:
+    """Rates come as fractions like '25/1'"""
+    try:
+        num, _, den = (rate or '').partition('/')
+        value = float(num) / float(den or 1)
+        return round(value, 2) if value > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def parse_probe_output(stream_url: str, data: Dict[str, Any]) -> StreamProbeResult:
+    """Build a probe result from ffprobe-style JSON (streams + sampled packets)"""
+    result = StreamProbeResult(stream_url=stream_url)
+    streams = data.get('streams', [])
+    video = next((st for st in streams if st.get('codec_type') == 'video'), None)
+    audio = next((st for st in streams if st.get('codec_type') == 'audio'), None)
+    
+    if audio:
+        result.has_audio = True
+        result.audio_codec = audio.get('codec_name')
+    
+    if not video:
+        result.error = "No video stream found"
+        return result
+    
+    result.codec_name = video.get('codec_name')
+    result.codec = normalize_codec(result.codec_name)
+    result.width = video.get('width') or None
+    result.height = video.get('height') or None
+    result.fps = _parse_frame_rate(video.get('avg_frame_rate')) or _parse_frame_rate(video.get('r_frame_rate'))
+    
+    # GOP = packets between consecutive keyframes of the video stream
+    keyframes = [
+        i for i, packet in enumerate(
+            pk for pk in data.get('packets', []) if pk.get('stream_index') == video.get('index')
+        ) if 'K' in packet.get('flags', '')
+    ]
+    if len(keyframes) >= 2:
+        result.gop = keyframes[1] - keyframes[0]
+    
+    result.success = result.codec is not None
+    if not result.success:
+        result.error = f"Unsupported codec: {result.codec_name}"
+    return result
+
+def _format_rate(rate) -> Optional[str]:
+    return f"{rate.numerator}/{rate.denominator}" if rate else None
+
+def _read_probe_sample(url: str, timeout: int) -> Dict[str, Any]:
     """
-    Detect video codec using ffprobe
-    Returns: 'h264', 'h265', 'mjpeg', or None if detection failed
+    Open the stream and demux video packets until the second keyframe gives the GOP,
+    PROBE_SAMPLE_SECONDS at most. fpsprobesize=0 ends PyAV's own stream analysis as soon as
+    the codec parameters are known; the frame rate comes from the sampled packet timestamps.
+    Returns the streams and packets in ffprobe's JSON layout.
     """
+    options = {'fpsprobesize': '0'}
+    if url.startswith('rtsp://'):
+        options['rtsp_transport'] = 'tcp'
+    container = av.open(url, options=options, timeout=timeout)
     try:
-        # Build stream URL with auth if provided
-        if username and password and not stream_url.startswith('http'):
-            # For RTSP
-            if '://' in stream_url:
-                protocol, rest = stream_url.split('://', 1)
-                stream_url_with_auth = f"{protocol}://{username}:{password}@{rest}"
-            else:
-                stream_url_with_auth = stream_url
-        else:
-            stream_url_with_auth = stream_url
-        
-        # Run ffprobe
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=codec_name',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            '-timeout', str(timeout * 1000000),  # microseconds
-            stream_url_with_auth
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=timeout,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            codec = result.stdout.strip().lower()
-            
-            # Map codec names
-            if codec in ['h264', 'avc']:
-                return 'h264'
-            elif codec in ['h265', 'hevc']:
-                return 'h265'
-            elif codec in ['mjpeg', 'jpeg']:
-                return 'mjpeg'
-            else:
-                logger.warning(f"Unknown codec detected: {codec}")
-                return None
-        else:
-            logger.error(f"ffprobe failed: {result.stderr}")
-            return None
+        streams = {
+            stream.index: {
+                "index": stream.index,
+                "codec_type": stream.type,
+                "codec_name": stream.codec_context.name,
+                "width": getattr(stream.codec_context, 'width', None),
+                "height": getattr(stream.codec_context, 'height', None),
+                "avg_frame_rate": _format_rate(getattr(stream, 'average_rate', None)),
+                "r_frame_rate": _format_rate(getattr(stream, 'base_rate', None))
+            }
+            for stream in container.streams
+        }
+        packets = []
+        if container.streams.video:
+            video = container.streams.video[0]
+            deadline = time.monotonic() + PROBE_SAMPLE_SECONDS
+            keyframes = 0
+            timestamps = []
+            for packet in container.demux(video):
+                if packet.size == 0:
+                    continue  # Flush packet at the end of the stream
+                packets.append({"stream_index": video.index, "flags": "K_" if packet.is_keyframe else "__"})
+                keyframes += packet.is_keyframe
+                if packet.pts is not None and packet.time_base:
+                    timestamps.append(packet.pts * packet.time_base)
+                if keyframes >= 2 or time.monotonic() >= deadline:
+                    break
+                if timestamps and timestamps[-1] - timestamps[0] >= PROBE_SAMPLE_SECONDS:
+                    break
             
-    except subprocess.TimeoutExpired:
-        logger.error(f"Timeout while detecting codec for {stream_url}")
-        return None
-    except Exception as e:
-        logger.error(f"Error detecting codec: {str(e)}")
-        return None
+            # Packets of the sample (the one starting the next GOP excluded) over the time they span
+            span = max(timestamps[:-1], default=0) - min(timestamps[:-1], default=0)
+            if span > 0:
+                rate = Fraction((len(timestamps) - 2) / span).limit_denominator(1001)
+                streams[video.index]["avg_frame_rate"] = _format_rate(rate)
+        return {"streams": list(streams.values()), "packets": packets}
+    finally:
+        container.close()
+
+async def _run_probe(stream_url: str, username: Optional[str], password: Optional[str], timeout: int) -> StreamProbeResult:
+    """Read one stream sample on a worker thread without blocking the event loop"""
+    url = build_stream_url_with_auth(stream_url, username, password)
+    try:
+        data = await asyncio.wait_for(asyncio.to_thread(_read_probe_sample, url, timeout), timeout=timeout + PROBE_SAMPLE_SECONDS)
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout while probing {stream_url}")
+        return StreamProbeResult(stream_url=stream_url, error="Probe timed out")
+    except av.FFmpegError as e:
+        logger.error(f"Probe failed for {stream_url}: {e}")
+        return StreamProbeResult(stream_url=stream_url, error=str(e) or "Probe failed")
+    
+    return parse_probe_output(stream_url, data)
 
-def detect_resolution(stream_url: str, username: Optional[str] = None, password: Optional[str] = None, timeout: int = 15) -> tuple:
+async def probe_stream(stream_url: str, username: Optional[str] = None, password: Optional[str] = None,
+                       timeout: int = PROBE_TIMEOUT_SECONDS, use_cache: bool = True) -> StreamProbeResult:
     """
-    Detect video resolution using ffprobe
-    Returns: (width, height) or (None, None) if detection failed
+    Probe a stream for codec, resolution, fps, GOP and audio.
+    Results are cached per stream URL and credentials for PROBE_CACHE_TTL_SECONDS, and
+    concurrent probes of the same URL and credentials share a single probe.
     """
+    # A probe that succeeded with the right password must not vouch for a wrong one
+    password_hash = hashlib.sha256(password.encode()).hexdigest() if password else None
+    key = (stream_url, username, password_hash)
+    now = time.monotonic()
+    
+    if use_cache:
+        cached = probe_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1].model_copy(update={"cached": True})
+    
+    if key in probe_inflight:
+        return (await asyncio.shield(probe_inflight[key])).model_copy()
+    
+    future = asyncio.get_running_loop().create_future()
+    probe_inflight[key] = future
     try:
-        # Build stream URL with auth if provided
-        if username and password and not stream_url.startswith('http'):
-            if '://' in stream_url:
-                protocol, rest = stream_url.split('://', 1)
-                stream_url_with_auth = f"{protocol}://{username}:{password}@{rest}"
-            else:
-                stream_url_with_auth = stream_url
-        else:
-            stream_url_with_auth = stream_url
-        
-        # Run ffprobe to get width and height
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=width,height',
-            '-of', 'csv=p=0',
-            '-timeout', str(timeout * 1000000),
-            stream_url_with_auth
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=timeout,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            output = result.stdout.strip()
-            if ',' in output:
-                width, height = output.split(',')
-                return (int(width), int(height))
+        async with probe_semaphore:
+            try:
+                result = await _run_probe(stream_url, username, password, timeout)
+            except Exception as e:
+                logger.error(f"Error probing {stream_url}: {str(e)}")
+                result = StreamProbeResult(stream_url=stream_url, error=str(e))
+        result.probed_at = datetime.now(timezone.utc).isoformat()
         
-        logger.error(f"Could not detect resolution: {result.stderr}")
-        return (None, None)
-            
-    except subprocess.TimeoutExpired:
-        logger.error(f"Timeout while detecting resolution for {stream_url}")
-        return (None, None)
-    except Exception as e:
-        logger.error(f"Error detecting resolution: {str(e)}")
-        return (None, None)
+        # Only successful probes are cached so an offline camera is re-checked next time
+        if result.success:
+            probe_cache[key] = (time.monotonic() + PROBE_CACHE_TTL_SECONDS, result)
+        future.set_result(result)
+        return result.model_copy()
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved when nobody else is waiting
+        raise
+    finally:
+        probe_inflight.pop(key, None)
+
+def _prune_probe_cache():
+    now = time.monotonic()
+    for key in [k for k, (expires_at, _) in probe_cache.items() if expires_at <= now]:
+        probe_cache.pop(key, None)
+
+@api_router.post("/cameras/probe", response_model=List[StreamProbeResult])
+async def probe_cameras(request: BatchProbeRequest):
+    """Probe many streams in parallel (bounded by PROBE_CONCURRENCY) before onboarding them"""
+    _prune_probe_cache()
+    return await asyncio.gather(*[
+        probe_stream(stream.stream_url, stream.username, stream.password, use_cache=request.use_cache)
+        for stream in request.streams
+    ])
 
 # Camera Management
 @api_router.post("/cameras", response_model=Camera)
 async def create_camera(camera_input: CameraCreate, background_tasks: BackgroundTasks):
-    # Auto-detect codec if not provided
+    # Auto-detect codec and resolution with one (cached) probe
+    logger.info(f"Probing stream for {camera_input.name}...")
+    probe = await probe_stream(
+        camera_input.stream_url,
+        camera_input.username,
+        camera_input.password
+    )
+    
     if not camera_input.codec:
-        logger.info(f"Auto-detecting codec and resolution for {camera_input.name}...")
-        detected_codec = detect_codec(
-            camera_input.stream_url,
-            camera_input.username,
-            camera_input.password
-        )
-        
-        if detected_codec:
-            camera_input.codec = detected_codec
-            logger.info(f"✅ Detected codec: {detected_codec}")
+        if probe.codec:
+            camera_input.codec = probe.codec
+            logger.info(f"✅ Detected codec: {probe.codec}")
         else:
             # Codec detection failed - return error asking for manual input
             raise HTTPException(
@@ -2201,45 +4568,118 @@ async def create_camera(camera_input: CameraCreate, background_tasks: Background
                 }
             )
     
-    # Auto-detect resolution
-    width, height = detect_resolution(
-        camera_input.stream_url,
-        camera_input.username,
-        camera_input.password
-    )
+    camera_dict = camera_input.model_dump()
     
-    if width and height:
-        camera_input.resolution_width = width
-        camera_input.resolution_height = height
-        logger.info(f"✅ Detected resolution: {width}x{height}")
+    if probe.width and probe.height:
+        camera_dict['resolution_width'] = probe.width
+        camera_dict['resolution_height'] = probe.height
+        logger.info(f"✅ Detected resolution: {probe.width}x{probe.height}")
     else:
         logger.warning(f"⚠️ Could not detect resolution, will use defaults")
     
-    camera_dict = camera_input.model_dump()
     camera = Camera(**camera_dict)
     
     doc = camera.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.cameras.insert_one(doc)
     
+    # In cluster mode the creating node takes the camera; rebalancing spreads it later
+    if cluster_coordinator and not await cluster_coordinator.may_run(camera.id):
+        return camera
+    
     # Start recorder
-    recorder = CameraRecorder(camera)
-    recorder.start()
-    active_recorders[camera.id] = recorder
+    await recorder_manager.start(camera)
     camera.status = "active"
     
     return camera
 
+@api_router.post("/cameras/bulk", response_model=BulkCameraResult)
+async def create_cameras_bulk(request: BulkCameraCreate):
+    """
+    Provision many cameras at once: probe all streams concurrently, insert the valid ones
+    with a single insert_many and hand them to the startup scheduler so recorders come
+    online gradually. Returns a result for every submitted camera, in input order.
+    """
+    _prune_probe_cache()
+    probes = await asyncio.gather(*[
+        probe_stream(cam.stream_url, cam.username, cam.password)
+        for cam in request.cameras
+    ])
+    
+    results = []
+    cameras = []
+    items = []  # Result item of each entry in `cameras`
+    for index, (camera_input, probe) in enumerate(zip(request.cameras, probes)):
+        item = BulkCameraItemResult(index=index, name=camera_input.name, stream_url=camera_input.stream_url)
+        results.append(item)
+        
+        codec = camera_input.codec or probe.codec
+        if not codec:
+            item.error = probe.error or "Could not auto-detect video codec"
+            continue
+        
+        camera_dict = camera_input.model_dump()
+        camera_dict['codec'] = codec
+        if probe.width and probe.height:
+            camera_dict['resolution_width'] = probe.width
+            camera_dict['resolution_height'] = probe.height
+        
+        camera = Camera(**camera_dict)
+        cameras.append(camera)
+        items.append(item)
+        item.codec = codec
+        item.resolution = f"{probe.width}x{probe.height}" if probe.width and probe.height else None
+    
+    if cameras:
+        docs = []
+        for camera in cameras:
+            doc = camera.model_dump()
+            doc['created_at'] = doc['created_at'].isoformat()
+            docs.append(doc)
+        
+        # Unordered insert keeps going past failed documents; report those per camera
+        write_errors = {}
+        try:
+            await db.cameras.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            write_errors = {error['index']: error.get('errmsg', 'Insert failed') for error in e.details.get('writeErrors', [])}
+        
+        inserted = []
+        for index, (camera, item) in enumerate(zip(cameras, items)):
+            if index in write_errors:
+                item.error = write_errors[index]
+                continue
+            item.success = True
+            item.camera_id = camera.id
+            inserted.append(camera)
+        cameras = inserted
+    
+    if cameras:
+        if cluster_coordinator:
+            cluster_coordinator.wake()  # Nodes claim their share of the new cameras
+        elif request.start_recorders:
+            startup_scheduler.schedule(cameras)
+    
+    created = len(cameras)
+    logger.info(f"📦 Bulk provisioning: {created} created, {len(results) - created} failed")
+    return BulkCameraResult(
+        total=len(results),
+        created=created,
+        failed=len(results) - created,
+        results=results
+    )
+
 @api_router.get("/cameras", response_model=List[Camera])
 async def get_cameras():
     cameras = await db.cameras.find({}, {"_id": 0}).to_list(1000)
+    remote = await cluster_coordinator.remote_statuses() if cluster_coordinator else {}
     
     for cam in cameras:
         if isinstance(cam['created_at'], str):
             cam['created_at'] = datetime.fromisoformat(cam['created_at'])
         
-        # Update status based on recorder
-        if cam['id'] in active_recorders:
+        # Update status based on recorder (local, or published by the owning node)
+        if cam['id'] in active_recorders or remote.get(cam['id'], {}).get('is_active'):
             cam['status'] = 'active'
         else:
             cam['status'] = 'inactive'
@@ -2258,11 +4698,19 @@ async def get_camera(camera_id: str):
     
     if camera_id in active_recorders:
         camera['status'] = 'active'
+    elif cluster_coordinator:
+        lease = await cluster_coordinator.owner_of(camera_id)
+        if lease and (lease.get('status') or {}).get('is_active'):
+            camera['status'] = 'active'
     
     return camera
 
 @api_router.put("/cameras/{camera_id}", response_model=Camera)
-async def update_camera(camera_id: str, camera_update: CameraUpdate):
+async def update_camera(camera_id: str, camera_update: CameraUpdate, request: Request):
+    forwarded = await proxy_to_owner(request, camera_id)
+    if forwarded:
+        return forwarded
+    
     camera = await db.cameras.find_one({"id": camera_id}, {"_id": 0})
     
     if not camera:
@@ -2274,15 +4722,11 @@ async def update_camera(camera_id: str, camera_update: CameraUpdate):
         await db.cameras.update_one({"id": camera_id}, {"$set": update_data})
         camera.update(update_data)
     
-    # Restart recorder with new settings
-    if camera_id in active_recorders:
-        active_recorders[camera_id].stop()
-        del active_recorders[camera_id]
-    
-    updated_camera = Camera(**camera)
-    recorder = CameraRecorder(updated_camera)
-    recorder.start()
-    active_recorders[camera_id] = recorder
+    # Restart recorder with new settings (in the background)
+    if not cluster_coordinator or await cluster_coordinator.may_run(camera_id):
+        recorder_manager.submit("restart", camera_id, Camera(**camera))
+    elif camera_id in active_recorders:
+        recorder_manager.submit("stop", camera_id)
     
     if isinstance(camera['created_at'], str):
         camera['created_at'] = datetime.fromisoformat(camera['created_at'])
@@ -2290,50 +4734,66 @@ async def update_camera(camera_id: str, camera_update: CameraUpdate):
     return camera
 
 @api_router.delete("/cameras/{camera_id}")
-async def delete_camera(camera_id: str):
+async def delete_camera(camera_id: str, request: Request):
+    forwarded = await proxy_to_owner(request, camera_id)
+    if forwarded:
+        return forwarded
+    
     camera = await db.cameras.find_one({"id": camera_id})
     
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    # Stop recorder
-    if camera_id in active_recorders:
-        active_recorders[camera_id].stop()
-        del active_recorders[camera_id]
+    # Stop recorder (in the background)
+    operation = recorder_manager.submit("stop", camera_id)
     
     await db.cameras.delete_one({"id": camera_id})
+    latency_histograms.remove(camera_id)
+    hot_path_timers.remove(camera_id)
+    
+    if cluster_coordinator:
+        await cluster_coordinator.release(camera_id, stop=False)  # The stop above runs in the background
     
-    return {"message": "Camera deleted successfully"}
+    return {"message": "Camera deleted successfully", "operation": operation}
 
 @api_router.post("/cameras/{camera_id}/start")
-async def start_camera(camera_id: str):
+async def start_camera(camera_id: str, request: Request):
+    forwarded = await proxy_to_owner(request, camera_id)
+    if forwarded:
+        return forwarded
+    
     camera = await db.cameras.find_one({"id": camera_id}, {"_id": 0})
     
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    if camera_id not in active_recorders:
-        if isinstance(camera['created_at'], str):
-            camera['created_at'] = datetime.fromisoformat(camera['created_at'])
-        
-        cam = Camera(**camera)
-        recorder = CameraRecorder(cam)
-        recorder.start()
-        active_recorders[camera_id] = recorder
+    if cluster_coordinator and not await cluster_coordinator.may_run(camera_id):
+        raise HTTPException(status_code=409, detail="Camera is owned by another node")
+    
+    if isinstance(camera['created_at'], str):
+        camera['created_at'] = datetime.fromisoformat(camera['created_at'])
     
-    return {"message": "Camera started"}
+    operation = recorder_manager.submit("start", camera_id, Camera(**camera))
+    
+    return {"message": "Camera starting", "operation": operation}
 
 @api_router.post("/cameras/{camera_id}/stop")
-async def stop_camera(camera_id: str):
-    if camera_id in active_recorders:
-        active_recorders[camera_id].stop()
-        del active_recorders[camera_id]
+async def stop_camera(camera_id: str, request: Request):
+    forwarded = await proxy_to_owner(request, camera_id)
+    if forwarded:
+        return forwarded
     
-    return {"message": "Camera stopped"}
+    operation = recorder_manager.submit("stop", camera_id)
+    
+    return {"message": "Camera stopping", "operation": operation}
 
 @api_router.get("/cameras/{camera_id}/snapshot")
-async def get_camera_snapshot(camera_id: str):
+async def get_camera_snapshot(camera_id: str, request: Request):
     """Get current snapshot from camera for zone drawing"""
+    forwarded = await proxy_to_owner(request, camera_id)
+    if forwarded:
+        return forwarded
+    
     camera = await db.cameras.find_one({"id": camera_id}, {"_id": 0})
     
     if not camera:
@@ -2346,7 +4806,7 @@ async def get_camera_snapshot(camera_id: str):
         
         if frame is not None:
             # Encode frame as JPEG
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            buffer = encode_jpeg(camera_id, frame, 85)
             return Response(content=buffer.tobytes(), media_type="image/jpeg")
     
     # If no active recorder, try to get a temporary snapshot
@@ -2368,7 +4828,7 @@ async def get_camera_snapshot(camera_id: str):
                 ret, frame = cap.read()
                 if ret and frame is not None:
                     cap.release()
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                    buffer = encode_jpeg(camera_id, frame, 85)
                     return Response(content=buffer.tobytes(), media_type="image/jpeg")
             
             cap.release()
@@ -2376,7 +4836,7 @@ async def get_camera_snapshot(camera_id: str):
         elif cam.stream_type == "http-mjpeg":
             frame = temp_recorder._get_http_mjpeg_frame(stream_url)
             if frame is not None:
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                buffer = encode_jpeg(camera_id, frame, 85)
                 return Response(content=buffer.tobytes(), media_type="image/jpeg")
         
         elif cam.stream_type == "http-snapshot":
@@ -2385,7 +4845,7 @@ async def get_camera_snapshot(camera_id: str):
                 auth = (cam.username, cam.password)
             frame = temp_recorder._get_http_snapshot(stream_url, auth)
             if frame is not None:
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                buffer = encode_jpeg(camera_id, frame, 85)
                 return Response(content=buffer.tobytes(), media_type="image/jpeg")
     
     except Exception as e:
@@ -2395,8 +4855,12 @@ async def get_camera_snapshot(camera_id: str):
     raise HTTPException(status_code=500, detail="Failed to get camera snapshot")
 
 @api_router.put("/cameras/{camera_id}/excluded-zones")
-async def update_excluded_zones(camera_id: str, zones: List[Dict[str, Any]]):
+async def update_excluded_zones(camera_id: str, zones: List[Dict[str, Any]], request: Request):
     """Update exclusion zones for motion detection"""
+    forwarded = await proxy_to_owner(request, camera_id)
+    if forwarded:
+        return forwarded
+    
     camera = await db.cameras.find_one({"id": camera_id}, {"_id": 0})
     
     if not camera:
@@ -2405,19 +4869,13 @@ async def update_excluded_zones(camera_id: str, zones: List[Dict[str, Any]]):
     # Update excluded zones in database
     await db.cameras.update_one({"id": camera_id}, {"$set": {"excluded_zones": zones}})
     
-    # Restart recorder to apply new settings
+    # Restart recorder to apply new settings (in the background)
     if camera_id in active_recorders:
-        active_recorders[camera_id].stop()
-        del active_recorders[camera_id]
-        
         camera['excluded_zones'] = zones
         if isinstance(camera['created_at'], str):
             camera['created_at'] = datetime.fromisoformat(camera['created_at'])
         
-        updated_camera = Camera(**camera)
-        recorder = CameraRecorder(updated_camera)
-        recorder.start()
-        active_recorders[camera_id] = recorder
+        recorder_manager.submit("restart", camera_id, Camera(**camera))
     
     return {"message": "Exclusion zones updated successfully", "zones": zones}
 
@@ -2425,6 +4883,7 @@ async def update_excluded_zones(camera_id: str, zones: List[Dict[str, Any]]):
 async def get_cameras_status():
     """Get real-time status of all cameras including recording and motion detection state"""
     cameras = await db.cameras.find({}, {"_id": 0}).to_list(1000)
+    remote = await cluster_coordinator.remote_statuses() if cluster_coordinator else {}
     
     status_list = []
     for cam in cameras:
@@ -2440,14 +4899,540 @@ async def get_cameras_status():
         # Get recorder status if active
         if cam['id'] in active_recorders:
             recorder = active_recorders[cam['id']]
-            camera_status['is_recording'] = recorder.current_recording is not None or recorder.motion_writer is not None
+            camera_status['is_recording'] = recorder.is_recording
             camera_status['motion_state'] = recorder.motion_state
             camera_status['is_motion_detected'] = recorder.motion_state in ['recording', 'cooldown']
+        elif cam['id'] in remote:
+            # Running on another cluster node: use the status it publishes with its lease
+            published = remote[cam['id']]
+            camera_status['is_active'] = published.get('is_active', False)
+            camera_status['is_recording'] = published.get('is_recording', False)
+            camera_status['motion_state'] = published.get('motion_state', 'idle')
+            camera_status['is_motion_detected'] = camera_status['motion_state'] in ['recording', 'cooldown']
+            camera_status['node_id'] = published['node_id']
         
         status_list.append(camera_status)
     
     return status_list
 
+@api_router.post("/cameras/bulk-start")
+async def bulk_start_cameras(request: BulkCameraIds):
+    """Start many cameras without waiting for them; returns one operation per camera"""
+    cameras = await db.cameras.find({"id": {"$in": request.camera_ids}}, {"_id": 0}).to_list(None)
+    operations = []
+    for camera in cameras:
+        if cluster_coordinator and not await cluster_coordinator.may_run(camera['id']):
+            continue
+        if isinstance(camera['created_at'], str):
+            camera['created_at'] = datetime.fromisoformat(camera['created_at'])
+        operations.append(recorder_manager.submit("start", camera['id'], Camera(**camera)))
+    return {"message": f"Starting {len(operations)} cameras", "operations": operations}
+
+@api_router.post("/cameras/bulk-stop")
+async def bulk_stop_cameras(request: BulkCameraIds):
+    """Stop many cameras in parallel without blocking the API; returns one operation per camera"""
+    operations = [recorder_manager.submit("stop", camera_id) for camera_id in request.camera_ids]
+    return {"message": f"Stopping {len(operations)} cameras", "operations": operations}
+
+@api_router.get("/recorders/operations/{operation_id}")
+async def get_recorder_operation(operation_id: str):
+    """Progress of a start/stop/restart submitted to the recorder manager"""
+    operation = recorder_manager.get_operation(operation_id)
+    if not operation:
+        raise HTTPException(status_code=404, detail="Operation not found")
+    return operation
+
+@api_router.get("/detection/cadence")
+async def get_detection_cadence():
+    """Global detection CPU budget and each local camera's current detection rate"""
+    cameras = {}
+    for camera_id, recorder in list(active_recorders.items()):
+        if isinstance(recorder, RemoteRecorder):
+            if recorder.cadence:
+                cameras[camera_id] = recorder.cadence
+        elif hasattr(recorder, 'detection_cadence'):
+            cameras[camera_id] = recorder.detection_cadence.get_status()
+    return {
+        "budget": detection_budget.get_status(),
+        "cameras": cameras
+    }
+
+@api_router.get("/detection/stats")
+async def get_detection_stats():
+    """Shared detection pool: queue depth and per-camera latency/throughput (recorder workers run their own pools)"""
+    status = detection_service.get_status()
+    for camera_id, recorder in list(active_recorders.items()):
+        if isinstance(recorder, RemoteRecorder) and recorder.detection:
+            status['cameras'][camera_id] = recorder.detection
+    return status
+
+@api_router.post("/detection/replay")
+async def start_detection_replay(request: DetectionReplayRequest):
+    """
+    Replay recordings through motion detection with several parameter sets (overrides of the
+    camera's detection settings) on a process pool; poll the returned job for timelines and counts
+    """
+    if not request.parameter_sets or len(request.parameter_sets) > REPLAY_MAX_PARAMETER_SETS:
+        raise HTTPException(status_code=400, detail=f"Provide 1-{REPLAY_MAX_PARAMETER_SETS} parameter sets")
+    if request.sample_fps <= 0:
+        raise HTTPException(status_code=400, detail="sample_fps must be positive")
+    for params in request.parameter_sets:
+        unknown = set(params) - REPLAY_PARAMETERS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unsupported parameters: {', '.join(sorted(unknown))}")
+    
+    recordings = await db.recordings.find(
+        {"id": {"$in": request.recording_ids}}, {"_id": 0, "id": 1, "camera_id": 1, "camera_name": 1, "file_path": 1}
+    ).to_list(len(request.recording_ids))
+    recordings = [rec for rec in recordings if os.path.exists(rec['file_path'])]
+    if not recordings:
+        raise HTTPException(status_code=404, detail="No recording files found")
+    
+    # Current camera settings are the baseline each parameter set overrides
+    cameras = {}
+    for rec in recordings:
+        if rec['camera_id'] in cameras:
+            continue
+        camera_doc = await db.cameras.find_one({"id": rec['camera_id']}, {"_id": 0})
+        camera_doc = camera_doc or {"id": rec['camera_id'], "name": rec.get('camera_name', rec['camera_id']), "stream_url": ""}
+        try:
+            baseline = Camera(**camera_doc).model_dump()
+            for params in request.parameter_sets:
+                Camera(**{**baseline, **params})
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        cameras[rec['camera_id']] = baseline
+    
+    if replay_service.active_jobs() >= replay_service.max_active_jobs:
+        raise HTTPException(status_code=409, detail=f"{replay_service.max_active_jobs} replay jobs are already running, try again later")
+    
+    job = replay_service.submit(recordings, cameras, request)
+    return {"message": f"Replaying {len(recordings)} recordings with {len(request.parameter_sets)} parameter sets", "job": job}
+
+@api_router.get("/detection/replay/{job_id}")
+async def get_detection_replay(job_id: str):
+    """Progress and results of a detection replay job"""
+    job = replay_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Replay job not found")
+    return job
+
+@api_router.get("/metrics/latency")
+async def get_latency_metrics():
+    """
+    Per-camera end-to-end latency from frame read to detection, motion event, finished clip,
+    transcode and Telegram alert: count, mean, estimated p50/p95 and raw bucket counts
+    """
+    cameras = latency_histograms.snapshot()
+    for camera_id, recorder in list(active_recorders.items()):
+        if isinstance(recorder, RemoteRecorder):
+            cameras[camera_id] = recorder.latency
+    return {
+        "buckets": list(LATENCY_BUCKETS),
+        "cameras": {camera_id: latency_histograms.summarize(stages) for camera_id, stages in cameras.items() if stages}
+    }
+
+@api_router.get("/admin/timers")
+async def get_hot_path_timers():
+    """Always-on per-camera timers: detect_motion, frame_read and imencode (live view and snapshots)"""
+    cameras = hot_path_timers.snapshot()
+    for camera_id, recorder in list(active_recorders.items()):
+        if isinstance(recorder, RemoteRecorder):
+            cameras[camera_id] = {**recorder.timers, **cameras.get(camera_id, {})}
+    return {
+        "cameras": {
+            camera_id: {
+                name: {
+                    "count": timer['count'],
+                    "total_s": round(timer['total_s'], 3),
+                    "mean_ms": round(timer['total_s'] / timer['count'] * 1000, 3) if timer['count'] else 0.0,
+                    "max_ms": round(timer['max_s'] * 1000, 3)
+                }
+                for name, timer in timers.items()
+            }
+            for camera_id, timers in cameras.items()
+        }
+    }
+
+profile_lock = asyncio.Lock()
+
+@api_router.post("/admin/profile")
+async def run_sampling_profiler(seconds: float = 10.0, interval_ms: float = PROFILE_INTERVAL * 1000,
+                                threads: Optional[str] = None, output: str = "collapsed"):
+    """
+    Sample the stacks of all threads of the API process and the recorder workers for `seconds`.
+    Returns collapsed stacks ("process;thread;frames... count") for flamegraph.pl or speedscope,
+    or JSON with output=json. `threads` keeps only threads whose name contains it (e.g. "recorder-").
+    """
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS}]")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if output not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="output must be 'collapsed' or 'json'")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async with profile_lock:
+        interval = interval_ms / 1000
+        tasks = [asyncio.to_thread(sample_stacks, seconds, interval, threads)]
+        if recorder_pool:
+            tasks.append(asyncio.to_thread(recorder_pool.profile, seconds, interval, threads))
+        results = await asyncio.gather(*tasks)
+    
+    stacks = Counter({f"api;{stack}": count for stack, count in results[0].items()})
+    for worker_stacks in results[1:]:
+        stacks.update(worker_stacks)
+    
+    if output == "json":
+        return {
+            "seconds": seconds,
+            "interval_ms": interval_ms,
+            "samples": sum(stacks.values()),
+            "stacks": dict(stacks.most_common())
+        }
+    body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    return Response(content=body, media_type="text/plain; charset=utf-8")
+
+@api_router.get("/recorders/workers")
+async def get_recorder_workers():
+    """How recorders are hosted: worker processes (with per-worker load) or in-process threads"""
+    if recorder_pool:
+        return recorder_pool.get_status()
+    return {"mode": "threads", "recorders": len(active_recorders)}
+
+# Bulk deletion pipeline
+def _unlink_files(file_paths: List[str]) -> int:
+    """Remove files from disk (sync, run in a worker thread). Returns freed bytes."""
+    freed = 0
+    for file_path in file_paths:
+        if not file_path:
+            continue
+        try:
+            size = os.path.getsize(file_path)
+            os.remove(file_path)
+            freed += size
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error deleting file {file_path}: {e}")
+    return freed
+
+async def unlink_files_parallel(file_paths: List[Optional[str]], chunk_size: int = 64) -> int:
+    """Remove files in parallel on the file I/O thread pool. Returns freed bytes."""
+    paths = [path for path in file_paths if path]
+    if not paths:
+        return 0
+    
+    loop = asyncio.get_running_loop()
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    results = await asyncio.gather(*(
+        loop.run_in_executor(file_io_executor, _unlink_files, chunk) for chunk in chunks
+    ))
+    return sum(results)
+
+RECORDING_FILE_FIELDS = ["file_path", "thumbnail_path", "sprite_path"]  # Files owned by a recording document
+MOTION_EVENT_FILE_FIELDS = ["snapshot_path"]
+delete_jobs: Dict[str, Dict[str, Any]] = {}  # job_id -> progress of background bulk deletes
+_delete_job_tasks = set()  # Strong references so background tasks are not garbage collected
+MAX_FINISHED_DELETE_JOBS = 100
+
+async def bulk_delete_documents(collection, query: Dict[str, Any], path_fields: List[str], job: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Delete all documents matching query together with their files.
+    Per batch: one indexed find, parallel file unlinks on the thread pool, one delete_many.
+    """
+    deleted = 0
+    failed = 0
+    freed = 0
+    
+    while True:
+        batch = await collection.find(
+            query, {"_id": 0, "id": 1, **{field: 1 for field in path_fields}}
+        ).limit(BULK_DELETE_BATCH_SIZE).to_list(BULK_DELETE_BATCH_SIZE)
+        
+        if not batch:
+            break
+        
+        try:
+            freed += await unlink_files_parallel([doc.get(field) for doc in batch for field in path_fields])
+            result = await collection.delete_many({"id": {"$in": [doc['id'] for doc in batch]}})
+            deleted += result.deleted_count
+        except Exception as e:
+            logger.error(f"Error in bulk delete batch ({collection.name}): {e}")
+            failed += len(batch)
+            break
+        
+        if job is not None:
+            job['deleted'] = deleted
+            job['freed_bytes'] = freed
+        
+        if result.deleted_count == 0:
+            break
+    
+    return {"deleted": deleted, "failed": failed, "freed_bytes": freed}
+
+def _prune_delete_jobs():
+    finished = [job for job in delete_jobs.values() if job['status'] != "running"]
+    if len(finished) > MAX_FINISHED_DELETE_JOBS:
+        finished.sort(key=lambda job: job['started_at'])
+        for job in finished[:len(finished) - MAX_FINISHED_DELETE_JOBS]:
+            delete_jobs.pop(job['id'], None)
+
+async def _run_delete_job(job: Dict[str, Any], collection, query: Dict[str, Any], path_fields: List[str]):
+    try:
+        result = await bulk_delete_documents(collection, query, path_fields, job)
+        job.update(result)
+        job['status'] = "completed"
+        logger.info(f"Bulk delete job {job['id']} finished: {result['deleted']} {job['kind']} deleted")
+    except Exception as e:
+        job['status'] = "failed"
+        job['error'] = str(e)
+        logger.error(f"Bulk delete job {job['id']} failed: {e}")
+    finally:
+        job['finished_at'] = datetime.now(timezone.utc).isoformat()
+
+async def run_bulk_delete(kind: str, collection, query: Dict[str, Any], path_fields: List[str], total: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run a bulk delete inline for small jobs, or as a background job (pollable via
+    /api/delete-jobs/{job_id}) when more than BULK_DELETE_BACKGROUND_THRESHOLD documents match.
+    """
+    if total is None:
+        total = await collection.count_documents(query)
+    
+    if total <= BULK_DELETE_BACKGROUND_THRESHOLD:
+        return await bulk_delete_documents(collection, query, path_fields)
+    
+    _prune_delete_jobs()
+    job = {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "status": "running",
+        "total": total,
+        "deleted": 0,
+        "failed": 0,
+        "freed_bytes": 0,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None
+    }
+    delete_jobs[job['id']] = job
+    
+    task = asyncio.create_task(_run_delete_job(job, collection, query, path_fields))
+    _delete_job_tasks.add(task)
+    task.add_done_callback(_delete_job_tasks.discard)
+    
+    logger.info(f"Started background bulk delete job {job['id']} for {total} {kind}")
+    return {"deleted": 0, "failed": 0, "job_id": job['id'], "status": "running", "total": total}
+
+def _bulk_delete_response(result: Dict[str, Any], noun: str, suffix: str = "") -> Dict[str, Any]:
+    if result.get('job_id'):
+        result['message'] = f"Deleting {result['total']} {noun}{suffix} in background"
+    else:
+        result['message'] = f"Deleted {result['deleted']} {noun}{suffix}"
+    return result
+
+@api_router.get("/delete-jobs")
+async def get_delete_jobs():
+    """List background bulk delete jobs"""
+    return sorted(delete_jobs.values(), key=lambda job: job['started_at'], reverse=True)
+
+@api_router.get("/delete-jobs/{job_id}")
+async def get_delete_job(job_id: str):
+    """Get progress of a background bulk delete job"""
+    job = delete_jobs.get(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Delete job not found")
+    
+    return job
+
+# Recording file serving
+RANGE_READ_CHUNK_SIZE = 1024 * 1024  # 1 MiB reads, aligned to chunk boundaries
+MAX_RANGES_PER_REQUEST = 16  # More ranges than this are answered with the full file
+RECORDINGS_ACCEL_REDIRECT_PREFIX = os.environ.get('RECORDINGS_ACCEL_REDIRECT_PREFIX')  # e.g. "/protected-recordings/" for nginx
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[List[tuple]]:
+    """
+    Parse an HTTP Range header into a list of inclusive (start, end) byte ranges.
+    Supports "a-b", open-ended "a-" and suffix "-n" ranges, comma-separated.
+    Returns None if the header is malformed (serve the full file) and [] if no range is satisfiable.
+    """
+    unit, _, ranges_spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not ranges_spec:
+        return None
+    
+    ranges = []
+    for part in ranges_spec.split(","):
+        part = part.strip()
+        if "-" not in part:
+            return None
+        start_str, _, end_str = part.partition("-")
+        try:
+            if not start_str:
+                # Suffix range: last N bytes
+                suffix_length = int(end_str)
+                if suffix_length <= 0:
+                    continue
+                start = max(file_size - suffix_length, 0)
+                end = file_size - 1
+            else:
+                start = int(start_str)
+                if end_str:
+                    end = int(end_str)
+                    if end < start:
+                        return None
+                    end = min(end, file_size - 1)
+                else:
+                    end = file_size - 1
+        except ValueError:
+            return None
+        
+        if start < file_size and start <= end:
+            ranges.append((start, end))
+    
+    if len(ranges) > MAX_RANGES_PER_REQUEST:
+        return None
+    
+    # Merge overlapping/adjacent ranges so multi-range responses never repeat bytes
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def file_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+class RangeFileResponse(Response):
+    """
+    File response serving a full file, a single byte range or multipart/byteranges.
+    Uses the ASGI zero-copy send extension when the server offers it, otherwise
+    streams with large aligned reads on a worker thread.
+    """
+    
+    def __init__(self, path: str, stat_result: os.stat_result, ranges: Optional[List[tuple]] = None,
+                 media_type: str = "video/mp4", headers: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.file_size = stat_result.st_size
+        self.ranges = ranges
+        self.media_type = media_type
+        self.background = None
+        self.boundary = None
+        self.closing = b""
+        self.parts = []
+        
+        if not ranges:
+            self.status_code = 200
+            self.parts = [(b"", 0, self.file_size - 1)] if self.file_size else []
+            content_length = self.file_size
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.status_code = 206
+            self.parts = [(b"", start, end)]
+            content_length = end - start + 1
+        else:
+            self.status_code = 206
+            self.boundary = uuid.uuid4().hex
+            content_length = 0
+            for start, end in ranges:
+                part_header = (
+                    f"--{self.boundary}\r\n"
+                    f"Content-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+                ).encode()
+                # Each part after the first starts with the CRLF that ends the previous part
+                if self.parts:
+                    part_header = b"\r\n" + part_header
+                self.parts.append((part_header, start, end))
+                content_length += len(part_header) + end - start + 1
+            self.closing = f"\r\n--{self.boundary}--\r\n".encode()
+            content_length += len(self.closing)
+        
+        self.init_headers(headers)
+        self.headers["content-length"] = str(content_length)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["etag"] = file_etag(stat_result)
+        self.headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        if self.boundary:
+            self.headers["content-type"] = f"multipart/byteranges; boundary={self.boundary}"
+        elif ranges:
+            start, end = ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.file_size}"
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        
+        if scope["method"].upper() == "HEAD" or not self.parts:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        
+        zero_copy = "http.response.zerocopysend" in scope.get("extensions", {})
+        
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            for part_header, start, end in self.parts:
+                if part_header:
+                    await send({"type": "http.response.body", "body": part_header, "more_body": True})
+                
+                if zero_copy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": file.wrapped.fileno(),
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True
+                    })
+                    continue
+                
+                await file.seek(start)
+                position = start
+                while position <= end:
+                    # First read stops at a chunk boundary so later reads are aligned
+                    read_size = min(RANGE_READ_CHUNK_SIZE - position % RANGE_READ_CHUNK_SIZE, end - position + 1)
+                    chunk = await file.read(read_size)
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        
+        await send({"type": "http.response.body", "body": self.closing, "more_body": False})
+
+def _not_modified(request: Request, etag: str, stat_result: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat_result.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def _if_range_matches(if_range: str, etag: str, stat_result: os.stat_result) -> bool:
+    if_range = if_range.strip()
+    if if_range.startswith('W/'):
+        return False  # If-Range needs a strong validator (RFC 9110 13.1.5): send the full file
+    if if_range.startswith('"'):
+        return if_range == etag
+    try:
+        return int(stat_result.st_mtime) <= parsedate_to_datetime(if_range).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def _accel_redirect_path(file_path: str) -> Optional[str]:
+    """Internal nginx location for a recording file, if it lives under the default storage path"""
+    if not RECORDINGS_ACCEL_REDIRECT_PREFIX:
+        return None
+    try:
+        relative = Path(file_path).resolve().relative_to(STORAGE_PATH.resolve())
+    except ValueError:
+        return None
+    return RECORDINGS_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative.as_posix())
+
 # Recordings
 @api_router.get("/recordings", response_model=List[Recording])
 async def get_recordings(camera_id: Optional[str] = None, recording_type: Optional[str] = None, limit: int = 100):
@@ -2476,48 +5461,97 @@ async def get_recording_file(recording_id: str, request: Request):
     
     file_path = recording['file_path']
     
-    if not os.path.exists(file_path):
+    # Single stat off the event loop replaces exists() + getsize()
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Recording file not found")
     
-    # Get file size
-    file_size = os.path.getsize(file_path)
+    media_type = mimetypes.guess_type(file_path)[0] or "video/mp4"
+    
+    # Let nginx serve the bytes (sendfile, ranges, caching) when configured
+    accel_path = _accel_redirect_path(file_path)
+    if accel_path:
+        return Response(headers={"X-Accel-Redirect": accel_path}, media_type=media_type)
     
-    # Check for Range header (for video streaming)
+    etag = file_etag(stat_result)
+    if _not_modified(request, etag, stat_result):
+        return Response(status_code=304, headers={
+            "ETag": etag,
+            "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True)
+        })
+    
+    # Check for Range header (for video streaming); a stale If-Range means send the whole file
     range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and not _if_range_matches(if_range, etag, stat_result):
+        range_header = None
     
     if range_header:
-        # Parse range header
-        range_match = range_header.replace("bytes=", "").split("-")
-        start = int(range_match[0]) if range_match[0] else 0
-        end = int(range_match[1]) if range_match[1] else file_size - 1
-        
-        # Ensure end doesn't exceed file size
-        end = min(end, file_size - 1)
-        chunk_size = end - start + 1
-        
-        # Stream the requested range
-        def iterfile():
-            with open(file_path, "rb") as f:
-                f.seek(start)
-                remaining = chunk_size
-                while remaining > 0:
-                    chunk = f.read(min(8192, remaining))
-                    if not chunk:
-                        break
-                    remaining -= len(chunk)
-                    yield chunk
-        
-        headers = {
-            "Content-Range": f"bytes {start}-{end}/{file_size}",
-            "Accept-Ranges": "bytes",
-            "Content-Length": str(chunk_size),
-            "Content-Type": "video/mp4",
-        }
+        ranges = parse_range_header(range_header, stat_result.st_size)
         
-        return StreamingResponse(iterfile(), status_code=206, headers=headers)
+        if ranges == []:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{stat_result.st_size}"})
+        
+        if ranges:
+            return RangeFileResponse(file_path, stat_result, ranges, media_type=media_type)
     
     # No range requested, return full file
-    return FileResponse(file_path, media_type="video/mp4", filename=os.path.basename(file_path))
+    filename = os.path.basename(file_path)
+    return RangeFileResponse(
+        file_path, stat_result, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Thumbnails and sprite sheets never change once written, so browsers may cache them forever
+PREVIEW_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PREVIEW_PATH_CACHE_SIZE = 4096
+preview_path_cache = OrderedDict()  # (recording_id, field) -> preview file path, avoids a DB lookup per image
+
+async def _serve_recording_preview(recording_id: str, field: str, request: Request):
+    key = (recording_id, field)
+    preview_path = preview_path_cache.get(key)
+    
+    if preview_path is None:
+        recording = await db.recordings.find_one({"id": recording_id}, {"_id": 0, field: 1})
+        if not recording:
+            raise HTTPException(status_code=404, detail="Recording not found")
+        preview_path = recording.get(field)
+        if not preview_path:
+            raise HTTPException(status_code=404, detail="Preview not available")
+        preview_path_cache[key] = preview_path
+        if len(preview_path_cache) > PREVIEW_PATH_CACHE_SIZE:
+            preview_path_cache.popitem(last=False)
+    else:
+        preview_path_cache.move_to_end(key)
+    
+    try:
+        stat_result = await asyncio.to_thread(os.stat, preview_path)
+    except FileNotFoundError:
+        preview_path_cache.pop(key, None)
+        raise HTTPException(status_code=404, detail="Preview not available")
+    
+    etag = file_etag(stat_result)
+    headers = {
+        "Cache-Control": PREVIEW_CACHE_CONTROL,
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True)
+    }
+    
+    if _not_modified(request, etag, stat_result):
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(preview_path, media_type="image/jpeg", headers=headers, stat_result=stat_result)
+
+@api_router.get("/recordings/{recording_id}/thumbnail")
+async def get_recording_thumbnail(recording_id: str, request: Request):
+    """Poster frame for a recording"""
+    return await _serve_recording_preview(recording_id, "thumbnail_path", request)
+
+@api_router.get("/recordings/{recording_id}/sprite")
+async def get_recording_sprite(recording_id: str, request: Request):
+    """Sprite sheet of evenly spaced frames for scrub previews (layout in the recording's `sprite` field)"""
+    return await _serve_recording_preview(recording_id, "sprite_path", request)
 
 @api_router.delete("/recordings/{recording_id}")
 async def delete_recording(recording_id: str):
@@ -2527,9 +5561,7 @@ async def delete_recording(recording_id: str):
         raise HTTPException(status_code=404, detail="Recording not found")
     
     # Delete file
-    file_path = recording['file_path']
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    await unlink_files_parallel([recording.get(field) for field in RECORDING_FILE_FIELDS])
     
     await db.recordings.delete_one({"id": recording_id})
     
@@ -2544,29 +5576,10 @@ async def bulk_delete_recordings(request: Request):
     if not recording_ids:
         raise HTTPException(status_code=400, detail="No recording IDs provided")
     
-    deleted_count = 0
-    failed_count = 0
-    
-    for recording_id in recording_ids:
-        try:
-            recording = await db.recordings.find_one({"id": recording_id}, {"_id": 0})
-            if recording:
-                # Delete file
-                file_path = recording['file_path']
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                
-                await db.recordings.delete_one({"id": recording_id})
-                deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting recording {recording_id}: {e}")
-            failed_count += 1
-    
-    return {
-        "message": f"Deleted {deleted_count} recordings",
-        "deleted": deleted_count,
-        "failed": failed_count
-    }
+    result = await run_bulk_delete(
+        "recordings", db.recordings, {"id": {"$in": recording_ids}}, RECORDING_FILE_FIELDS, total=len(recording_ids)
+    )
+    return _bulk_delete_response(result, "recordings")
 
 @api_router.post("/recordings/delete-by-date")
 async def delete_recordings_by_date(request: Request):
@@ -2590,62 +5603,149 @@ async def delete_recordings_by_date(request: Request):
     if camera_id:
         query["camera_id"] = camera_id
     
-    # Get all recordings in range
-    recordings = await db.recordings.find(query, {"_id": 0}).to_list(None)
-    
-    deleted_count = 0
-    for recording in recordings:
-        try:
-            file_path = recording['file_path']
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-            await db.recordings.delete_one({"id": recording['id']})
-            deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting recording: {e}")
-    
-    return {
-        "message": f"Deleted {deleted_count} recordings",
-        "deleted": deleted_count
-    }
+    result = await run_bulk_delete("recordings", db.recordings, query, RECORDING_FILE_FIELDS)
+    return _bulk_delete_response(result, "recordings")
 
 @api_router.post("/recordings/delete-by-camera")
 async def delete_recordings_by_camera(camera_id: str):
     """Delete all recordings for a specific camera"""
-    recordings = await db.recordings.find({"camera_id": camera_id}, {"_id": 0}).to_list(None)
-    
-    deleted_count = 0
-    for recording in recordings:
+    result = await run_bulk_delete("recordings", db.recordings, {"camera_id": camera_id}, RECORDING_FILE_FIELDS)
+    return _bulk_delete_response(result, "recordings", " for camera")
+
+# Motion Events
+@api_router.get("/motion-events", response_model=List[MotionEvent])
+async def get_motion_events(camera_id: Optional[str] = None, limit: int = 100, region: Optional[str] = None):
+    """region="x0,y0,x1,y1" (camera pixels) keeps events whose track bbox intersects it"""
+    query = {}
+    if camera_id:
+        query['camera_id'] = camera_id
+    if region:
         try:
-            file_path = recording['file_path']
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-            await db.recordings.delete_one({"id": recording['id']})
-            deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting recording: {e}")
+            x0, y0, x1, y1 = [float(v) for v in region.split(',')]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="region must be x0,y0,x1,y1")
+        query.update({
+            "track.bbox.0": {"$lt": x1},
+            "track.bbox.1": {"$lt": y1},
+            "track.bbox.2": {"$gt": x0},
+            "track.bbox.3": {"$gt": y0}
+        })
+    
+    events = await db.motion_events.find(query, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
+    
+    for event in events:
+        if isinstance(event['timestamp'], str):
+            event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+    
+    return events
+
+@api_router.get("/cameras/{camera_id}/activity")
+async def get_camera_activity(camera_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None, buckets: int = 288):
+    """
+    Motion activity of a camera between start and end (default: last 24 hours), downsampled
+    to `buckets` points of 0-255 (max level per bucket). Reads one small document per hour.
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    buckets = max(1, min(buckets, ACTIVITY_MAX_BUCKETS))
+    
+    start_ts, end_ts = start.timestamp(), end.timestamp()
+    bucket_seconds = (end_ts - start_ts) / buckets
+    first_hour = datetime.fromtimestamp(start_ts // 3600 * 3600, timezone.utc).isoformat()
+    
+    hours = {}
+    async for doc in db.motion_activity.find(
+        {"camera_id": camera_id, "hour": {"$gte": first_hour, "$lt": end.astimezone(timezone.utc).isoformat()}}, {"_id": 0}
+    ):
+        hour = int(datetime.fromisoformat(doc['hour']).timestamp())
+        hours[hour] = (doc.get('resolution', ACTIVITY_RESOLUTION_SECONDS), np.frombuffer(doc['values'], dtype=np.uint8))
+    # Slots recorded in this process but not flushed yet
+    for hour, values in activity_index.pending(camera_id).items():
+        if hour in hours and hours[hour][0] == activity_index.resolution:
+            values = np.maximum(values, hours[hour][1][:len(values)])
+        hours[hour] = (activity_index.resolution, values)
+    
+    result = np.zeros(buckets, dtype=np.uint8)
+    for hour, (resolution, values) in hours.items():
+        slot_times = hour + np.arange(len(values)) * resolution
+        index = np.floor((slot_times - start_ts) / bucket_seconds).astype(np.int64)
+        valid = (index >= 0) & (index < buckets) & (values > 0)
+        np.maximum.at(result, index[valid], values[valid])
+    
+    return {
+        "camera_id": camera_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "bucket_seconds": round(bucket_seconds, 3),
+        "values": result.tolist()
+    }
+
+async def _find_ingest_gaps(camera_id: str, start: datetime, end: datetime, leg: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Stored ingest gaps overlapping start..end plus outages still ongoing in the recorder (end_time None)"""
+    query = {"camera_id": camera_id, "start_time": {"$lt": end.isoformat()}, "end_time": {"$gt": start.isoformat()}}
+    if leg:
+        query["leg"] = leg
+    gaps = await db.ingest_gaps.find(query, {"_id": 0}).sort("start_time", 1).to_list(10000)
     
+    recorder = active_recorders.get(camera_id)
+    for gap_leg, (started, reason) in list(getattr(recorder, 'ingest_gaps', {}).items()):
+        started_dt = datetime.fromtimestamp(started, timezone.utc)
+        if (leg is None or gap_leg == leg) and started_dt < end:
+            gaps.append({
+                "camera_id": camera_id,
+                "leg": gap_leg,
+                "reason": reason,
+                "start_time": started_dt.isoformat(),
+                "end_time": None,
+                "duration": round(time.time() - started, 3)
+            })
+    return gaps
+
+@api_router.get("/cameras/{camera_id}/gaps")
+async def get_camera_gaps(camera_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None, leg: Optional[str] = None):
+    """
+    Ingest outages of a camera between start and end (default: last 24 hours): intervals in which
+    the record leg (no video stored) or the decode leg (no motion detection) delivered nothing.
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    gaps = await _find_ingest_gaps(camera_id, start.astimezone(timezone.utc), end.astimezone(timezone.utc), leg)
     return {
-        "message": f"Deleted {deleted_count} recordings for camera",
-        "deleted": deleted_count
+        "camera_id": camera_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "gaps": gaps
     }
 
-# Motion Events
-@api_router.get("/motion-events", response_model=List[MotionEvent])
-async def get_motion_events(camera_id: Optional[str] = None, limit: int = 100):
-    query = {}
-    if camera_id:
-        query['camera_id'] = camera_id
+@api_router.get("/recordings/{recording_id}/gaps")
+async def get_recording_gaps(recording_id: str):
+    """Ingest outages that fall within a recording"""
+    recording = await db.recordings.find_one({"id": recording_id}, {"_id": 0, "camera_id": 1, "start_time": 1, "end_time": 1})
     
-    events = await db.motion_events.find(query, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
+    if not recording:
+        raise HTTPException(status_code=404, detail="Recording not found")
     
-    for event in events:
-        if isinstance(event['timestamp'], str):
-            event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+    start = datetime.fromisoformat(recording['start_time'])
+    end = datetime.fromisoformat(recording['end_time']) if recording.get('end_time') else datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
     
-    return events
+    return await _find_ingest_gaps(recording['camera_id'], start.astimezone(timezone.utc), end.astimezone(timezone.utc))
 
 @api_router.get("/motion-events/{event_id}/snapshot")
 async def get_motion_snapshot(event_id: str):
@@ -2669,9 +5769,7 @@ async def delete_motion_event(event_id: str):
         raise HTTPException(status_code=404, detail="Motion event not found")
     
     # Delete snapshot file
-    snapshot_path = event.get('snapshot_path')
-    if snapshot_path and os.path.exists(snapshot_path):
-        os.remove(snapshot_path)
+    await unlink_files_parallel([event.get('snapshot_path')])
     
     await db.motion_events.delete_one({"id": event_id})
     
@@ -2686,29 +5784,10 @@ async def bulk_delete_motion_events(request: Request):
     if not event_ids:
         raise HTTPException(status_code=400, detail="No event IDs provided")
     
-    deleted_count = 0
-    failed_count = 0
-    
-    for event_id in event_ids:
-        try:
-            event = await db.motion_events.find_one({"id": event_id}, {"_id": 0})
-            if event:
-                # Delete snapshot file
-                snapshot_path = event.get('snapshot_path')
-                if snapshot_path and os.path.exists(snapshot_path):
-                    os.remove(snapshot_path)
-                
-                await db.motion_events.delete_one({"id": event_id})
-                deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting motion event {event_id}: {e}")
-            failed_count += 1
-    
-    return {
-        "message": f"Deleted {deleted_count} motion events",
-        "deleted": deleted_count,
-        "failed": failed_count
-    }
+    result = await run_bulk_delete(
+        "motion_events", db.motion_events, {"id": {"$in": event_ids}}, MOTION_EVENT_FILE_FIELDS, total=len(event_ids)
+    )
+    return _bulk_delete_response(result, "motion events")
 
 @api_router.post("/motion-events/delete-by-date")
 async def delete_motion_events_by_date(request: Request):
@@ -2732,98 +5811,368 @@ async def delete_motion_events_by_date(request: Request):
     if camera_id:
         query["camera_id"] = camera_id
     
-    # Get all events in range
-    events = await db.motion_events.find(query, {"_id": 0}).to_list(None)
-    
-    deleted_count = 0
-    for event in events:
-        try:
-            snapshot_path = event.get('snapshot_path')
-            if snapshot_path and os.path.exists(snapshot_path):
-                os.remove(snapshot_path)
-            
-            await db.motion_events.delete_one({"id": event['id']})
-            deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting motion event: {e}")
-    
-    return {
-        "message": f"Deleted {deleted_count} motion events",
-        "deleted": deleted_count
-    }
+    result = await run_bulk_delete("motion_events", db.motion_events, query, MOTION_EVENT_FILE_FIELDS)
+    return _bulk_delete_response(result, "motion events")
 
 @api_router.post("/motion-events/delete-by-camera")
 async def delete_motion_events_by_camera(camera_id: str):
     """Delete all motion events for a specific camera"""
-    events = await db.motion_events.find({"camera_id": camera_id}, {"_id": 0}).to_list(None)
+    result = await run_bulk_delete("motion_events", db.motion_events, {"camera_id": camera_id}, MOTION_EVENT_FILE_FIELDS)
+    return _bulk_delete_response(result, "motion events", " for camera")
+
+# Storage Management
+async def _recordings_total_size(query: Optional[Dict[str, Any]] = None) -> tuple:
+    """Return (count, total file_size in bytes) of recordings using a DB-side aggregation"""
+    pipeline = []
+    if query:
+        pipeline.append({"$match": query})
+    pipeline.append({"$group": {"_id": None, "count": {"$sum": 1}, "size": {"$sum": "$file_size"}}})
+    result = await db.recordings.aggregate(pipeline).to_list(1)
+    if not result:
+        return (0, 0)
+    return (result[0]['count'], result[0]['size'] or 0)
+
+async def ensure_indexes():
+    """Create indexes used by retention, time-range queries and bulk deletes"""
+    try:
+        await db.recordings.create_index("id")
+        await db.recordings.create_index("start_time")
+        await db.recordings.create_index([("camera_id", 1), ("start_time", 1)])
+        await db.recordings.create_index([("recording_type", 1), ("start_time", 1)])
+        await db.motion_events.create_index("id")
+        await db.motion_events.create_index("timestamp")
+        await db.motion_events.create_index([("camera_id", 1), ("timestamp", 1)])
+        await db.motion_activity.create_index([("camera_id", 1), ("hour", 1)], unique=True)
+        await db.motion_activity.create_index("hour")
+        await db.ingest_gaps.create_index([("camera_id", 1), ("start_time", 1)])
+        await db.ingest_gaps.create_index("end_time")
+        await db.camera_leases.create_index("camera_id", unique=True)
+        await db.camera_leases.create_index("node_id")
+        await db.cluster_nodes.create_index("id", unique=True)
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {e}")
+
+class RetentionService:
+    """
+    Background retention and quota enforcement.
+    
+    Each run enforces, in order:
+      1. Age limits - per-camera retention_days (or global RETENTION_DAYS) for recordings and motion snapshots
+      2. Storage quota - total recordings size must stay under MAX_STORAGE_GB
+      3. Disk watermarks - when a storage volume exceeds STORAGE_HIGH_WATERMARK %, delete down to STORAGE_LOW_WATERMARK %
+    Quota and watermark cleanup delete oldest-first, continuous recordings before motion recordings.
+    Deletes are done in indexed batches; file unlinks run in worker threads so the event loop is never blocked.
+    In cluster mode a node only enforces these for the cameras it owns, since their files are on its disk;
+    the quota then applies per node.
+    """
     
-    deleted_count = 0
-    for event in events:
-        try:
-            snapshot_path = event.get('snapshot_path')
-            if snapshot_path and os.path.exists(snapshot_path):
-                os.remove(snapshot_path)
+    def __init__(self, interval_seconds: int = RETENTION_INTERVAL_SECONDS, batch_size: int = RETENTION_BATCH_SIZE):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.task = None
+        self.lock = asyncio.Lock()
+        self.current_run = None
+        self.last_run = None
+        self.next_run_at = None
+        self.totals = {
+            "runs": 0,
+            "deleted_recordings": 0,
+            "deleted_events": 0,
+            "freed_bytes": 0,
+            "errors": 0
+        }
+    
+    def start(self):
+        """Start the periodic retention task on the running event loop"""
+        if self.task and not self.task.done():
+            return
+        self.task = asyncio.create_task(self._run_loop())
+        logger.info(f"Retention service started (interval: {self.interval_seconds}s, batch: {self.batch_size})")
+    
+    async def stop(self):
+        """Cancel the periodic retention task"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+    
+    async def _run_loop(self):
+        while True:
+            try:
+                await self.run_once(reason="scheduled")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.totals['errors'] += 1
+                logger.error(f"Retention run failed: {e}", exc_info=True)
             
-            await db.motion_events.delete_one({"id": event['id']})
-            deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting motion event: {e}")
+            self.next_run_at = datetime.now(timezone.utc) + timedelta(seconds=self.interval_seconds)
+            await asyncio.sleep(self.interval_seconds)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Progress metrics for the status endpoint"""
+        return {
+            "running": self.lock.locked(),
+            "current_run": self.current_run,
+            "last_run": self.last_run,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "totals": self.totals,
+            "config": {
+                "retention_days": RETENTION_DAYS,
+                "max_storage_gb": MAX_STORAGE_GB,
+                "high_watermark_percent": STORAGE_HIGH_WATERMARK,
+                "low_watermark_percent": STORAGE_LOW_WATERMARK,
+                "interval_seconds": self.interval_seconds,
+                "batch_size": self.batch_size
+            }
+        }
     
-    return {
-        "message": f"Deleted {deleted_count} motion events for camera",
-        "deleted": deleted_count
-    }
+    async def run_once(self, reason: str = "manual") -> Dict[str, Any]:
+        """Run a full retention pass. Concurrent callers wait for the running pass and get its result."""
+        if self.lock.locked():
+            async with self.lock:
+                return self.last_run
+        
+        async with self.lock:
+            run = {
+                "reason": reason,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "finished_at": None,
+                "phase": "age",
+                "deleted_recordings": 0,
+                "deleted_events": 0,
+                "freed_bytes": 0
+            }
+            self.current_run = run
+            
+            try:
+                cameras = await db.cameras.find(
+                    {}, {"_id": 0, "id": 1, "retention_days": 1, "storage_path": 1}
+                ).to_list(None)
+                
+                # Cluster nodes share the database but not the disks: leave other nodes' recordings alone
+                owned = set(cluster_coordinator.owned) if cluster_coordinator else None
+                if owned is not None:
+                    cameras = [cam for cam in cameras if cam['id'] in owned]
+                
+                await self._enforce_age_limits(cameras, run, owned)
+                run['phase'] = "quota"
+                await self._enforce_quota(run, owned)
+                run['phase'] = "disk"
+                await self._enforce_disk_watermarks(cameras, run, owned)
+                run['phase'] = "done"
+            finally:
+                run['finished_at'] = datetime.now(timezone.utc).isoformat()
+                self.current_run = None
+                self.last_run = run
+                self.totals['runs'] += 1
+                self.totals['deleted_recordings'] += run['deleted_recordings']
+                self.totals['deleted_events'] += run['deleted_events']
+                self.totals['freed_bytes'] += run['freed_bytes']
+            
+            if run['deleted_recordings'] or run['deleted_events']:
+                logger.info(f"🧹 Retention ({reason}): deleted {run['deleted_recordings']} recordings, "
+                            f"{run['deleted_events']} motion events, freed {run['freed_bytes'] / (1024**3):.2f} GB")
+            
+            return run
+    
+    async def _delete_recordings_batch(self, query: Dict[str, Any], run: Dict[str, Any], bytes_needed: Optional[float] = None) -> tuple:
+        """
+        Delete one oldest-first batch of recordings. Returns (deleted count, accounted bytes).
+        If bytes_needed is given, the batch is trimmed to the oldest recordings that cover it.
+        """
+        batch = await db.recordings.find(
+            query, {"_id": 0, "id": 1, "file_size": 1, **{field: 1 for field in RECORDING_FILE_FIELDS}}
+        ).sort("start_time", 1).limit(self.batch_size).to_list(self.batch_size)
+        
+        if bytes_needed is not None:
+            covered = 0
+            for index, recording in enumerate(batch):
+                covered += recording.get('file_size', 0) or 0
+                if covered >= bytes_needed:
+                    batch = batch[:index + 1]
+                    break
+        
+        if not batch:
+            return (0, 0)
+        
+        freed = await unlink_files_parallel([r.get(field) for r in batch for field in RECORDING_FILE_FIELDS])
+        await db.recordings.delete_many({"id": {"$in": [r['id'] for r in batch]}})
+        
+        run['deleted_recordings'] += len(batch)
+        run['freed_bytes'] += freed
+        return (len(batch), sum(r.get('file_size', 0) or 0 for r in batch))
+    
+    async def _delete_events_batch(self, query: Dict[str, Any], run: Dict[str, Any]) -> int:
+        """Delete one oldest-first batch of motion events and their snapshots. Returns deleted count."""
+        batch = await db.motion_events.find(
+            query, {"_id": 0, "id": 1, "snapshot_path": 1}
+        ).sort("timestamp", 1).limit(self.batch_size).to_list(self.batch_size)
+        
+        if not batch:
+            return 0
+        
+        freed = await unlink_files_parallel([e.get('snapshot_path') for e in batch])
+        await db.motion_events.delete_many({"id": {"$in": [e['id'] for e in batch]}})
+        
+        run['deleted_events'] += len(batch)
+        run['freed_bytes'] += freed
+        return len(batch)
+    
+    @staticmethod
+    def _rest_scope(cameras: List[Dict[str, Any]], excluded: List[str], owned: Optional[set]) -> Dict[str, Any]:
+        """
+        Recordings of all cameras except `excluded`, including deleted cameras; in cluster mode
+        only those of the owned cameras (a deleted camera's files are on an unknown node).
+        """
+        if owned is None:
+            return {"camera_id": {"$nin": excluded}}
+        return {"camera_id": {"$in": [cam['id'] for cam in cameras if cam['id'] not in excluded]}}
+    
+    async def _enforce_age_limits(self, cameras: List[Dict[str, Any]], run: Dict[str, Any], owned: Optional[set] = None):
+        now = datetime.now(timezone.utc)
+        
+        # Cameras with their own retention, then everything else (including deleted cameras) with the global one
+        scopes = []
+        override_ids = []
+        for cam in cameras:
+            if cam.get('retention_days'):
+                override_ids.append(cam['id'])
+                scopes.append(({"camera_id": cam['id']}, cam['retention_days']))
+        scopes.append((self._rest_scope(cameras, override_ids, owned), RETENTION_DAYS))
+        
+        for scope, days in scopes:
+            cutoff = (now - timedelta(days=days)).isoformat()
+            
+            recordings_query = {**scope, "start_time": {"$lt": cutoff}}
+            while (await self._delete_recordings_batch(recordings_query, run))[0]:
+                await asyncio.sleep(0)
+            
+            events_query = {**scope, "timestamp": {"$lt": cutoff}}
+            while await self._delete_events_batch(events_query, run):
+                await asyncio.sleep(0)
+            
+            await db.motion_activity.delete_many({**scope, "hour": {"$lt": cutoff}})
+            await db.ingest_gaps.delete_many({**scope, "end_time": {"$lt": cutoff}})
+    
+    async def _enforce_quota(self, run: Dict[str, Any], owned: Optional[set] = None):
+        max_bytes = MAX_STORAGE_GB * (1024**3)
+        scope = {"camera_id": {"$in": sorted(owned)}} if owned is not None else {}
+        _, total_size = await _recordings_total_size(scope)
+        
+        if total_size <= max_bytes:
+            return
+        
+        # Free down to the same relative headroom the disk watermarks use
+        target = max_bytes * (STORAGE_LOW_WATERMARK / STORAGE_HIGH_WATERMARK)
+        logger.warning(f"Recordings use {total_size / (1024**3):.1f} GB (quota {MAX_STORAGE_GB} GB), "
+                       f"deleting oldest down to {target / (1024**3):.1f} GB")
+        
+        for recording_type in ["continuous", "motion"]:
+            while total_size > target:
+                deleted, size = await self._delete_recordings_batch(
+                    {**scope, "recording_type": recording_type}, run, bytes_needed=total_size - target
+                )
+                if not deleted:
+                    break
+                total_size -= size
+            if total_size <= target:
+                break
+    
+    async def _enforce_disk_watermarks(self, cameras: List[Dict[str, Any]], run: Dict[str, Any], owned: Optional[set] = None):
+        # Group cameras by storage root; the default root also owns recordings of deleted cameras
+        custom_roots = {}
+        for cam in cameras:
+            if cam.get('storage_path'):
+                custom_roots.setdefault(cam['storage_path'], []).append(cam['id'])
+        
+        custom_ids = [cid for ids in custom_roots.values() for cid in ids]
+        scopes = [(str(STORAGE_PATH), self._rest_scope(cameras, custom_ids, owned))]
+        scopes.extend((root, {"camera_id": {"$in": ids}}) for root, ids in custom_roots.items())
+        
+        for root, scope in scopes:
+            try:
+                usage = await asyncio.to_thread(psutil.disk_usage, root)
+            except Exception as e:
+                logger.error(f"Cannot read disk usage for {root}: {e}")
+                continue
+            
+            if usage.percent < STORAGE_HIGH_WATERMARK:
+                continue
+            
+            logger.warning(f"Storage {root} at {usage.percent:.1f}% (high watermark {STORAGE_HIGH_WATERMARK}%), "
+                           f"deleting oldest recordings down to {STORAGE_LOW_WATERMARK}%")
+            
+            # Free at most what the volume was over the low watermark: if that is not enough,
+            # something other than recordings fills the disk and deleting more would not help
+            budget = (usage.percent - STORAGE_LOW_WATERMARK) / 100 * usage.total
+            freed_total = 0
+            stuck = False
+            for recording_type in ["continuous", "motion"]:
+                while usage.percent > STORAGE_LOW_WATERMARK and not stuck:
+                    bytes_needed = (usage.percent - STORAGE_LOW_WATERMARK) / 100 * usage.total
+                    freed_before = run['freed_bytes']
+                    deleted, _ = await self._delete_recordings_batch(
+                        {**scope, "recording_type": recording_type}, run, bytes_needed=bytes_needed
+                    )
+                    if not deleted:
+                        break
+                    freed = run['freed_bytes'] - freed_before
+                    freed_total += freed
+                    stuck = not freed or freed_total >= budget
+                    usage = await asyncio.to_thread(psutil.disk_usage, root)
+                if usage.percent <= STORAGE_LOW_WATERMARK or stuck:
+                    break
+            
+            if usage.percent > STORAGE_LOW_WATERMARK:
+                logger.error(f"❌ Storage {root} still at {usage.percent:.1f}% after freeing "
+                             f"{freed_total / (1024**3):.2f} GB of recordings: low watermark {STORAGE_LOW_WATERMARK}% "
+                             f"cannot be met by deleting recordings, check other data on the volume")
+
+retention_service = RetentionService()
 
-# Storage Management
 @api_router.get("/storage/stats", response_model=StorageStats)
 async def get_storage_stats():
     # Get disk usage
-    disk = psutil.disk_usage(str(STORAGE_PATH))
+    disk = await asyncio.to_thread(psutil.disk_usage, str(STORAGE_PATH))
     
     # Get recordings count and size
-    recordings = await db.recordings.find({}, {"_id": 0, "file_size": 1}).to_list(10000)
-    recordings_size = sum(r.get('file_size', 0) for r in recordings)
+    recordings_count, recordings_size = await _recordings_total_size()
     
     return StorageStats(
         total_gb=disk.total / (1024**3),
         used_gb=disk.used / (1024**3),
         available_gb=disk.free / (1024**3),
-        recordings_count=len(recordings),
+        recordings_count=recordings_count,
         recordings_size_gb=recordings_size / (1024**3)
     )
 
 @api_router.post("/storage/cleanup")
 async def cleanup_storage():
-    """Clean up old recordings based on retention policy"""
-    cutoff_date = datetime.now(timezone.utc).timestamp() - (RETENTION_DAYS * 24 * 60 * 60)
-    
-    recordings = await db.recordings.find({}, {"_id": 0}).to_list(10000)
-    deleted_count = 0
-    freed_space = 0
-    
-    for recording in recordings:
-        start_time = recording['start_time']
-        if isinstance(start_time, str):
-            start_time = datetime.fromisoformat(start_time)
-        
-        if start_time.timestamp() < cutoff_date:
-            file_path = recording['file_path']
-            if os.path.exists(file_path):
-                file_size = os.path.getsize(file_path)
-                os.remove(file_path)
-                freed_space += file_size
-            
-            await db.recordings.delete_one({"id": recording['id']})
-            deleted_count += 1
+    """Run the retention policy now (age limits, storage quota and disk watermarks)"""
+    run = await retention_service.run_once(reason="manual")
     
     return {
-        "deleted_count": deleted_count,
-        "freed_space_gb": freed_space / (1024**3)
+        "deleted_count": run['deleted_recordings'] if run else 0,
+        "deleted_events": run['deleted_events'] if run else 0,
+        "freed_space_gb": (run['freed_bytes'] if run else 0) / (1024**3)
     }
 
+@api_router.get("/storage/retention")
+async def get_retention_status():
+    """Get retention service progress and configuration"""
+    return retention_service.get_status()
+
 # Live Stream Endpoint
 @api_router.get("/stream/{camera_id}")
-async def get_live_stream(camera_id: str):
+async def get_live_stream(camera_id: str, request: Request):
+    forwarded = await proxy_to_owner(request, camera_id)
+    if forwarded:
+        return forwarded
+    
     camera = await db.cameras.find_one({"id": camera_id}, {"_id": 0})
     
     if not camera:
@@ -2854,7 +6203,7 @@ async def get_live_stream(camera_id: str):
                             stream_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5, interpolation=cv2.INTER_LINEAR)
                             
                             # Compress with lower quality
-                            _, buffer = cv2.imencode('.jpg', stream_frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
+                            buffer = encode_jpeg(camera_id, stream_frame, 50)
                             frame_bytes = buffer.tobytes()
                             
                             yield (b'--frame\r\n'
@@ -2898,7 +6247,7 @@ async def get_live_stream(camera_id: str):
                         break
                     
                     frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
+                    buffer = encode_jpeg(camera_id, frame, 50)
                     frame_bytes = buffer.tobytes()
                     
                     yield (b'--frame\r\n'
@@ -2918,7 +6267,7 @@ async def get_live_stream(camera_id: str):
                     frame = temp_recorder._get_http_snapshot(stream_url, auth)
                     if frame is not None:
                         frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-                        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
+                        buffer = encode_jpeg(camera_id, frame, 50)
                         frame_bytes = buffer.tobytes()
                         
                         yield (b'--frame\r\n'
@@ -3003,6 +6352,237 @@ async def test_telegram():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка отправки: {str(e)}")
 
+@api_router.get("/startup/status")
+async def get_startup_status():
+    """Progress of bringing cameras online after a restart"""
+    return startup_scheduler.progress
+
+@api_router.get("/cluster/status")
+async def get_cluster_status():
+    """Cluster membership and camera ownership of this node"""
+    if not cluster_coordinator:
+        return {"enabled": False, "node_id": NODE_ID}
+    return await cluster_coordinator.get_status()
+
+# Prometheus metrics
+METRICS_PREFIX = "surveillance_"
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MOTION_STATES = ("idle", "recording", "cooldown")
+
+# (metric name, type, help, key in CameraRecorder.metrics())
+CAMERA_METRICS = [
+    ("camera_frames_received_total", "counter", "Frames read from the camera (RTSP copy streams are counted in bytes)", "frames_received"),
+    ("camera_bytes_received_total", "counter", "Bytes read from the camera stream", "bytes_received"),
+    ("camera_frames_decoded_total", "counter", "Frames decoded for motion detection and live view", "frames_decoded"),
+    ("camera_frames_written_total", "counter", "Frames encoded into recordings", "frames_written"),
+    ("camera_bytes_written_total", "counter", "Bytes written to recordings", "bytes_written"),
+    ("camera_reconnects_total", "counter", "Reconnections to the camera", "reconnects"),
+    ("camera_record_leg_restarts_total", "counter", "Restarts of the RTSP record process (stalled or exited)", "record_restarts"),
+    ("camera_decode_leg_restarts_total", "counter", "Restarts of the RTSP decode process (stalled or exited)", "decode_restarts"),
+    ("camera_fps_in", "gauge", "Frames read from the camera per second", "fps_in"),
+    ("camera_decode_fps", "gauge", "Frames decoded per second", "decode_fps"),
+    ("camera_fps_out", "gauge", "Frames written to recordings per second", "fps_out"),
+    ("camera_detection_ms", "gauge", "Motion detection processing time, moving average", "detection_ms"),
+    ("camera_detection_latency_ms", "gauge", "Motion detection queue wait plus processing, moving average", "detection_latency_ms"),
+    ("camera_detection_dropped_total", "counter", "Frames dropped by the detection queue", "detection_dropped"),
+    ("camera_buffer_bytes", "gauge", "Memory held by the pre-recording buffers", "buffer_bytes"),
+    ("camera_error_count", "gauge", "Consecutive connection failures of the recorder", "error_count"),
+    ("camera_connected", "gauge", "1 when the camera delivers data", "connected"),
+    ("camera_transcode_queue_depth", "gauge", "H.264 conversions in progress", "transcodes_running"),
+]
+
+class PrometheusText:
+    """Prometheus text exposition format; samples are grouped per metric family"""
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self.families: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _labels(labels: Optional[Dict[str, Any]]) -> str:
+        if not labels:
+            return ""
+        escaped = (
+            f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for key, value in labels.items()
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _value(value) -> str:
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, float) and math.isinf(value):
+            return "+Inf"
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = {"type": kind, "help": help_text, "samples": []}
+        return family['samples']
+
+    def add(self, name: str, kind: str, help_text: str, value, labels: Optional[Dict[str, Any]] = None):
+        if value is None:
+            return
+        name = self.prefix + name
+        self._family(name, kind, help_text).append(f"{name}{self._labels(labels)} {self._value(value)}")
+
+    def histogram(self, name: str, help_text: str, buckets: tuple, histogram: Dict[str, Any], labels: Dict[str, Any]):
+        """Add a LatencyHistograms entry (per-bucket counts) as cumulative buckets"""
+        name = self.prefix + name
+        samples = self._family(name, "histogram", help_text)
+        cumulative = 0
+        for bound, count in zip(list(buckets) + [math.inf], histogram['counts']):
+            cumulative += count
+            samples.append(f"{name}_bucket{self._labels({**labels, 'le': self._value(float(bound))})} {cumulative}")
+        samples.append(f"{name}_sum{self._labels(labels)} {self._value(float(histogram['sum']))}")
+        samples.append(f"{name}_count{self._labels(labels)} {histogram['count']}")
+
+    def render(self) -> str:
+        lines = []
+        for name, family in self.families.items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            lines.extend(family['samples'])
+        return "\n".join(lines) + "\n"
+
+request_histograms = LatencyHistograms(REQUEST_LATENCY_BUCKETS)  # Route template -> method -> histogram
+
+class RequestLatencyMiddleware:
+    """
+    ASGI middleware timing every request until its response starts, per route template.
+    Pure ASGI so streamed bodies (live view, recordings) pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.monotonic()
+
+        async def send_timed(message):
+            if message['type'] == 'http.response.start':
+                route = scope.get('route')
+                if route is not None:  # Unmatched paths would make the label set unbounded
+                    request_histograms.observe(route.path, scope['method'], time.monotonic() - started)
+            await send(message)
+
+        await self.app(scope, receive, send_timed)
+
+app.add_middleware(RequestLatencyMiddleware)
+
+class EventLoopMonitor:
+    """Event loop lag: how late a short sleep wakes up (blocking calls on the loop show up here)"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.samples = deque(maxlen=120)
+        self.task = None
+
+    def start(self):
+        if self.task and not self.task.done():
+            return
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.monotonic() - started - self.interval))
+
+    def get_status(self) -> Dict[str, float]:
+        samples = list(self.samples)
+        return {
+            "lag_seconds": samples[-1] if samples else 0.0,
+            "max_lag_seconds": max(samples) if samples else 0.0
+        }
+
+event_loop_monitor = EventLoopMonitor()
+
+def render_metrics() -> str:
+    """Collect recorder, pipeline, process and request metrics (runs in a thread: psutil reads /proc)"""
+    out = PrometheusText()
+
+    transcodes = 0
+    for camera_id, recorder in list(active_recorders.items()):
+        labels = {"camera_id": camera_id, "camera": recorder.camera.name}
+        values = recorder.metrics() if hasattr(recorder, 'metrics') else {}
+        for name, kind, help_text, key in CAMERA_METRICS:
+            out.add(name, kind, help_text, values.get(key), labels)
+        state = values.get('motion_state', recorder.motion_state)
+        for motion_state in MOTION_STATES:
+            out.add("camera_motion_state", "gauge", "Motion state of the recorder (1 for the current state)",
+                    state == motion_state, {**labels, "state": motion_state})
+        transcodes += values.get('transcodes_running', 0)
+
+        timers = {**recorder.timers, **hot_path_timers.snapshot(camera_id)} if isinstance(recorder, RemoteRecorder) else hot_path_timers.snapshot(camera_id)
+        for name, timer in timers.items():
+            out.add("camera_hot_path_seconds_total", "counter", "Time spent in hot paths (detect_motion, frame_read, imencode)",
+                    timer['total_s'], {**labels, "path": name})
+            out.add("camera_hot_path_calls_total", "counter", "Calls of hot paths", timer['count'], {**labels, "path": name})
+
+        stages = recorder.latency if isinstance(recorder, RemoteRecorder) else latency_histograms.snapshot(camera_id)
+        for stage, histogram in stages.items():
+            out.histogram("pipeline_latency_seconds", "End-to-end latency from frame read to each pipeline stage",
+                          LATENCY_BUCKETS, histogram, {**labels, "stage": stage})
+
+    out.add("recorders_active", "gauge", "Recorders running on this node", len(active_recorders))
+    out.add("transcode_queue_depth", "gauge", "H.264 conversions in progress on this node", transcodes)
+    out.add("detection_queue_depth", "gauge", "Frames waiting for the shared detection pool of the API process",
+            detection_service.queue.qsize())
+
+    # Threads per process (API and recorder workers) and ffmpeg children of the whole tree
+    me = psutil.Process()
+    processes = {"api": me}
+    if recorder_pool:
+        for index, worker in enumerate(recorder_pool.workers):
+            if worker['process'] and worker['process'].is_alive():
+                try:
+                    processes[f"recorder-worker-{index}"] = psutil.Process(worker['process'].pid)
+                except psutil.NoSuchProcess:
+                    pass
+    for name, proc in processes.items():
+        try:
+            out.add("process_threads", "gauge", "Threads per backend process", proc.num_threads(), {"process": name})
+        except psutil.NoSuchProcess:
+            pass
+    ffmpeg = 0
+    for child in me.children(recursive=True):
+        try:
+            ffmpeg += child.name().startswith("ffmpeg")
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    out.add("ffmpeg_processes", "gauge", "ffmpeg child processes (recording, decoding, transcoding)", ffmpeg)
+
+    loop = event_loop_monitor.get_status()
+    out.add("event_loop_lag_seconds", "gauge", "Latest event loop lag", loop['lag_seconds'])
+    out.add("event_loop_lag_max_seconds", "gauge", "Largest event loop lag over the last minute", loop['max_lag_seconds'])
+
+    for route, methods in request_histograms.snapshot().items():
+        for method, histogram in methods.items():
+            out.histogram("http_request_duration_seconds", "API request time until the response starts, per route",
+                          REQUEST_LATENCY_BUCKETS, histogram, {"route": route, "method": method})
+    return out.render()
+
+@app.get("/metrics")
+async def get_prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    body = await asyncio.to_thread(render_metrics)
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -3022,11 +6602,118 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Camera startup scheduling
+STARTUP_CONCURRENCY = int(os.environ.get('STARTUP_CONCURRENCY', 8))  # Cameras connecting at the same time
+STARTUP_STAGGER_SECONDS = float(os.environ.get('STARTUP_STAGGER_SECONDS', 0.5))  # Mean delay between launches (jittered)
+STARTUP_CONNECT_TIMEOUT = float(os.environ.get('STARTUP_CONNECT_TIMEOUT', 20))  # Max wait for a camera's first data
+
+class CameraStartupScheduler:
+    """
+    Brings cameras online gradually instead of all at once: at most `concurrency` cameras
+    are connecting at any time, and launches are spaced by a jittered delay so RTSP
+    handshakes and ffmpeg spawns do not hit switches and CPU in one burst.
+    """
+    
+    def __init__(self, concurrency: int = STARTUP_CONCURRENCY, stagger_seconds: float = STARTUP_STAGGER_SECONDS,
+                 connect_timeout: float = STARTUP_CONNECT_TIMEOUT):
+        self.concurrency = max(1, concurrency)
+        self.stagger_seconds = stagger_seconds
+        self.connect_timeout = connect_timeout
+        self.tasks = set()
+        self.semaphore = None
+        self.progress = {
+            "status": "idle",
+            "total": 0,
+            "launched": 0,
+            "connected": 0,
+            "timed_out": 0,
+            "failed": 0,
+            "started_at": None,
+            "finished_at": None
+        }
+    
+    def schedule(self, cameras: List[Camera]):
+        """Start bringing cameras online in the background (batches share the concurrency limit)"""
+        if self.progress['status'] != "starting":
+            self.progress.update({
+                "status": "starting",
+                "total": 0,
+                "launched": 0,
+                "connected": 0,
+                "timed_out": 0,
+                "failed": 0,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "finished_at": None
+            })
+        self.progress['total'] += len(cameras)
+        
+        task = asyncio.create_task(self.run(cameras))
+        self.tasks.add(task)
+        task.add_done_callback(self._on_batch_done)
+    
+    def _on_batch_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if self.tasks:
+            return
+        self.progress['status'] = "ready"
+        self.progress['finished_at'] = datetime.now(timezone.utc).isoformat()
+        logger.info(f"Camera startup complete: {self.progress['connected']}/{self.progress['total']} connected, "
+                    f"{self.progress['timed_out']} not yet connected, {self.progress['failed']} failed")
+    
+    async def stop(self):
+        for task in list(self.tasks):
+            task.cancel()
+        for task in list(self.tasks):
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    async def run(self, cameras: List[Camera]):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        pending = []
+        
+        for camera in cameras:
+            await self.semaphore.acquire()
+            pending.append(asyncio.create_task(self._start_camera(camera, self.semaphore)))
+            await asyncio.sleep(self.stagger_seconds * random.uniform(0.5, 1.5))
+        
+        await asyncio.gather(*pending)
+    
+    async def _start_camera(self, camera: Camera, semaphore: asyncio.Semaphore):
+        try:
+            if camera.id in active_recorders:
+                return
+            
+            recorder = await recorder_manager.start(camera)
+            self.progress['launched'] += 1
+            logger.info(f"Started recorder for camera: {camera.name}")
+            
+            # Hold the slot until the camera delivers data (or the deadline passes)
+            connected = await asyncio.to_thread(recorder.connected_event.wait, self.connect_timeout)
+            if connected:
+                self.progress['connected'] += 1
+            else:
+                self.progress['timed_out'] += 1
+                logger.warning(f"Camera {camera.name} did not connect within {self.connect_timeout}s, continuing startup")
+        except Exception as e:
+            self.progress['failed'] += 1
+            logger.error(f"Failed to start camera {camera.name}: {str(e)}")
+        finally:
+            semaphore.release()
+
+startup_scheduler = CameraStartupScheduler()
+
 @app.on_event("startup")
 async def startup_event():
     """Start all active cameras on startup"""
-    # Migrate old cameras to new schema
-    cameras = await db.cameras.find({}).to_list(1000)
+    await ensure_indexes()
+    
+    # Migrate old cameras to new schema in a single bulk write
+    cameras = await db.cameras.find({}).to_list(None)
+    migrations = []
+    to_start = []
     
     for camera_doc in cameras:
         needs_update = False
@@ -3046,43 +6733,359 @@ async def startup_event():
             camera_doc['snapshot_interval'] = 1.0
             needs_update = True
         
-        # Update database if needed
         if needs_update:
-            await db.cameras.update_one(
+            migrations.append(UpdateOne(
                 {'id': camera_doc['id']},
                 {'$set': {
                     'stream_url': camera_doc['stream_url'],
                     'stream_type': camera_doc.get('stream_type', 'rtsp'),
                     'snapshot_interval': camera_doc.get('snapshot_interval', 1.0)
                 }}
-            )
+            ))
         
-        # Start recorder
         if isinstance(camera_doc['created_at'], str):
             camera_doc['created_at'] = datetime.fromisoformat(camera_doc['created_at'])
         
         try:
-            camera = Camera(**camera_doc)
-            recorder = CameraRecorder(camera)
-            recorder.start()
-            active_recorders[camera.id] = recorder
-            logger.info(f"Started recorder for camera: {camera.name}")
+            to_start.append(Camera(**camera_doc))
         except Exception as e:
-            logger.error(f"Failed to start camera {camera_doc.get('name', 'unknown')}: {str(e)}")
+            logger.error(f"Failed to load camera {camera_doc.get('name', 'unknown')}: {str(e)}")
+    
+    if migrations:
+        result = await db.cameras.bulk_write(migrations, ordered=False)
+        logger.info(f"Migrated {result.modified_count} cameras to the current schema")
+    
+    if recorder_pool:
+        recorder_pool.start()
+    
+    if cluster_coordinator:
+        # Cameras are claimed through leases; each node starts only its share
+        cluster_coordinator.start()
+    else:
+        # Bring recorders online gradually in the background
+        startup_scheduler.schedule(to_start)
     
     # Start Telegram bot in separate thread
     start_telegram_bot_if_configured()
+    
+    # Start background retention (runs off the request path)
+    retention_service.start()
+    
+    event_loop_monitor.start()
+
+# Cluster mode
+CLUSTER_MODE = os.environ.get('CLUSTER_MODE', 'false').lower() in ('1', 'true', 'yes')
+NODE_ID = os.environ.get('NODE_ID') or f"{socket.gethostname()}-{os.getpid()}"
+NODE_URL = os.environ.get('NODE_URL') or f"http://{socket.gethostname()}:8001"  # How other nodes reach this API
+CLUSTER_HEARTBEAT_SECONDS = float(os.environ.get('CLUSTER_HEARTBEAT_SECONDS', 5))
+CLUSTER_LEASE_TTL_SECONDS = float(os.environ.get('CLUSTER_LEASE_TTL_SECONDS', 20))  # Lease lifetime without renewal
+CLUSTER_FORWARD_HEADER = "X-Forwarded-By-Node"
+
+class ClusterCoordinator:
+    """
+    Distributes cameras across backend nodes sharing one MongoDB.
+    
+    Nodes register in `cluster_nodes` with a heartbeat and own cameras through leases in
+    `camera_leases` (unique per camera, renewed every heartbeat). Each tick a node claims
+    unowned or expired leases up to its fair share (cameras / live nodes) and releases
+    cameras above share + 1, so cameras move to new nodes and away from dead ones.
+    The owner also publishes per-camera status into the lease for cluster-wide status views.
+    """
+    
+    def __init__(self, node_id: str = NODE_ID, node_url: str = NODE_URL,
+                 heartbeat_seconds: float = CLUSTER_HEARTBEAT_SECONDS, lease_ttl: float = CLUSTER_LEASE_TTL_SECONDS):
+        self.node_id = node_id
+        self.node_url = node_url.rstrip('/')
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_ttl = lease_ttl
+        self.owned = set()  # Camera ids this node holds leases for
+        self.task = None
+        self.wake_event = asyncio.Event()
+        self.started_at = None
+        self.last_tick = None
+    
+    def _now(self) -> datetime:
+        return datetime.now(timezone.utc)
+    
+    def _expiry(self) -> str:
+        return (self._now() + timedelta(seconds=self.lease_ttl)).isoformat()
+    
+    def start(self):
+        self.started_at = self._now().isoformat()
+        self.task = asyncio.create_task(self._run_loop())
+        logger.info(f"🌐 Cluster mode: node {self.node_id} at {self.node_url}")
+    
+    async def stop(self):
+        """Leave the cluster: stop the loop and hand leases back so other nodes take over at once"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await db.camera_leases.delete_many({"node_id": self.node_id})
+            await db.cluster_nodes.delete_one({"id": self.node_id})
+        except Exception as e:
+            logger.error(f"Error leaving cluster: {e}")
+        self.owned.clear()
+    
+    def wake(self):
+        """Run the next tick now (e.g. after cameras were added)"""
+        self.wake_event.set()
+    
+    async def _run_loop(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cluster tick failed: {e}")
+            
+            try:
+                await asyncio.wait_for(self.wake_event.wait(), timeout=self.heartbeat_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.wake_event.clear()
+    
+    async def tick(self):
+        now = self._now().isoformat()
+        expires_at = self._expiry()
+        
+        await db.cluster_nodes.update_one(
+            {"id": self.node_id},
+            {"$set": {
+                "id": self.node_id,
+                "url": self.node_url,
+                "started_at": self.started_at,
+                "heartbeat_at": now,
+                "expires_at": expires_at,
+                "cameras": len(self.owned)
+            }},
+            upsert=True
+        )
+        
+        await self._renew_leases(expires_at)
+        
+        camera_docs = await db.cameras.find({}, {"_id": 0}).to_list(None)
+        cameras = {doc['id']: doc for doc in camera_docs}
+        
+        # Cameras deleted from the database
+        await asyncio.gather(*(self.release(cid) for cid in [cid for cid in self.owned if cid not in cameras]))
+        
+        live_nodes = await db.cluster_nodes.count_documents({"expires_at": {"$gt": now}})
+        share = math.ceil(len(cameras) / max(1, live_nodes))
+        
+        if len(self.owned) < share:
+            taken = {
+                lease['camera_id'] for lease in
+                await db.camera_leases.find({"expires_at": {"$gt": now}}, {"camera_id": 1}).to_list(None)
+            }
+            candidates = [cid for cid in cameras if cid not in taken and cid not in self.owned]
+            random.shuffle(candidates)  # Nodes ticking together should not fight over the same cameras
+            
+            claimed = []
+            for camera_id in candidates[:share - len(self.owned)]:
+                if await self.claim(camera_id):
+                    claimed.append(camera_id)
+            
+            if claimed:
+                logger.info(f"🌐 Node {self.node_id} claimed {len(claimed)} cameras")
+                to_start = []
+                for camera_id in claimed:
+                    doc = dict(cameras[camera_id])
+                    if isinstance(doc['created_at'], str):
+                        doc['created_at'] = datetime.fromisoformat(doc['created_at'])
+                    try:
+                        to_start.append(Camera(**doc))
+                    except Exception as e:
+                        logger.error(f"Failed to load camera {doc.get('name', 'unknown')}: {e}")
+                startup_scheduler.schedule(to_start)
+        
+        elif len(self.owned) > share + 1:
+            surplus = sorted(self.owned)[:len(self.owned) - share]
+            logger.info(f"🌐 Node {self.node_id} releasing {len(surplus)} cameras for rebalancing")
+            # In parallel: one stop takes seconds, and the leases kept were renewed only once this tick
+            await asyncio.gather(*(self.release(camera_id) for camera_id in surplus))
+        
+        # Forget nodes that have been silent for a long time
+        stale = (self._now() - timedelta(seconds=self.lease_ttl * 10)).isoformat()
+        await db.cluster_nodes.delete_many({"expires_at": {"$lt": stale}})
+        self.last_tick = now
+    
+    async def _renew_leases(self, expires_at: str):
+        """Extend owned leases, publish camera status and drop cameras whose lease was lost"""
+        if not self.owned:
+            return
+        
+        renewals = []
+        for camera_id in self.owned:
+            recorder = active_recorders.get(camera_id)
+            renewals.append(UpdateOne(
+                {"camera_id": camera_id, "node_id": self.node_id},
+                {"$set": {
+                    "expires_at": expires_at,
+                    "status": {
+                        "is_active": recorder is not None,
+                        "is_recording": bool(recorder and recorder.is_recording),
+                        "motion_state": recorder.motion_state if recorder else "idle"
+                    }
+                }}
+            ))
+        await db.camera_leases.bulk_write(renewals, ordered=False)
+        
+        held = {
+            lease['camera_id'] for lease in
+            await db.camera_leases.find({"node_id": self.node_id}, {"camera_id": 1}).to_list(None)
+        }
+        lost = self.owned - held
+        for camera_id in lost:
+            logger.warning(f"Lease for camera {camera_id} was lost, stopping local recorder")
+            self.owned.discard(camera_id)
+        await asyncio.gather(*(self._stop_local(camera_id) for camera_id in lost))
+    
+    async def claim(self, camera_id: str) -> bool:
+        """Take the lease for a camera if it is free or expired"""
+        if camera_id in self.owned:
+            return True
+        now = self._now().isoformat()
+        try:
+            await db.camera_leases.update_one(
+                {"camera_id": camera_id, "$or": [{"expires_at": {"$lte": now}}, {"node_id": self.node_id}]},
+                {"$set": {
+                    "camera_id": camera_id,
+                    "node_id": self.node_id,
+                    "node_url": self.node_url,
+                    "acquired_at": now,
+                    "expires_at": self._expiry()
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # Another node holds a live lease
+        self.owned.add(camera_id)
+        return True
+    
+    async def release(self, camera_id: str, stop: bool = True):
+        """
+        Give the camera's lease back and stop the local recorder (the new owner need not wait for the stop).
+        stop=False when the caller already queued the stop with the recorder manager.
+        """
+        self.owned.discard(camera_id)
+        await db.camera_leases.delete_one({"camera_id": camera_id, "node_id": self.node_id})
+        if stop:
+            await self._stop_local(camera_id)
+    
+    async def _stop_local(self, camera_id: str):
+        await recorder_manager.stop(camera_id)
+    
+    async def owner_of(self, camera_id: str) -> Optional[Dict[str, Any]]:
+        """Live lease of a camera, or None when nobody owns it"""
+        return await db.camera_leases.find_one(
+            {"camera_id": camera_id, "expires_at": {"$gt": self._now().isoformat()}},
+            {"_id": 0}
+        )
+    
+    async def may_run(self, camera_id: str) -> bool:
+        """Whether this node may run the camera's recorder (claims the lease when it is free)"""
+        return await self.claim(camera_id)
+    
+    async def remote_statuses(self) -> Dict[str, Dict[str, Any]]:
+        """Status published by the owners of cameras running on other nodes"""
+        leases = await db.camera_leases.find(
+            {"node_id": {"$ne": self.node_id}, "expires_at": {"$gt": self._now().isoformat()}},
+            {"_id": 0}
+        ).to_list(None)
+        return {lease['camera_id']: dict(lease.get('status') or {}, node_id=lease['node_id']) for lease in leases}
+    
+    async def get_status(self) -> Dict[str, Any]:
+        now = self._now().isoformat()
+        nodes = await db.cluster_nodes.find({}, {"_id": 0}).to_list(None)
+        for node in nodes:
+            node['alive'] = node.get('expires_at', '') > now
+            node['is_self'] = node['id'] == self.node_id
+        return {
+            "enabled": True,
+            "node_id": self.node_id,
+            "owned_cameras": len(self.owned),
+            "last_tick": self.last_tick,
+            "nodes": nodes
+        }
+
+cluster_coordinator = ClusterCoordinator() if CLUSTER_MODE else None
+cluster_http_client = None
+
+async def proxy_to_owner(request: Request, camera_id: str) -> Optional[Response]:
+    """
+    In cluster mode, forward a camera request to the node that owns the camera.
+    Returns None when the request should be handled locally.
+    """
+    global cluster_http_client
+    
+    if not cluster_coordinator or request.headers.get(CLUSTER_FORWARD_HEADER):
+        return None
+    
+    lease = await cluster_coordinator.owner_of(camera_id)
+    if not lease or lease['node_id'] == cluster_coordinator.node_id:
+        return None
+    
+    if cluster_http_client is None:
+        cluster_http_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=None))
+    
+    url = f"{lease['node_url']}{request.url.path}"
+    headers = {
+        key: value for key, value in request.headers.items()
+        if key.lower() not in ('host', 'content-length', 'connection')
+    }
+    headers[CLUSTER_FORWARD_HEADER] = cluster_coordinator.node_id
+    
+    upstream_request = cluster_http_client.build_request(
+        request.method, url, params=request.query_params, headers=headers, content=await request.body()
+    )
+    try:
+        upstream = await cluster_http_client.send(upstream_request, stream=True)
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to reach node {lease['node_id']} for camera {camera_id}: {e}")
+        raise HTTPException(status_code=502, detail=f"Owner node {lease['node_id']} is unreachable")
+    
+    passthrough = {
+        key: value for key, value in upstream.headers.items()
+        if key.lower() not in ('content-length', 'transfer-encoding', 'connection')
+    }
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        headers=passthrough,
+        background=BackgroundTask(upstream.aclose)
+    )
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop all recorders and bot on shutdown"""
     global telegram_bot_instance
     
-    # Stop all recorders
-    for recorder in active_recorders.values():
-        recorder.stop()
+    await startup_scheduler.stop()
+    await retention_service.stop()
+    await event_loop_monitor.stop()
+    if cluster_coordinator:
+        await cluster_coordinator.stop()
+    if cluster_http_client:
+        await cluster_http_client.aclose()
+    
+    # Stop all recorders (in parallel, off the event loop)
+    await recorder_manager.stop_all()
     
-    active_recorders.clear()
+    if recorder_pool:
+        await asyncio.to_thread(recorder_pool.shutdown)
+    
+    if replay_service.executor:
+        await asyncio.to_thread(replay_service.executor.shutdown, cancel_futures=True)
+    
+    try:
+        await asyncio.to_thread(activity_index.flush)
+    except Exception as e:
+        logger.error(f"Error flushing motion activity: {e}")
     
     # Stop Telegram bot
     if telegram_bot_instance:
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Local fake-camera fleet for load testing
+
+Serves N synthetic cameras from pre-rendered looped clips (an object crosses the scene
+in the second half of every loop):
+  - mjpeg:    http://host:port/cam/<n>/mjpeg         (multipart MJPEG)
+  - snapshot: http://host:port/cam/<n>/snapshot.jpg  (single JPEG per request)
+  - rtsp:     rtsp://host:8554/cam<n> via mediamtx + ffmpeg publishers when both are
+              installed, otherwise http://host:port/cam/<n>/stream.ts (H.264 MPEG-TS over
+              HTTP, ingested by the same dual-ffmpeg path as RTSP)
+
+A fraction of the cameras can be scripted to disconnect and stall periodically.
+
+Usage:
+    python camera_simulator.py --cameras 20 --types rtsp,mjpeg,snapshot
+    python camera_simulator.py --cameras 50 --faulty-fraction 0.2 --disconnect-every 120 --stall-every 90
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from fractions import Fraction
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import av
+import cv2
+
+from synthetic_scene import SyntheticScene
+
+
+class FaultSchedule:
+    """
+    Scripted faults of one camera, relative to its own start time: every `disconnect_every`
+    seconds the connection drops (and snapshots fail for `down_seconds`), every `stall_every`
+    seconds the camera stops sending for `stall_seconds` without closing the connection
+    """
+
+    def __init__(self, disconnect_every=0, stall_every=0, stall_seconds=10, down_seconds=5, started=None):
+        self.disconnect_every = disconnect_every
+        self.stall_every = stall_every
+        self.stall_seconds = stall_seconds
+        self.down_seconds = down_seconds
+        self.started = started or time.monotonic()
+
+    def _phase(self, every):
+        return (time.monotonic() - self.started) % every if every else None
+
+    def disconnect_due(self, connected_at):
+        """True once a disconnect point has passed since the connection was opened"""
+        if not self.disconnect_every:
+            return False
+        elapsed = time.monotonic() - self.started
+        opened = connected_at - self.started
+        return int(elapsed // self.disconnect_every) > int(opened // self.disconnect_every)
+
+    def down(self):
+        phase = self._phase(self.disconnect_every)
+        return phase is not None and phase < self.down_seconds and time.monotonic() - self.started > self.down_seconds
+
+    def stalled(self):
+        phase = self._phase(self.stall_every)
+        return phase is not None and self.stall_every - phase <= self.stall_seconds
+
+
+class ClipLibrary:
+    """Looped clip rendered once and shared by all cameras: JPEG frames and H.264 packets"""
+
+    def __init__(self, width, height, fps, loop_seconds):
+        self.fps = fps
+        self.loop_seconds = loop_seconds
+        frames = fps * loop_seconds
+        scene = SyntheticScene("simulator", width, height, frames, overlay=True,
+                               objects=[(frames // 2, frames - 1, 0.45, 0.2, 1.5 / frames)])
+        images = [scene.frame(i)[0] for i in range(frames)]
+        self.jpegs = [cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes() for image in images]
+        self.ts_path = self._encode_ts(images, width, height)
+        self.packets = self._load_packets()
+
+    def _encode_ts(self, images, width, height):
+        path = os.path.join(tempfile.mkdtemp(prefix="camera-sim-"), "loop.ts")
+        container = av.open(path, "w", format="mpegts")
+        stream = container.add_stream("libx264", rate=self.fps)
+        stream.width, stream.height, stream.pix_fmt = width, height, "yuv420p"
+        stream.options = {"g": str(self.fps * 2), "bf": "0", "preset": "veryfast", "tune": "zerolatency"}
+        for image in images:
+            for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="bgr24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+        container.close()
+        return path
+
+    def _load_packets(self):
+        """(payload, pts seconds, keyframe) of the encoded loop, for re-muxing with continuous timestamps"""
+        container = av.open(self.ts_path)
+        stream = container.streams.video[0]
+        self.codec_stream = stream
+        packets = []
+        for packet in container.demux(stream):
+            if packet.size:
+                packets.append((bytes(packet), float(packet.pts * packet.time_base), packet.is_keyframe))
+        self.extradata = stream.codec_context.extradata
+        container.close()
+        start = packets[0][1]
+        return [(payload, pts - start, key) for payload, pts, key in packets]
+
+    def jpeg_at(self, offset):
+        """Current JPEG of a camera whose loop is shifted by `offset` seconds"""
+        index = int((time.monotonic() + offset) * self.fps) % len(self.jpegs)
+        return self.jpegs[index]
+
+
+class _SocketWriter:
+    """File-like sink that PyAV muxes into; bytes are forwarded to the HTTP client"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        self.wfile.write(data)
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+
+class CameraSimulator:
+    def __init__(self, cameras=10, types=("rtsp", "mjpeg", "snapshot"), host="127.0.0.1", port=8090,
+                 width=1280, height=720, fps=10, loop_seconds=20, faulty_fraction=0.0,
+                 disconnect_every=0, stall_every=0, stall_seconds=10, rtsp_port=8554):
+        self.host = host
+        self.port = port
+        self.rtsp_port = rtsp_port
+        self.clips = ClipLibrary(width, height, fps, loop_seconds)
+        self.use_mediamtx = "rtsp" in types and shutil.which("mediamtx") and shutil.which("ffmpeg")
+        self.processes = {}
+        self.stopping = threading.Event()
+
+        self.cameras = []
+        faulty = int(cameras * faulty_fraction)
+        for index in range(cameras):
+            camera_type = types[index % len(types)]
+            faults = FaultSchedule(disconnect_every, stall_every, stall_seconds) if index < faulty else FaultSchedule()
+            self.cameras.append({
+                "index": index,
+                "type": camera_type,
+                "offset": index * 0.37 % loop_seconds,  # Cameras see motion at different times
+                "faults": faults,
+            })
+
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                simulator.handle(self)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.server.handle_error = lambda request, client_address: None  # Clients dropping connections is expected
+
+    # Public
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="camera-sim-http", daemon=True).start()
+        if self.use_mediamtx:
+            self._start_rtsp()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.server.shutdown()
+        for process in list(self.processes.values()):
+            process.kill()
+
+    def camera_configs(self):
+        """CameraCreate-shaped dicts for the backend"""
+        configs = []
+        for camera in self.cameras:
+            index, camera_type = camera["index"], camera["type"]
+            base = f"http://{self.host}:{self.port}/cam/{index}"
+            if camera_type == "mjpeg":
+                config = {"stream_url": f"{base}/mjpeg", "stream_type": "http-mjpeg", "codec": "mjpeg"}
+            elif camera_type == "snapshot":
+                config = {"stream_url": f"{base}/snapshot.jpg", "stream_type": "http-snapshot", "codec": "mjpeg",
+                          "snapshot_interval": 1.0 / self.clips.fps}
+            elif self.use_mediamtx:
+                config = {"stream_url": f"rtsp://{self.host}:{self.rtsp_port}/cam{index}", "stream_type": "rtsp", "codec": "h264"}
+            else:
+                config = {"stream_url": f"{base}/stream.ts", "stream_type": "rtsp", "codec": "h264"}
+            configs.append({"name": f"sim-{camera_type}-{index}", **config})
+        return configs
+
+    # HTTP
+
+    def handle(self, request):
+        parts = urlsplit(request.path).path.strip("/").split("/")  # Recorders append e.g. ?rtsp_transport=tcp
+        if parts == ["cameras"]:
+            body = json.dumps(self.camera_configs()).encode()
+            return self._respond(request, 200, "application/json", body)
+        if len(parts) != 3 or parts[0] != "cam" or not parts[1].isdigit() or int(parts[1]) >= len(self.cameras):
+            return self._respond(request, 404, "text/plain", b"not found")
+
+        camera = self.cameras[int(parts[1])]
+        faults = camera["faults"]
+        if faults.down():
+            return self._respond(request, 503, "text/plain", b"camera offline")
+
+        if parts[2] == "snapshot.jpg":
+            if faults.stalled():
+                time.sleep(faults.stall_seconds)
+            return self._respond(request, 200, "image/jpeg", self.clips.jpeg_at(camera["offset"]))
+        if parts[2] == "mjpeg":
+            return self._stream_mjpeg(request, camera)
+        if parts[2] == "stream.ts":
+            return self._stream_ts(request, camera)
+        return self._respond(request, 404, "text/plain", b"not found")
+
+    def _respond(self, request, status, content_type, body):
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _stream_mjpeg(self, request, camera):
+        request.send_response(200)
+        request.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        request.send_header("Connection", "close")
+        request.end_headers()
+        connected_at = time.monotonic()
+        faults = camera["faults"]
+        try:
+            while not self.stopping.is_set() and not faults.disconnect_due(connected_at):
+                if faults.stalled():
+                    time.sleep(0.2)
+                    continue
+                jpeg = self.clips.jpeg_at(camera["offset"])
+                request.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                request.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                time.sleep(1.0 / self.clips.fps)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        request.close_connection = True
+
+    def _stream_ts(self, request, camera):
+        """Loop the encoded clip as a live MPEG-TS stream with continuous timestamps, paced in real time"""
+        request.send_response(200)
+        request.send_header("Content-Type", "video/mp2t")
+        request.send_header("Connection", "close")
+        request.end_headers()
+        connected_at = time.monotonic()
+        faults = camera["faults"]
+
+        output = av.open(_SocketWriter(request.wfile), "w", format="mpegts")
+        stream = output.add_stream("h264", rate=self.clips.fps)
+        stream.width = self.clips.codec_stream.codec_context.width
+        stream.height = self.clips.codec_stream.codec_context.height
+        stream.codec_context.extradata = self.clips.extradata
+        time_base = Fraction(1, 90000)  # MPEG-TS clock
+        try:
+            loop = 0
+            while not self.stopping.is_set():
+                for payload, pts, key in self.clips.packets:
+                    if faults.disconnect_due(connected_at) or self.stopping.is_set():
+                        return
+                    while faults.stalled():
+                        time.sleep(0.2)
+                        connected_at = time.monotonic() - (pts + loop * self.clips.loop_seconds)
+                    at = pts + loop * self.clips.loop_seconds
+                    delay = connected_at + at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    packet = av.Packet(payload)
+                    packet.pts = packet.dts = int(at / time_base)
+                    packet.time_base = time_base
+                    packet.is_keyframe = key
+                    packet.stream = stream
+                    output.mux(packet)
+                loop += 1
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            try:
+                output.close()
+            except Exception:
+                pass
+            request.close_connection = True
+
+    # RTSP via mediamtx
+
+    def _start_rtsp(self):
+        self.processes["mediamtx"] = subprocess.Popen(["mediamtx"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(1)
+        for camera in self.cameras:
+            if camera["type"] == "rtsp":
+                self._publish(camera)
+        threading.Thread(target=self._rtsp_faults, name="camera-sim-rtsp-faults", daemon=True).start()
+
+    def _publish(self, camera):
+        index = camera["index"]
+        self.processes[index] = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-re", "-stream_loop", "-1", "-i", self.clips.ts_path,
+             "-c", "copy", "-f", "rtsp", "-rtsp_transport", "tcp", f"rtsp://127.0.0.1:{self.rtsp_port}/cam{index}"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        camera["published_at"] = time.monotonic()
+
+    def _rtsp_faults(self):
+        """Disconnects kill and later restart a publisher; stalls pause it with SIGSTOP"""
+        while not self.stopping.wait(0.5):
+            for camera in self.cameras:
+                if camera["type"] != "rtsp":
+                    continue
+                process = self.processes.get(camera["index"])
+                faults = camera["faults"]
+                if faults.down():
+                    if process and process.poll() is None:
+                        process.kill()
+                    continue
+                if process is None or process.poll() is not None:
+                    self._publish(camera)
+                    continue
+                stalled = faults.stalled()
+                if stalled != camera.get("stalled", False):
+                    process.send_signal(signal.SIGSTOP if stalled else signal.SIGCONT)
+                    camera["stalled"] = stalled
+
+
+def add_simulator_arguments(parser):
+    parser.add_argument("--cameras", type=int, default=10)
+    parser.add_argument("--types", default="rtsp,mjpeg,snapshot", help="Camera types, assigned round-robin")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--loop-seconds", type=int, default=20)
+    parser.add_argument("--faulty-fraction", type=float, default=0.0, help="Share of cameras with scripted faults")
+    parser.add_argument("--disconnect-every", type=float, default=0, help="Seconds between disconnects (0 = never)")
+    parser.add_argument("--stall-every", type=float, default=0, help="Seconds between stalls (0 = never)")
+    parser.add_argument("--stall-seconds", type=float, default=10)
+
+
+def simulator_from_args(args, cameras=None):
+    width, height = [int(v) for v in args.resolution.lower().split("x")]
+    return CameraSimulator(
+        cameras=cameras or args.cameras, types=args.types.split(","), host=args.host, port=args.port,
+        width=width, height=height, fps=args.fps, loop_seconds=args.loop_seconds,
+        faulty_fraction=args.faulty_fraction, disconnect_every=args.disconnect_every,
+        stall_every=args.stall_every, stall_seconds=args.stall_seconds
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic RTSP/MJPEG/snapshot cameras")
+    add_simulator_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"🎬 Rendering {args.loop_seconds}s loop at {args.resolution}, {args.fps} fps...")
+    simulator = simulator_from_args(args).start()
+    if "rtsp" in args.types and not simulator.use_mediamtx:
+        print("ℹ️  mediamtx/ffmpeg not found - RTSP cameras are served as H.264 MPEG-TS over HTTP")
+    for config in simulator.camera_configs():
+        print(f"   {config['name']:<18} {config['stream_type']:<14} {config['stream_url']}")
+    print(f"📷 {args.cameras} cameras running, camera list at http://{args.host}:{args.port}/cameras (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -625,9 +625,10 @@ const CameraDialog = ({ isOpen, onClose, onSuccess, camera = null }) => {
                       <option value="mog2">MOG2 - Адаптивный (рекомендуется)</option>
                       <option value="knn">KNN - Альтернативный</option>
                       <option value="basic">Базовый - Быстрый</option>
+                      <option value="mv">Векторы движения H.264/H.265 - Минимальная нагрузка</option>
                     </select>
                     <p className="text-xs text-slate-500 mt-1">
-                      <strong>Метод обнаружения движения.</strong> MOG2 (рекомендуется) - адаптивный алгоритм, обучается на фоне, игнорирует тени и изменения освещения, лучший для уличных камер. KNN - похож на MOG2, иногда точнее в сложных условиях. Базовый - простое сравнение кадров, быстрый но чувствителен к освещению, подходит для помещений со стабильным светом.
+                      <strong>Метод обнаружения движения.</strong> MOG2 (рекомендуется) - адаптивный алгоритм, обучается на фоне, игнорирует тени и изменения освещения, лучший для уличных камер. KNN - похож на MOG2, иногда точнее в сложных условиях. Базовый - простое сравнение кадров, быстрый но чувствителен к освещению, подходит для помещений со стабильным светом. Векторы движения - берутся из видеопотока кодека без анализа пикселей, минимальная нагрузка на CPU, только для RTSP камер с H.264/H.265 (для HTTP камер используется базовый метод).
                     </p>
                   </div>
 
@@ -169,6 +169,14 @@ const MotionEvents = () => {
     setShowDeleteConfirm(true);
   };
 
+  const notifyDeleted = (data) => {
+    if (data.job_id) {
+      toast.success(`Удаление ${data.total} событий запущено в фоне`);
+    } else {
+      toast.success(`Удалено ${data.deleted} событий`);
+    }
+  };
+
   const confirmDelete = async () => {
     try {
       let response;
@@ -178,7 +186,7 @@ const MotionEvents = () => {
           response = await axios.post(`${API}/motion-events/bulk-delete`, {
             ids: selectedEvents
           });
-          toast.success(`Удалено ${response.data.deleted} событий`);
+          notifyDeleted(response.data);
           break;
 
         case 'date-range':
@@ -187,12 +195,12 @@ const MotionEvents = () => {
             end_date: deleteAction.endDate,
             camera_id: deleteAction.cameraId
           });
-          toast.success(`Удалено ${response.data.deleted} событий`);
+          notifyDeleted(response.data);
           break;
 
         case 'camera':
           response = await axios.post(`${API}/motion-events/delete-by-camera?camera_id=${deleteAction.cameraId}`);
-          toast.success(`Удалено ${response.data.deleted} событий`);
+          notifyDeleted(response.data);
           break;
 
         default:
@@ -225,6 +225,14 @@ const Recordings = () => {
     setShowDeleteConfirm(true);
   };
 
+  const notifyDeleted = (data) => {
+    if (data.job_id) {
+      toast.success(`Удаление ${data.total} записей запущено в фоне`);
+    } else {
+      toast.success(`Удалено ${data.deleted} записей`);
+    }
+  };
+
   const confirmDelete = async () => {
     try {
       let response;
@@ -234,7 +242,7 @@ const Recordings = () => {
           response = await axios.post(`${API}/recordings/bulk-delete`, {
             ids: selectedRecordings
           });
-          toast.success(`Удалено ${response.data.deleted} записей`);
+          notifyDeleted(response.data);
           break;
 
         case 'date-range':
@@ -243,12 +251,12 @@ const Recordings = () => {
             end_date: deleteAction.endDate,
             camera_id: deleteAction.cameraId
           });
-          toast.success(`Удалено ${response.data.deleted} записей`);
+          notifyDeleted(response.data);
           break;
 
         case 'camera':
           response = await axios.post(`${API}/recordings/delete-by-camera?camera_id=${deleteAction.cameraId}`);
-          toast.success(`Удалено ${response.data.deleted} записей`);
+          notifyDeleted(response.data);
           break;
 
         default:
@@ -402,6 +410,16 @@ const Recordings = () => {
                     data-testid={`checkbox-recording-${recording.id}`}
                   />
                   
+                  {recording.thumbnail_path && (
+                    <img
+                      src={`${API}/recordings/${recording.id}/thumbnail`}
+                      alt="Recording thumbnail"
+                      loading="lazy"
+                      className="w-32 aspect-video object-cover rounded bg-slate-900"
+                      data-testid={`recording-thumbnail-${recording.id}`}
+                    />
+                  )}
+                  
                   <div className="flex-1">
                     <div className="flex items-center space-x-3 mb-2">
                       <h3 className="font-semibold text-slate-800">{recording.camera_name}</h3>
@@ -496,6 +514,7 @@ const Recordings = () => {
                     controls
                     autoPlay
                     preload="metadata"
+                    poster={playingRecording.thumbnail_path ? `${API}/recordings/${playingRecording.id}/thumbnail` : undefined}
                     className="w-full"
                     style={{ maxHeight: '70vh' }}
                     onError={handleVideoError}
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Ingest load test against the local camera simulator
+
+Starts camera_simulator.py with the largest camera count, launches the backend (uvicorn)
+against a real MongoDB, adds cameras in steps through POST /api/cameras/bulk and, after a
+warm-up, samples CPU, RSS, open file descriptors, threads and ffmpeg processes of the
+backend process tree. Reports totals and per-camera figures for every step, so the
+per-node camera ceiling can be read off before buying hardware.
+
+Usage:
+    python load_test.py --steps 5,10,20,40 --mongo-url mongodb://localhost:27017
+    python load_test.py --steps 10,50 --types rtsp --resolution 1920x1080 --json load.json
+    python load_test.py --backend-url http://localhost:8001 --backend-pid 1234   # already running backend
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+import requests
+
+from camera_simulator import add_simulator_arguments, simulator_from_args
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+
+class LoadTester:
+    def __init__(self, args):
+        self.args = args
+        self.api_url = None
+        self.backend = None  # uvicorn subprocess when we launched it
+        self.process = None  # psutil.Process of the backend
+        self.camera_ids = []
+        self.storage_dir = tempfile.mkdtemp(prefix="load-test-recordings-")
+
+    # Backend
+
+    def start_backend(self):
+        if self.args.backend_url:
+            self.api_url = f"{self.args.backend_url.rstrip('/')}/api"
+            if self.args.backend_pid:
+                self.process = psutil.Process(self.args.backend_pid)
+        else:
+            env = {**os.environ, "MONGO_URL": self.args.mongo_url, "DB_NAME": self.args.db_name}
+            self.backend = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(self.args.backend_port)],
+                cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            self.process = psutil.Process(self.backend.pid)
+            self.api_url = f"http://127.0.0.1:{self.args.backend_port}/api"
+
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                if requests.get(f"{self.api_url}/startup/status", timeout=2).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(1)
+        raise RuntimeError(f"Backend did not come up at {self.api_url}")
+
+    def stop_backend(self):
+        if self.backend:
+            self.backend.terminate()
+            try:
+                self.backend.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.backend.kill()
+
+    # Cameras
+
+    def add_cameras(self, configs):
+        cameras = [{**config, "storage_path": self.storage_dir, "motion_detection": True} for config in configs]
+        response = requests.post(
+            f"{self.api_url}/cameras/bulk", json={"cameras": cameras, "start_recorders": True}, timeout=300
+        )
+        response.raise_for_status()
+        result = response.json()
+        for item in result["results"]:
+            if item.get("camera_id"):
+                self.camera_ids.append(item["camera_id"])
+            elif item.get("error"):
+                print(f"   ⚠️  {item['name']}: {item['error']}")
+        return result["created"]
+
+    def remove_cameras(self):
+        for camera_id in self.camera_ids:
+            try:
+                requests.delete(f"{self.api_url}/cameras/{camera_id}", timeout=60)
+            except requests.RequestException as e:
+                print(f"   ⚠️  Failed to delete camera {camera_id}: {e}")
+        self.camera_ids = []
+
+    # Measurement
+
+    def _tree(self):
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+
+    def sample(self, seconds, interval=2.0):
+        """Average resource usage of the backend process tree (including ffmpeg children) over `seconds`"""
+        samples = []
+        primed = set()
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            cpu = rss = fds = threads = ffmpeg = 0
+            for proc in self._tree():
+                try:
+                    if proc.pid not in primed:
+                        proc.cpu_percent(None)  # First call only primes the counter
+                        primed.add(proc.pid)
+                    else:
+                        cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    fds += proc.num_fds()
+                    threads += proc.num_threads()
+                    ffmpeg += proc.name().startswith("ffmpeg")
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            samples.append((cpu, rss, fds, threads, ffmpeg))
+            time.sleep(interval)
+        samples = samples[1:] or samples  # The first sample only primes cpu_percent
+        count = len(samples)
+        return {
+            "cpu_percent": round(sum(s[0] for s in samples) / count, 1),
+            "rss_mb": round(sum(s[1] for s in samples) / count / 1024 ** 2, 1),
+            "fds": round(sum(s[2] for s in samples) / count),
+            "threads": round(sum(s[3] for s in samples) / count),
+            "ffmpeg_processes": round(sum(s[4] for s in samples) / count),
+        }
+
+    def backend_stats(self):
+        """Recorder and detection health as the backend sees it"""
+        stats = {}
+        try:
+            status = requests.get(f"{self.api_url}/cameras/status/all", timeout=30).json()
+            stats["recording"] = sum(1 for s in status.values() if s.get("is_recording"))
+            detection = requests.get(f"{self.api_url}/detection/stats", timeout=30).json()
+            cameras = detection.get("cameras", {}).values()
+            submitted = sum(c["submitted"] for c in cameras)
+            stats["detection_dropped_percent"] = round(100 * sum(c["dropped"] for c in cameras) / submitted, 1) if submitted else 0.0
+            stats["detection_latency_ms"] = round(max((c["latency_ms"] for c in cameras), default=0.0), 1)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            stats["error"] = str(e)
+        return stats
+
+    # Run
+
+    def run(self):
+        steps = sorted(int(s) for s in self.args.steps.split(","))
+        print(f"🎬 Starting simulator with {steps[-1]} cameras ({self.args.types}, {self.args.resolution})...")
+        simulator = simulator_from_args(self.args, cameras=steps[-1]).start()
+        configs = simulator.camera_configs()
+        results = []
+
+        try:
+            print("🚀 Starting backend...")
+            self.start_backend()
+            baseline = self.sample(self.args.interval * 3, self.args.interval) if self.process else {}
+            print(f"   Idle backend: {baseline}")
+
+            added = 0
+            for step in steps:
+                print(f"\n📷 Step: {step} cameras")
+                added += self.add_cameras(configs[added:step])
+                time.sleep(self.args.warmup)
+                usage = self.sample(self.args.measure, self.args.interval) if self.process else {}
+                stats = self.backend_stats()
+                result = {"cameras": added, **usage, **stats}
+                if usage and added:
+                    result["cpu_per_camera"] = round((usage["cpu_percent"] - baseline.get("cpu_percent", 0)) / added, 2)
+                    result["rss_mb_per_camera"] = round((usage["rss_mb"] - baseline.get("rss_mb", 0)) / added, 1)
+                    result["fds_per_camera"] = round((usage["fds"] - baseline.get("fds", 0)) / added, 1)
+                results.append(result)
+                print(f"   {result}")
+        finally:
+            print("\n🧹 Cleaning up...")
+            self.remove_cameras()
+            self.stop_backend()
+            simulator.stop()
+            shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+        print(f"\n{'cameras':>7} {'CPU %':>7} {'CPU/cam':>8} {'RSS MB':>8} {'MB/cam':>7} {'fds':>6} {'fds/cam':>8} "
+              f"{'ffmpeg':>7} {'recording':>9} {'det drop %':>10}")
+        for r in results:
+            print(f"{r['cameras']:>7} {r.get('cpu_percent', '-'):>7} {r.get('cpu_per_camera', '-'):>8} "
+                  f"{r.get('rss_mb', '-'):>8} {r.get('rss_mb_per_camera', '-'):>7} {r.get('fds', '-'):>6} "
+                  f"{r.get('fds_per_camera', '-'):>8} {r.get('ffmpeg_processes', '-'):>7} {r.get('recording', '-'):>9} "
+                  f"{r.get('detection_dropped_percent', '-'):>10}")
+
+        if self.args.json:
+            with open(self.args.json, "w") as f:
+                json.dump({"arguments": vars(self.args), "baseline": baseline, "steps": results}, f, indent=2)
+            print(f"\n📄 Results written to {self.args.json}")
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend resource usage per camera count")
+    add_simulator_arguments(parser)
+    parser.add_argument("--steps", default="5,10,20", help="Camera counts to measure, in increasing order")
+    parser.add_argument("--warmup", type=float, default=30, help="Seconds after adding cameras before measuring")
+    parser.add_argument("--measure", type=float, default=60, help="Measurement window per step (seconds)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between samples")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="video_surveillance_loadtest")
+    parser.add_argument("--backend-port", type=int, default=8011)
+    parser.add_argument("--backend-url", help="Use an already running backend instead of launching one")
+    parser.add_argument("--backend-pid", type=int, help="PID of that backend, for process metrics")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    LoadTester(args).run()
+
+
+if __name__ == "__main__":
+    main()
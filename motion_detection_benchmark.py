@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Motion detection benchmark on synthetic scenes
+
+Generates reproducible video (sensor noise, lighting changes, moving objects, a ticking
+timestamp overlay) with per-frame ground truth, runs every detector through the same
+MotionDetector.prepare/detect calls the recorder uses and reports ms/frame, transient
+allocations and precision/recall (raw and after the temporal filter).
+
+Usage:
+    python motion_detection_benchmark.py
+    python motion_detection_benchmark.py --resolutions 1280x720,1920x1080 --algorithms mog2,mv --json before.json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "video_surveillance_benchmark")
+
+import av
+import cv2
+import numpy as np
+
+import server
+from synthetic_scene import FPS, SyntheticScene
+
+ALGORITHMS = ["mog2", "knn", "basic", "mv"]
+RESOLUTIONS = ["640x360", "1280x720", "1920x1080"]
+
+# Overlay area in reference (1280x720) pixels, excluded like a camera's timestamp
+OVERLAY_ZONE = {"x": 20, "y": 20, "width": 420, "height": 60}
+
+
+def build_scenes(width, height, frames, seed):
+    half = frames // 2
+    return [
+        SyntheticScene("static_noise", width, height, frames, seed, noise=4.0),
+        SyntheticScene("lighting", width, height, frames, seed, lighting=True),
+        SyntheticScene("moving_object", width, height, frames, seed,
+                       objects=[(frames // 5, frames // 5 + half, 0.4, 0.2, 0.02)]),
+        SyntheticScene("overlay_and_object", width, height, frames, seed, overlay=True,
+                       objects=[(frames // 3, frames // 3 + half, 0.5, 0.15, 0.025)]),
+    ]
+
+
+def encode_scene(frames):
+    """H.264-encode frames in memory (for the motion-vector detector)"""
+    buffer = io.BytesIO()
+    height, width = frames[0].shape[:2]
+    container = av.open(buffer, "w", format="mp4")
+    stream = container.add_stream("libx264", rate=FPS)
+    stream.width, stream.height, stream.pix_fmt = width, height, "yuv420p"
+    stream.options = {"g": str(FPS * 4), "bf": "0", "preset": "veryfast"}
+    for image in frames:
+        for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="bgr24")):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+    buffer.seek(0)
+    return buffer
+
+
+def detector_inputs(algorithm, frames):
+    """Per-frame detector inputs plus the per-frame cost of producing them (mv: vector extraction)"""
+    if algorithm != "mv":
+        return frames, [0.0] * len(frames)
+
+    container = av.open(encode_scene(frames))
+    stream = container.streams.video[0]
+    stream.codec_context.options = {"flags2": "+export_mvs", "skip_loop_filter": "all"}
+    grids, costs = [], []
+    for frame in container.decode(stream):
+        started = time.perf_counter()
+        grids.append(server.motion_vector_energy(frame))
+        costs.append(time.perf_counter() - started)
+    container.close()
+    return grids, costs
+
+
+def score(predicted, truth):
+    """Precision and recall (None when undefined) and the false-positive rate on motionless frames"""
+    tp = sum(1 for p, t in zip(predicted, truth) if p and t)
+    fp = sum(1 for p, t in zip(predicted, truth) if p and not t)
+    fn = sum(1 for p, t in zip(predicted, truth) if not p and t)
+    negatives = sum(1 for t in truth if not t)
+    precision = round(tp / (tp + fp), 3) if tp + fp else None
+    recall = round(tp / (tp + fn), 3) if tp + fn else None
+    fp_rate = round(fp / negatives, 3) if negatives else None
+    return precision, recall, fp_rate
+
+
+def fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def run_detector(algorithm, scene, frames, truth, overlay_excluded):
+    settings = {"name": f"bench-{algorithm}", "stream_url": "", "motion_algorithm": algorithm}
+    if overlay_excluded:
+        scale = scene.width / 1280
+        settings["excluded_zones"] = [{"type": "rect", "coordinates": {k: v * scale for k, v in OVERLAY_ZONE.items()}}]
+
+    inputs, input_costs = detector_inputs(algorithm, frames)
+
+    # Timing pass
+    model = server.MotionDetector(server.Camera(**settings))
+    raw, filtered, timings = [], [], []
+    for item, extra in zip(inputs, input_costs):
+        started = time.perf_counter()
+        motion = False
+        if item is not None:
+            small_frame, view = model.prepare(item)
+            motion = model.detect(small_frame, view)
+        timings.append((time.perf_counter() - started + extra) * 1000)
+        raw.append(model.last_raw_motion if item is not None else False)
+        filtered.append(motion)
+
+    # Allocation pass on a fresh model: transient Python/numpy memory per frame
+    model = server.MotionDetector(server.Camera(**settings))
+    tracemalloc.start()
+    transient = []
+    for item in inputs:
+        if item is None:
+            continue
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        small_frame, view = model.prepare(item)
+        model.detect(small_frame, view)
+        _, peak = tracemalloc.get_traced_memory()
+        transient.append(peak - before)
+    tracemalloc.stop()
+
+    # Skip warm-up frames where background models are still learning
+    warmup = min(10, len(frames) // 5)
+    raw_p, raw_r, raw_fpr = score(raw[warmup:], truth[warmup:])
+    p, r, fpr = score(filtered[warmup:], truth[warmup:])
+    return {
+        "algorithm": algorithm,
+        "resolution": f"{scene.width}x{scene.height}",
+        "scene": scene.name,
+        "ms_per_frame": round(float(np.mean(timings)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "alloc_kb_per_frame": round(float(np.mean(transient)) / 1024, 1) if transient else 0.0,
+        "raw_precision": raw_p,
+        "raw_recall": raw_r,
+        "raw_fp_rate": raw_fpr,
+        "precision": p,
+        "recall": r,
+        "fp_rate": fpr,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark motion detectors on synthetic scenes")
+    parser.add_argument("--algorithms", default=",".join(ALGORITHMS))
+    parser.add_argument("--resolutions", default=",".join(RESOLUTIONS))
+    parser.add_argument("--frames", type=int, default=150, help="Frames per scene (at 5 fps)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)  # Comparable numbers: recorders share cores
+    results = []
+    print("🔬 Motion detection benchmark")
+    print(f"{'algorithm':<8} {'resolution':<10} {'scene':<19} {'ms/frame':>9} {'p95':>7} {'alloc KB':>9} "
+          f"{'raw P/R/FPR':>16} {'P/R/FPR':>16}")
+
+    for resolution in args.resolutions.split(","):
+        width, height = [int(v) for v in resolution.lower().split("x")]
+        for scene in build_scenes(width, height, args.frames, args.seed):
+            rendered = [scene.frame(i) for i in range(scene.frames)]
+            frames = [image for image, _ in rendered]
+            truth = [moving for _, moving in rendered]
+            for algorithm in args.algorithms.split(","):
+                result = run_detector(algorithm, scene, frames, truth, overlay_excluded=scene.overlay)
+                results.append(result)
+                print(f"{algorithm:<8} {result['resolution']:<10} {scene.name:<19} {result['ms_per_frame']:>9.3f} "
+                      f"{result['p95_ms']:>7.2f} {result['alloc_kb_per_frame']:>9.1f} "
+                      f"{fmt(result['raw_precision']):>6}/{fmt(result['raw_recall'])}/{fmt(result['raw_fp_rate']):<5} "
+                      f"{fmt(result['precision']):>6}/{fmt(result['recall'])}/{fmt(result['fp_rate']):<5}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"frames": args.frames, "seed": args.seed, "results": results}, f, indent=2)
+        print(f"\n📄 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Synthetic camera scenes with ground truth
+
+Shared by motion_detection_benchmark.py and camera_simulator.py. Depends only on numpy and
+OpenCV, so the simulator can render frames without importing the backend.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+FPS = 5  # Recorders feed detection at 5 fps
+
+
+class SyntheticScene:
+    """
+    Deterministic scene: textured background, Gaussian sensor noise, optional lighting
+    drift and steps, objects moving through the frame and a timestamp overlay.
+    frame(i) returns (BGR frame, True when an object is moving in view).
+    """
+
+    def __init__(self, name, width, height, frames, seed=0, noise=3.0, lighting=False, objects=(), overlay=False):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.noise = noise
+        self.lighting = lighting
+        self.objects = objects  # (first frame, last frame, y fraction, size fraction, speed fraction per frame)
+        self.overlay = overlay
+        self.rng = np.random.default_rng(seed)
+        texture = self.rng.integers(60, 120, (height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+        self.background = cv2.resize(texture, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    def frame(self, index):
+        frame = self.background.astype(np.float32)
+
+        if self.lighting:
+            # Slow drift plus a light switched on halfway through
+            frame *= 1.0 + 0.15 * np.sin(index / self.frames * np.pi)
+            if index >= self.frames // 2:
+                frame += 35
+
+        moving = False
+        for first, last, y_fraction, size_fraction, speed in self.objects:
+            if first <= index <= last:
+                size = int(self.height * size_fraction)
+                x = int((index - first) * speed * self.width)
+                y = int(y_fraction * self.height)
+                if x < self.width:
+                    # Bright body with dark stripes: visible in grayscale and gives the encoder texture to track
+                    body = frame[y:y + int(size * 1.6), x:x + size]
+                    body[:] = (215, 225, 230)
+                    body[::max(2, size // 6)] = (50, 50, 60)
+                    moving = True
+
+        if self.noise:
+            frame += self.rng.normal(0, self.noise, frame.shape).astype(np.float32)
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+        if self.overlay:
+            scale = self.width / 1280
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1700000000 + index / FPS * 7))
+            cv2.putText(frame, stamp, (int(30 * scale), int(65 * scale)), cv2.FONT_HERSHEY_SIMPLEX,
+                        1.2 * scale, (255, 255, 255), max(1, int(2 * scale)))
+        return frame, moving
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# server.py reads these at import time; nothing connects to MongoDB until a query runs
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "video_surveillance_test")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
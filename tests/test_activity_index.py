@@ -0,0 +1,216 @@
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+HOUR = 1700002800  # An hour boundary (UTC)
+
+
+class FakeCollection:
+    def __init__(self, docs=None, fail=False):
+        self.docs = docs or {}  # (camera_id, hour iso) -> document
+        self.fail = fail
+        self.writes = []
+        self.reads = 0
+
+    def find_one(self, query, projection=None):
+        self.reads += 1
+        return self.docs.get((query["camera_id"], query["hour"]))
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            raise ConnectionError("MongoDB unavailable")
+        self.writes.append(operations)
+
+
+class FakeClient:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getitem__(self, name):
+        return self
+
+    @property
+    def motion_activity(self):
+        return self.collection
+
+
+@pytest.fixture(autouse=True)
+def plain_update_one(monkeypatch):
+    # Inspectable stand-in for pymongo's UpdateOne
+    monkeypatch.setattr(server, "UpdateOne", lambda filter, update, upsert=False: (filter, update, upsert))
+
+
+def make_index(collection):
+    index = server.ActivityIndex(resolution=10, flush_seconds=3600)
+    index.client = FakeClient(collection)
+    return index
+
+
+def hour_iso(hour):
+    return datetime.fromtimestamp(hour, timezone.utc).isoformat()
+
+
+def test_activity_level():
+    assert server.activity_level(None) == 0
+    assert server.activity_level({"area": 0, "frame_size": (100, 100)}) == 0
+    assert server.activity_level({"area": 10000, "frame_size": (100, 100)}) == 255
+    assert server.activity_level({"area": 2500, "frame_size": (100, 100)}) == 127  # sqrt(0.25) * 255
+    assert server.activity_level({"area": 1, "frame_size": (1000, 1000)}) == 1  # Any motion is visible
+
+
+def test_record_keeps_max_level_per_slot():
+    index = make_index(FakeCollection())
+    index.record("cam", 100, HOUR + 25)
+    index.record("cam", 50, HOUR + 29)  # Same 10 s slot, lower level
+    index.record("cam", 200, HOUR + 3599)
+    index.record("cam", 0, HOUR + 40)  # No motion is not recorded
+
+    values = index.pending("cam")[HOUR]
+    assert len(values) == 360
+    assert values[2] == 100
+    assert values[359] == 200
+    assert values[4] == 0
+    assert index.dirty == {("cam", HOUR)}
+
+
+def test_record_splits_hours_and_cameras():
+    index = make_index(FakeCollection())
+    index.record("cam", 10, HOUR - 1)
+    index.record("cam", 20, HOUR)
+    index.record("other", 30, HOUR)
+
+    assert set(index.pending("cam")) == {HOUR - 3600, HOUR}
+    assert index.pending("cam")[HOUR - 3600][359] == 10
+    assert list(index.pending("other")) == [HOUR]
+
+
+def test_flush_merges_with_stored_hour_once():
+    hour = int(time.time() // 3600 * 3600)
+    stored = np.zeros(360, dtype=np.uint8)
+    stored[0] = 90
+    stored[2] = 250
+    collection = FakeCollection({("cam", hour_iso(hour)): {"values": stored.tobytes(), "resolution": 10}})
+    index = make_index(collection)
+    index.record("cam", 100, hour + 25)
+
+    index.flush()
+
+    (filter, update, upsert), = collection.writes[0]
+    assert filter == {"camera_id": "cam", "hour": hour_iso(hour)}
+    assert upsert
+    written = np.frombuffer(update["$set"]["values"], dtype=np.uint8)
+    assert written[0] == 90 and written[2] == 250  # Stored levels survive a restart
+    assert index.merged == {("cam", hour)}
+    assert not index.dirty
+
+    index.record("cam", 120, hour + 35)
+    index.flush()
+    assert collection.reads == 1  # Already merged: no second read
+    written = np.frombuffer(collection.writes[1][0][1]["$set"]["values"], dtype=np.uint8)
+    assert list(written[:4]) == [90, 0, 250, 120]
+
+
+def test_flush_ignores_stored_hour_with_other_resolution():
+    stored = np.full(60, 200, dtype=np.uint8)
+    collection = FakeCollection({("cam", hour_iso(HOUR)): {"values": stored.tobytes(), "resolution": 60}})
+    index = make_index(collection)
+    index.record("cam", 100, HOUR + 25)
+
+    index.flush()
+
+    written = np.frombuffer(collection.writes[0][0][1]["$set"]["values"], dtype=np.uint8)
+    assert written[2] == 100 and written[0] == 0
+
+
+def test_flush_failure_keeps_hours_dirty():
+    collection = FakeCollection(fail=True)
+    index = make_index(collection)
+    index.record("cam", 100, time.time())
+
+    with pytest.raises(ConnectionError):
+        index.flush()
+    assert len(index.dirty) == 1
+    assert not index.merged
+
+    collection.fail = False
+    index.flush()
+    assert len(collection.writes) == 1
+    assert not index.dirty
+    assert len(index.merged) == 1
+
+
+def test_flush_forgets_old_hours_once_written():
+    index = make_index(FakeCollection())
+    old_hour = int(time.time() // 3600 * 3600) - 3 * 3600
+    index.record("cam", 100, old_hour + 5)
+    index.record("cam", 100, time.time())
+
+    index.flush()
+
+    assert list(index.pending("cam")) == [int(time.time() // 3600 * 3600)]
+    assert ("cam", old_hour) not in index.merged
+
+
+# GET /api/cameras/{camera_id}/activity
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeActivityCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor([
+            doc for doc in self.docs
+            if doc["camera_id"] == query["camera_id"] and query["hour"]["$gte"] <= doc["hour"] < query["hour"]["$lt"]
+        ])
+
+
+class FakeDb:
+    def __init__(self, docs):
+        self.motion_activity = FakeActivityCollection(docs)
+
+
+def test_activity_endpoint_downsamples_max_per_bucket(monkeypatch):
+    stored = np.zeros(360, dtype=np.uint8)
+    stored[0] = 40    # HOUR + 0s
+    stored[5] = 80    # HOUR + 50s, same 60 s bucket
+    stored[6] = 30    # HOUR + 60s, second bucket
+    monkeypatch.setattr(server, "db", FakeDb([
+        {"camera_id": "cam", "hour": hour_iso(HOUR), "resolution": 10, "values": stored.tobytes()},
+        {"camera_id": "other", "hour": hour_iso(HOUR), "resolution": 10, "values": np.full(360, 255, np.uint8).tobytes()},
+    ]))
+    pending = server.ActivityIndex(resolution=10, flush_seconds=3600)
+    pending.record("cam", 200, HOUR + 125)  # Not flushed yet, third bucket
+    monkeypatch.setattr(server, "activity_index", pending)
+
+    response = TestClient(server.app).get("/api/cameras/cam/activity", params={
+        "start": hour_iso(HOUR), "end": hour_iso(HOUR + 300), "buckets": 5
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["bucket_seconds"] == 60
+    assert body["values"] == [80, 30, 200, 0, 0]
+
+
+def test_activity_endpoint_rejects_empty_interval():
+    response = TestClient(server.app).get("/api/cameras/cam/activity", params={
+        "start": hour_iso(HOUR), "end": hour_iso(HOUR)
+    })
+    assert response.status_code == 400
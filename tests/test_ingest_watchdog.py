@@ -0,0 +1,148 @@
+import io
+import socket
+import time
+from threading import Event, Thread
+
+import server
+
+
+class FakeProcess:
+    def __init__(self, data=b""):
+        self.stdout = io.BytesIO(data)
+        self.killed = False
+
+    def kill(self):
+        self.killed = True
+
+
+class Starter:
+    def __init__(self, data=b""):
+        self.data = data
+        self.processes = []
+
+    def __call__(self):
+        process = FakeProcess(self.data)
+        self.processes.append(process)
+        return process
+
+
+def test_restart_counts_consecutive_restarts_until_data():
+    starter = Starter()
+    leg = server.IngestLeg("record", starter, max_restarts=2)
+    leg.start()
+
+    assert leg.restart()
+    assert leg.restart()
+    assert leg.restarts == 2
+    assert not leg.restart()  # Out of restarts
+    assert len(starter.processes) == 3
+    assert all(process.killed for process in starter.processes)
+
+    leg.mark()
+    assert leg.restarts == 0
+    assert leg.restart()
+
+
+def test_restart_without_limit():
+    leg = server.IngestLeg("decode", Starter())
+    leg.start()
+    for _ in range(20):
+        assert leg.restart()
+    assert leg.restarts == 20
+
+
+def test_start_clears_stall_reason_and_resets_clock():
+    leg = server.IngestLeg("record", Starter(), max_restarts=1)
+    leg.start()
+    leg.last_data -= 60
+    leg.stall_reason = "stalled"
+
+    leg.restart()
+
+    assert leg.stall_reason is None
+    assert time.monotonic() - leg.last_data < 1
+
+
+def test_closed_leg_is_not_restarted():
+    starter = Starter()
+    leg = server.IngestLeg("record", starter)
+    leg.start()
+    leg.close()
+
+    assert starter.processes[0].killed
+    assert not leg.restart()
+    assert len(starter.processes) == 1
+
+
+def test_watchdog_kills_only_the_stalled_leg():
+    stalled = server.IngestLeg("record", Starter())
+    healthy = server.IngestLeg("decode", Starter())
+    stalled.start()
+    healthy.start()
+    stalled.last_data -= 60
+
+    watchdog = server.IngestWatchdog("cam", [stalled, healthy], Event(), deadline=5).start()
+    try:
+        deadline = time.monotonic() + 5
+        while stalled.stall_reason is None and time.monotonic() < deadline:
+            healthy.mark()
+            time.sleep(0.1)
+    finally:
+        watchdog.stop()
+
+    assert stalled.stall_reason == "stalled"
+    assert stalled.process.killed
+    assert healthy.stall_reason is None
+    assert not healthy.process.killed
+
+
+def test_watchdog_closes_legs_when_recorder_stops():
+    leg = server.IngestLeg("record", Starter())
+    leg.start()
+    stop_event = Event()
+    watchdog = server.IngestWatchdog("cam", [leg], stop_event, deadline=60).start()
+
+    stop_event.set()
+    watchdog.thread.join(timeout=5)
+
+    assert leg.closed
+    assert leg.process.killed
+
+
+def test_exhausted_record_leg_reports_failure():
+    camera = server.Camera(name="cam", stream_url="rtsp://cam", motion_detection=False,
+                           resolution_width=16, resolution_height=8)
+    recorder = server.CameraRecorder(camera)
+    record_leg = server.IngestLeg("record", Starter(), max_restarts=1)
+    decode_leg = server.IngestLeg("decode", Starter())
+    record_leg.start()
+    decode_leg.start()
+    try:
+        assert recorder._process_dual_ffmpeg_streams(record_leg, decode_leg) is False
+    finally:
+        record_leg.close()
+        decode_leg.close()
+
+    assert recorder.counters.record_restarts == 1
+    assert "record" in recorder.ingest_gaps  # Outage still open, stored when data returns or on stop
+
+
+def test_motion_vector_decoder_kill_unblocks_reader():
+    # A server that accepts and never answers keeps PyAV waiting inside open()
+    silent = socket.socket()
+    silent.bind(("127.0.0.1", 0))
+    silent.listen()
+    port = silent.getsockname()[1]
+    decoder = server.MotionVectorDecoder("cam", f"http://127.0.0.1:{port}/stream", 16, 8).start()
+    result = {}
+    reader = Thread(target=lambda: result.setdefault("data", decoder.stdout.read(16 * 8 * 3)))
+    reader.start()
+    try:
+        time.sleep(0.5)
+        decoder.kill()
+        reader.join(timeout=2)
+
+        assert not reader.is_alive()
+        assert result["data"] == b""  # EOF
+    finally:
+        silent.close()
@@ -0,0 +1,75 @@
+import pytest
+
+import server
+
+
+@pytest.fixture
+def histograms():
+    return server.LatencyHistograms(buckets=(1.0, 2.0, 5.0))
+
+
+def test_observe_uses_inclusive_upper_bounds(histograms):
+    for seconds in (0.5, 1.0, 1.5, 5.0, 7.0, -3.0):
+        histograms.observe("cam", "alert", seconds)
+
+    histogram = histograms.snapshot("cam")["alert"]
+    assert histogram["counts"] == [3, 1, 1, 1]  # <=1 (incl. negative clamped to 0), <=2, <=5, +Inf
+    assert histogram["count"] == 6
+    assert histogram["sum"] == pytest.approx(15.0)
+
+
+def test_snapshot_is_a_copy(histograms):
+    histograms.observe("cam", "alert", 1.0)
+    snapshot = histograms.snapshot()
+    snapshot["cam"]["alert"]["counts"][0] = 99
+
+    assert histograms.snapshot("cam")["alert"]["counts"][0] == 1
+    assert histograms.snapshot("missing") == {}
+
+
+def test_remove(histograms):
+    histograms.observe("cam", "alert", 1.0)
+    histograms.remove("cam")
+    histograms.remove("cam")
+    assert histograms.snapshot() == {}
+
+
+def test_quantile_interpolates_inside_bucket(histograms):
+    for _ in range(4):
+        histograms.observe("cam", "alert", 1.5)  # All in the (1, 2] bucket
+    histogram = histograms.snapshot("cam")["alert"]
+
+    assert histograms.quantile(histogram, 0.5) == pytest.approx(1.5)
+    assert histograms.quantile(histogram, 0.25) == pytest.approx(1.25)
+    assert histograms.quantile(histogram, 1.0) == pytest.approx(2.0)
+
+
+def test_quantile_across_buckets(histograms):
+    for seconds in (0.5, 0.5, 3.0, 3.0):
+        histograms.observe("cam", "alert", seconds)
+    histogram = histograms.snapshot("cam")["alert"]
+
+    assert histograms.quantile(histogram, 0.5) == pytest.approx(1.0)  # Top of the first bucket
+    assert histograms.quantile(histogram, 0.75) == pytest.approx(3.5)  # Halfway through (2, 5]
+
+
+def test_quantile_in_overflow_bucket_reports_last_bound(histograms):
+    histograms.observe("cam", "alert", 60.0)
+    assert histograms.quantile(histograms.snapshot("cam")["alert"], 0.95) == 5.0
+
+
+def test_quantile_of_empty_histogram(histograms):
+    assert histograms.quantile({"counts": [0, 0, 0, 0], "count": 0, "sum": 0.0}, 0.5) is None
+
+
+def test_summarize_orders_pipeline_stages(histograms):
+    histograms.observe("cam", "alert", 3.0)
+    histograms.observe("cam", "detection", 0.5)
+    histograms.observe("cam", "custom", 0.5)
+
+    summary = histograms.summarize(histograms.snapshot("cam"))
+
+    assert list(summary) == ["detection", "alert", "custom"]
+    assert summary["alert"]["count"] == 1
+    assert summary["alert"]["mean_s"] == 3.0
+    assert summary["detection"]["p50_s"] == 0.5
@@ -0,0 +1,74 @@
+import math
+
+from fastapi.testclient import TestClient
+
+import server
+
+
+def test_samples_are_grouped_per_family():
+    text = server.PrometheusText(prefix="x_")
+    text.add("frames_total", "counter", "Frames", 1, {"camera": "a"})
+    text.add("connected", "gauge", "Connected", True, {"camera": "a"})
+    text.add("frames_total", "counter", "Frames", 2, {"camera": "b"})
+
+    assert text.render() == (
+        "# HELP x_frames_total Frames\n"
+        "# TYPE x_frames_total counter\n"
+        'x_frames_total{camera="a"} 1\n'
+        'x_frames_total{camera="b"} 2\n'
+        "# HELP x_connected Connected\n"
+        "# TYPE x_connected gauge\n"
+        'x_connected{camera="a"} 1\n'
+    )
+
+
+def test_values():
+    text = server.PrometheusText(prefix="")
+    text.add("a", "gauge", "", False)
+    text.add("b", "gauge", "", 0.25)
+    text.add("c", "gauge", "", math.inf)
+    text.add("d", "gauge", "", 7)
+    text.add("skipped", "gauge", "", None)
+
+    samples = [line for line in text.render().splitlines() if not line.startswith("#")]
+    assert samples == ["a 0", "b 0.25", "c +Inf", "d 7"]
+
+
+def test_label_values_are_escaped():
+    text = server.PrometheusText(prefix="")
+    text.add("m", "gauge", "", 1, {"camera": 'Gate "A"\\1\nnorth'})
+
+    assert 'm{camera="Gate \\"A\\"\\\\1\\nnorth"} 1' in text.render().splitlines()
+
+
+def test_histogram_buckets_are_cumulative():
+    histograms = server.LatencyHistograms(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 3.0):
+        histograms.observe("cam", "alert", seconds)
+    text = server.PrometheusText(prefix="")
+    text.histogram("latency_seconds", "Latency", (0.1, 1.0), histograms.snapshot("cam")["alert"], {"stage": "alert"})
+
+    assert text.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="alert",le="0.1"} 1',
+        'latency_seconds_bucket{stage="alert",le="1.0"} 3',
+        'latency_seconds_bucket{stage="alert",le="+Inf"} 4',
+        'latency_seconds_sum{stage="alert"} 4.25',
+        'latency_seconds_count{stage="alert"} 4',
+    ]
+
+
+def test_metrics_endpoint_reports_request_latency_per_route():
+    client = TestClient(server.app)
+    client.get("/api/detection/stats")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert any(
+        line.startswith(server.METRICS_PREFIX + "http_request_duration_seconds_count")
+        and 'route="/api/detection/stats"' in line
+        for line in response.text.splitlines()
+    )
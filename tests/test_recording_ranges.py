@@ -0,0 +1,174 @@
+import os
+from email.utils import formatdate
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+# parse_range_header
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=100-", [(100, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=-5000", [(0, 999)]),  # Suffix longer than the file
+    ("bytes=900-5000", [(900, 999)]),  # End clamped to the file
+    ("bytes=0-9, 20-29", [(0, 9), (20, 29)]),
+    ("bytes=20-29,0-9", [(0, 9), (20, 29)]),  # Sorted
+    ("bytes=0-10,5-20,21-30", [(0, 30)]),  # Overlapping and adjacent ranges merged
+])
+def test_parse_range_header(header, expected):
+    assert server.parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "items=0-10",
+    "bytes=",
+    "bytes=abc-def",
+    "bytes=10",
+    "bytes=50-10",
+])
+def test_parse_range_header_malformed_serves_full_file(header):
+    assert server.parse_range_header(header, 1000) is None
+
+
+def test_parse_range_header_unsatisfiable():
+    assert server.parse_range_header("bytes=1000-1100", 1000) == []
+    assert server.parse_range_header("bytes=-0", 1000) == []
+
+
+def test_parse_range_header_too_many_ranges():
+    header = "bytes=" + ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(server.MAX_RANGES_PER_REQUEST + 1))
+    assert server.parse_range_header(header, 10000) is None
+
+
+# GET /api/recordings/{id}
+
+class FakeRecordings:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query.get("id"))
+
+
+class FakeDb:
+    def __init__(self, docs):
+        self.recordings = FakeRecordings(docs)
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    path = tmp_path / "clip.mp4"
+    content = bytes(range(256)) * 4  # 1024 bytes
+    path.write_bytes(content)
+    monkeypatch.setattr(server, "db", FakeDb({"rec": {"id": "rec", "file_path": str(path)}}))
+    monkeypatch.setattr(server, "RECORDINGS_ACCEL_REDIRECT_PREFIX", None)
+    return content, os.stat(path)
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def test_full_file(client, recording):
+    content, stat_result = recording
+    response = client.get("/api/recordings/rec")
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == server.file_etag(stat_result)
+
+
+def test_single_range(client, recording):
+    content, _ = recording
+    response = client.get("/api/recordings/rec", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    assert response.headers["content-length"] == "10"
+
+
+def test_suffix_range(client, recording):
+    content, _ = recording
+    response = client.get("/api/recordings/rec", headers={"Range": "bytes=-24"})
+    assert response.status_code == 206
+    assert response.content == content[-24:]
+    assert response.headers["content-range"] == "bytes 1000-1023/1024"
+
+
+def test_multiple_ranges(client, recording):
+    content, _ = recording
+    response = client.get("/api/recordings/rec", headers={"Range": "bytes=0-3,100-103"})
+    assert response.status_code == 206
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1]
+    body = response.content
+    assert int(response.headers["content-length"]) == len(body)
+    assert body.endswith(f"\r\n--{boundary}--\r\n".encode())
+    parts = body.split(f"--{boundary}".encode())[1:-1]
+    assert len(parts) == 2
+    assert b"Content-Range: bytes 0-3/1024\r\n\r\n" + content[0:4] in parts[0]
+    assert b"Content-Range: bytes 100-103/1024\r\n\r\n" + content[100:104] in parts[1]
+
+
+def test_unsatisfiable_range(client, recording):
+    response = client.get("/api/recordings/rec", headers={"Range": "bytes=5000-6000"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_if_range_matching_etag_serves_range(client, recording):
+    content, stat_result = recording
+    response = client.get("/api/recordings/rec", headers={
+        "Range": "bytes=0-9", "If-Range": server.file_etag(stat_result)
+    })
+    assert response.status_code == 206
+    assert response.content == content[:10]
+
+
+def test_if_range_stale_etag_serves_full_file(client, recording):
+    content, _ = recording
+    response = client.get("/api/recordings/rec", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_if_range_weak_etag_serves_full_file(client, recording):
+    content, stat_result = recording
+    response = client.get("/api/recordings/rec", headers={
+        "Range": "bytes=0-9", "If-Range": "W/" + server.file_etag(stat_result)
+    })
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_if_none_match_not_modified(client, recording):
+    _, stat_result = recording
+    response = client.get("/api/recordings/rec", headers={"If-None-Match": server.file_etag(stat_result)})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == server.file_etag(stat_result)
+
+
+def test_if_modified_since_not_modified(client, recording):
+    _, stat_result = recording
+    response = client.get("/api/recordings/rec", headers={
+        "If-Modified-Since": formatdate(stat_result.st_mtime + 60, usegmt=True)
+    })
+    assert response.status_code == 304
+
+
+def test_if_none_match_other_etag_serves_file(client, recording):
+    content, _ = recording
+    response = client.get("/api/recordings/rec", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.content == content
+
+
+def test_missing_recording(client, recording):
+    assert client.get("/api/recordings/nope").status_code == 404